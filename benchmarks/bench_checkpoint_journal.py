@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查点日志开销测试
+对比批量 fsync 与每条记录单独写入并 fsync 时，工作线程记录一个完成任务的耗时
+
+用法: python benchmarks/bench_checkpoint_journal.py [--records 20000] [--result-size 4000]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.checkpoint_journal import CheckpointJournal
+from core.llm_coordinator import ProcessingTask
+
+def record_each(path: str, entries):
+    """每条记录单独写入并 fsync"""
+    with open(path, 'ab') as f:
+        for key, task in entries:
+            entry = {'key': key, 'chunk_id': task.chunk_id, 'result': task.result}
+            f.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+def main():
+    parser = argparse.ArgumentParser(description="检查点日志开销测试")
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--result-size', type=int, default=4000, help="每个处理结果的字符数")
+    parser.add_argument('--fsync-interval', type=float, default=1.0)
+    args = parser.parse_args()
+    
+    result = "测" * args.result_size
+    entries = [(CheckpointJournal.make_key(str(i)), ProcessingTask(i, '', 'stub', 'completed', result=result))
+               for i in range(args.records)]
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        journal = CheckpointJournal(os.path.join(temp_dir, 'batched.jsonl'), 'bench',
+                                    fsync_interval=args.fsync_interval)
+        start = time.perf_counter()
+        for key, task in entries:
+            journal.record(key, task.chunk_id, task)
+        batched_time = time.perf_counter() - start
+        start = time.perf_counter()
+        journal.close()
+        close_time = time.perf_counter() - start
+        
+        # 每条记录都 fsync 很慢，只测一部分
+        sample = entries[:min(len(entries), 500)]
+        start = time.perf_counter()
+        record_each(os.path.join(temp_dir, 'each.jsonl'), sample)
+        each_time = time.perf_counter() - start
+    
+    print(f"记录 {args.records} 个完成的任务，每个结果 {args.result_size} 字符")
+    print(f"批量 fsync  : 工作线程每条 {batched_time / len(entries) * 1e6:.2f} µs，"
+          f"{journal.fsync_count} 次 fsync，关闭时写入剩余记录 {close_time:.3f}s")
+    print(f"逐条 fsync  : 每条 {each_time / len(sample) * 1e6:.1f} µs")
+    print(f"工作线程开销降低 {each_time / len(sample) / (batched_time / len(entries)):.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本分块扩展性测试
+在没有小节标题的超长章节上测量 _chunk_text 的耗时，检查 1MB 到 100MB 呈线性增长
+
+用法: python benchmarks/bench_chunk_scaling.py [--sizes 1,10,25,50,100] [--max-ratio 2.0]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.text_processor import TextProcessor
+
+PARAGRAPH = "这是一个用于测试分块性能的段落，内容会被重复很多次以构造超长章节。" * 4
+
+def build_chapter_text(size_mb: float) -> str:
+    """生成只有少量章节标题、没有小节标题的长文本"""
+    target = int(size_mb * 1024 * 1024)
+    paragraph_bytes = len(PARAGRAPH.encode('utf-8')) + 2
+    paragraphs_per_chapter = max(1, target // paragraph_bytes // 4)
+    
+    parts = []
+    length = 0
+    chapter = 0
+    while length < target:
+        chapter += 1
+        parts.append(f"CH{chapter} 第{chapter}章")
+        parts.extend([PARAGRAPH] * paragraphs_per_chapter)
+        length += paragraphs_per_chapter * paragraph_bytes
+    return '\n\n'.join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="文本分块扩展性测试")
+    parser.add_argument('--sizes', default='1,10,25,50,100', help="逗号分隔的文本大小（MB）")
+    parser.add_argument('--max-ratio', type=float, default=2.0,
+                        help="最大与最小每MB耗时之比的上限，超过视为非线性")
+    args = parser.parse_args()
+    
+    processor = TextProcessor({})
+    sizes = [float(size) for size in args.sizes.split(',')]
+    per_mb = []
+    
+    print(f"{'大小(MB)':>10} {'耗时(s)':>10} {'MB/s':>10} {'块数':>8}")
+    for size in sizes:
+        content = build_chapter_text(size)
+        start = time.perf_counter()
+        chunks = processor._chunk_text(content)
+        elapsed = time.perf_counter() - start
+        del content
+        
+        per_mb.append(elapsed / size)
+        print(f"{size:>10.1f} {elapsed:>10.3f} {size / elapsed:>10.1f} {len(chunks):>8}")
+    
+    ratio = max(per_mb) / min(per_mb)
+    print(f"每MB耗时最大/最小之比: {ratio:.2f}")
+    
+    if ratio > args.max_ratio:
+        print("✗ 分块耗时未呈线性增长")
+        sys.exit(1)
+    print("✓ 分块耗时呈线性增长")
+
+if __name__ == "__main__":
+    main()
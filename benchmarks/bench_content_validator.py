@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容验证性能测试
+测量大文本的验证耗时，并检查截断的块能被检测出来
+
+用法: python benchmarks/bench_content_validator.py [--size-mb 100] [--workers 0]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.text_processor import TextProcessor
+from core.llm_coordinator import LLMCoordinator
+from core.formatting_engine import FormattingEngine
+from core.content_validator import ContentValidator
+from benchmarks.bench_overlap_dedup import build_book
+
+def main():
+    parser = argparse.ArgumentParser(description="内容验证性能测试")
+    parser.add_argument('--size-mb', type=float, default=100)
+    parser.add_argument('--workers', type=int, default=0, help="并行验证的进程数，0 表示CPU核数")
+    args = parser.parse_args()
+    
+    settings = {'chunk_size': 8000, 'overlap_size': 200, 'llm_configs': [], 'validation_workers': args.workers}
+    processor = TextProcessor(settings)
+    coordinator = LLMCoordinator(settings)
+    engine = FormattingEngine(settings)
+    validator = ContentValidator(settings)
+    
+    views = processor.chunk_views(build_book(args.size_mb))
+    processed = [coordinator._mock_llm_response(str(view), '') for view in views]
+    # 模拟LLM截断中间一个块的输出
+    truncated = len(processed) // 2
+    processed[truncated] = processed[truncated][:len(processed[truncated]) // 2]
+    formatted = engine.format_text(processed, views)
+    
+    start = time.perf_counter()
+    result = validator.validate_content(views, processed, formatted)
+    elapsed = time.perf_counter() - start
+    
+    size_mb = sum(len(str(view).encode('utf-8')) for view in views) / (1024 * 1024)
+    print(f"文本: {size_mb:.1f} MB，{len(views)} 个文本块，{validator.max_workers} 个进程")
+    print(f"验证耗时: {elapsed:.2f}s  {size_mb / elapsed:.1f} MB/s")
+    print(f"相似度: {result.similarity_score:.4f}  丢失比例: {result.content_loss_ratio:.4f}")
+    print(f"截断的第 {truncated + 1} 个块丢失比例: {result.chunk_loss_ratios[truncated]:.1%}")
+    flagged = [index for index, ratio in enumerate(result.chunk_loss_ratios) if ratio > validator.max_content_loss]
+    print(f"超过阈值的块: {[index + 1 for index in flagged]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编码检测性能测试
+在不同编码的语料上对比逐个编码整体解码的旧实现与检测样本后只解码一次的 decode_file，
+并检查两者的结果
+
+用法: python benchmarks/bench_encoding_detection.py [--size-mb 20] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.encoding_detector import decode_file
+from benchmarks.corpus import build_corpus
+
+def read_by_trying(file_path: str):
+    """原实现：按顺序用每种编码读取整个文件，直到解码成功"""
+    for encoding in ['utf-8', 'gbk', 'gb2312', 'utf-16', 'latin-1']:
+        try:
+            with open(file_path, 'r', encoding=encoding) as f:
+                return f.read(), encoding
+        except UnicodeDecodeError:
+            continue
+    raise Exception("无法读取文件，尝试了所有编码格式")
+
+def build_cases(size_mb: float):
+    """生成 (名称, 文件内容字节, 期望文本) 列表"""
+    zh = build_corpus(size_mb, 'zh')
+    en = build_corpus(size_mb, 'en')
+    # 开头的英文超过检测样本，之后才出现中文
+    mixed = build_corpus(0.5, 'en') + '\n\n' + zh
+    latin = en.replace('【', '"').replace('】', '"').replace('the ', 'thé ').replace('was ', 'wäs ')
+    return [
+        ('UTF-8', zh.encode('utf-8'), zh),
+        ('UTF-8 BOM', zh.encode('utf-8-sig'), zh),
+        ('GBK', zh.encode('gbk'), zh),
+        ('UTF-16 BOM', zh.encode('utf-16'), zh),
+        ('UTF-16-LE 英文', en.encode('utf-16-le'), en),
+        ('Latin-1 英文', latin.encode('latin-1'), latin),
+        ('英文开头的 GBK', mixed.encode('gbk'), mixed)
+    ]
+
+def measure(func, file_path: str, repeat: int):
+    """返回最快一次的耗时（秒）和结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="编码检测性能测试")
+    parser.add_argument('--size-mb', type=float, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    total_old = total_new = 0.0
+    for name, data, expected in build_cases(args.size_mb):
+        with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+            f.write(data)
+            file_path = f.name
+        
+        try:
+            old_time, (old_text, old_encoding) = measure(read_by_trying, file_path, args.repeat)
+            new_time, (new_text, new_encoding) = measure(decode_file, file_path, args.repeat)
+        finally:
+            os.unlink(file_path)
+        
+        assert new_text == expected, f"{name}: decode_file 结果不正确（{new_encoding}）"
+        old_note = "" if old_text.lstrip('\ufeff') == expected else "  （旧实现结果错误）"
+        total_old += old_time
+        total_new += new_time
+        size_mb = len(data) / (1024 * 1024)
+        print(f"{name:<14} {size_mb:6.1f} MB  旧实现 {old_time:.3f}s ({old_encoding})  "
+              f"decode_file {new_time:.3f}s ({new_encoding})  加速比 {old_time / new_time:.2f}x{old_note}")
+    
+    print(f"合计: 旧实现 {total_old:.3f}s  decode_file {total_new:.3f}s  加速比 {total_old / total_new:.2f}x")
+
+if __name__ == "__main__":
+    main()
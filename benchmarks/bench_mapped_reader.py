@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存映射读取性能测试
+对比文本模式整体读取与 MappedText 按窗口解码的耗时和内存峰值（tracemalloc），
+以及按字符偏移随机切片的延迟
+
+用法: python benchmarks/bench_mapped_reader.py [--size-mb 200] [--window-kb 1024] [--slices 1000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.mapped_text import MappedText
+from benchmarks.corpus import write_corpus
+
+def measure(func):
+    """返回耗时（秒）、Python 分配的内存峰值（MB）和结果"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def read_text_mode(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def read_mapped(file_path: str, window_size: int) -> str:
+    with MappedText(file_path, 'utf-8', window_size) as mapped:
+        return mapped.read()
+
+def count_lines_text_mode(file_path: str) -> int:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return sum(1 for _ in f)
+
+def count_lines_mapped(file_path: str, window_size: int) -> int:
+    with MappedText(file_path, 'utf-8', window_size) as mapped:
+        return sum(1 for _ in mapped.iter_lines())
+
+def main():
+    parser = argparse.ArgumentParser(description="内存映射读取性能测试")
+    parser.add_argument('--size-mb', type=float, default=200)
+    parser.add_argument('--window-kb', type=int, default=1024)
+    parser.add_argument('--slices', type=int, default=1000)
+    args = parser.parse_args()
+    window_size = args.window_kb * 1024
+    
+    with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+        file_path = f.name
+    try:
+        write_corpus(file_path, args.size_mb, 'mixed')
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        print(f"文本大小: {size_mb:.1f} MB，窗口 {args.window_kb} KB")
+        
+        text_time, text_peak, expected = measure(lambda: read_text_mode(file_path))
+        mapped_time, mapped_peak, content = measure(lambda: read_mapped(file_path, window_size))
+        assert content == expected, "MappedText 读取结果与文本模式不一致"
+        length = len(expected)
+        del content, expected
+        print(f"整体读取  文本模式: {text_time:.3f}s 峰值 {text_peak:.0f} MB   "
+              f"MappedText: {mapped_time:.3f}s 峰值 {mapped_peak:.0f} MB")
+        
+        text_time, text_peak, text_lines = measure(lambda: count_lines_text_mode(file_path))
+        mapped_time, mapped_peak, mapped_lines = measure(lambda: count_lines_mapped(file_path, window_size))
+        assert mapped_lines == text_lines, "MappedText 行数与文本模式不一致"
+        print(f"逐行读取  文本模式: {text_time:.3f}s 峰值 {text_peak:.1f} MB   "
+              f"MappedText: {mapped_time:.3f}s 峰值 {mapped_peak:.1f} MB")
+        
+        rng = random.Random(1)
+        with MappedText(file_path, 'utf-8', window_size) as mapped:
+            start = time.perf_counter()
+            len(mapped)  # 第一次遍历建立检查点
+            index_time = time.perf_counter() - start
+            offsets = [rng.randrange(length) for _ in range(args.slices)]
+            start = time.perf_counter()
+            for offset in offsets:
+                mapped[offset:offset + 4000]
+            slice_time = (time.perf_counter() - start) / args.slices
+        print(f"随机切片  建立检查点 {index_time:.3f}s，每次切片 4000 字符 {slice_time * 1000:.2f}ms")
+    finally:
+        os.unlink(file_path)
+
+if __name__ == "__main__":
+    main()
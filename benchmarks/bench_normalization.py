@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本规范化性能测试
+在中文、英文和中英混合语料上对比预处理中逐个 replace 加 re.sub(' +') 的旧实现、
+前端连续十二次符号清理的旧实现与 TextNormalizer，并给出同一映射使用 str.translate 的耗时作为参考
+
+用法: python benchmarks/bench_normalization.py [--size-mb 20] [--languages zh en mixed] [--repeat 3]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.text_normalizer import DECORATIVE_SYMBOLS, DEFAULT_NORMALIZATION, TextNormalizer
+from benchmarks.corpus import LANGUAGES, build_corpus
+
+def clean_by_replace(content: str) -> str:
+    """原 TextProcessor._clean_special_characters：逐个 replace 后合并空格"""
+    content = content.replace('（', '(').replace('）', ')')
+    content = content.replace('，', ',').replace('。', '.')
+    content = content.replace('；', ';').replace('：', ':')
+    return re.sub(r' +', ' ', content)
+
+def purge_symbols_repeatedly(text: str) -> str:
+    """原前端的符号清理：两次符号清理后再重复十次方形符号清理"""
+    text = re.sub(r'[□■▪▫▬▭▮▯]', '', text)
+    text = re.sub(r'[•·◦‣⁃]', '', text)
+    for _ in range(10):
+        text = re.sub(r'[▪▫▬▭▮▯]', '', text)
+    return text
+
+def decorate(content: str) -> str:
+    """把部分列表符号换成方形符号和项目符号，并插入一些弯引号和连续空格"""
+    content = content.replace('\n- ', '\n▪ ', 2000).replace('\n- ', '\n• ')
+    return content.replace('. ', '.  “', 3000).replace(', ', '”, ', 3000)
+
+def measure(func, repeat: int):
+    """返回最快一次的耗时（秒）和结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="文本规范化性能测试")
+    parser.add_argument('--size-mb', type=float, default=20)
+    parser.add_argument('--languages', nargs='+', choices=LANGUAGES, default=list(LANGUAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    normalizer = TextNormalizer.from_config()
+    symbol_normalizer = TextNormalizer(delete_characters=DECORATIVE_SYMBOLS)
+    table = str.maketrans(DEFAULT_NORMALIZATION['replacements'])
+    
+    for language in args.languages:
+        content = decorate(build_corpus(args.size_mb, language))
+        
+        old_time, expected = measure(lambda: clean_by_replace(content), args.repeat)
+        new_time, result = measure(lambda: normalizer.normalize(content), args.repeat)
+        assert result == expected, f"{language}: 预处理规范化结果与旧实现不一致"
+        translate_time, _ = measure(lambda: re.sub('  +', ' ', content.translate(table)), args.repeat)
+        
+        old_purge_time, expected = measure(lambda: purge_symbols_repeatedly(content), args.repeat)
+        new_purge_time, result = measure(lambda: symbol_normalizer.normalize(content), args.repeat)
+        assert result == expected, f"{language}: 符号清理结果与旧实现不一致"
+        
+        print(f"{language:<6} 预处理: 旧实现 {old_time:.3f}s  TextNormalizer {new_time:.3f}s "
+              f"(加速比 {old_time / new_time:.2f}x)  str.translate {translate_time:.3f}s  |  "
+              f"前端符号清理: 旧实现 {old_purge_time:.3f}s  TextNormalizer {new_purge_time:.3f}s "
+              f"(加速比 {old_purge_time / new_purge_time:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重叠去重测试
+对比合并时保留与去掉块之间重叠内容的输出大小、token数和去重耗时
+
+用法: python benchmarks/bench_overlap_dedup.py [--size-mb 5] [--chunk-size 4000] [--overlap-size 200]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.text_processor import TextProcessor
+from core.llm_coordinator import LLMCoordinator
+from core.formatting_engine import FormattingEngine
+from core.chunk_merger import ChunkMerger
+from core.token_estimator import TokenEstimator
+
+CHARACTERS = "天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳，，。"
+
+def build_book(size_mb: float, seed: int = 1) -> str:
+    """生成带章节、小节和不同长度段落的测试书稿"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    chapter = 0
+    while length < target:
+        chapter += 1
+        parts.append(f"CH{chapter:02d} 第{chapter}章")
+        for section in range(1, 4):
+            parts.append(f"CH{chapter:02d}-S{section:02d} 第{section}节")
+            for _ in range(rng.randint(3, 12)):
+                paragraph = ''.join(rng.choice(CHARACTERS) for _ in range(rng.randint(20, 400)))
+                parts.append(paragraph)
+                length += len(paragraph.encode('utf-8'))
+    return '\n\n'.join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="重叠去重测试")
+    parser.add_argument('--size-mb', type=float, default=5)
+    parser.add_argument('--chunk-size', type=int, default=4000)
+    parser.add_argument('--overlap-size', type=int, default=200)
+    parser.add_argument('--model', default='gpt-4', help="估算token数使用的模型")
+    args = parser.parse_args()
+    
+    settings = {'chunk_size': args.chunk_size, 'overlap_size': args.overlap_size, 'llm_configs': []}
+    processor = TextProcessor(settings)
+    coordinator = LLMCoordinator(settings)
+    engine = FormattingEngine(settings)
+    estimator = TokenEstimator(args.model)
+    
+    views = processor.chunk_views(build_book(args.size_mb))
+    processed = [coordinator._mock_llm_response(str(view), '') for view in views]
+    
+    start = time.perf_counter()
+    merger = ChunkMerger()
+    list(merger.merge(processed, views))
+    merge_time = time.perf_counter() - start
+    
+    duplicated = engine.format_text(processed)
+    deduplicated = engine.format_text(processed, views)
+    stats = merger.get_stats()
+    duplicated_tokens = estimator.count(duplicated)
+    deduplicated_tokens = estimator.count(deduplicated)
+    processed_mb = sum(len(chunk.encode('utf-8')) for chunk in processed) / (1024 * 1024)
+    
+    print(f"文本块: {len(views)} 个，重叠 {args.overlap_size} 字符")
+    print(f"对齐: 精确 {stats['aligned_chunks']}，锚点 {stats['anchored_chunks']}，未对齐 {stats['unaligned_chunks']}")
+    print(f"保留重叠: {len(duplicated)} 字符  {duplicated_tokens} tokens")
+    print(f"去掉重叠: {len(deduplicated)} 字符  {deduplicated_tokens} tokens")
+    print(f"去掉重复内容: {stats['removed_chars']} 字符 "
+          f"({(len(duplicated) - len(deduplicated)) / len(duplicated):.1%} 输出)，"
+          f"节省 {duplicated_tokens - deduplicated_tokens} tokens")
+    print(f"去重耗时: {merge_time:.3f}s  {processed_mb / merge_time:.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行预处理扩展性测试
+对比不同进程数下预处理和分块的耗时，并检查结果与顺序处理一致
+
+用法: python benchmarks/bench_parallel_preprocess.py [--size-mb 50] [--workers 1,2,4,8,16] [--repeat 3]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.text_processor import TextProcessor
+from benchmarks.bench_overlap_dedup import build_book
+
+def build_raw_book(size_mb: float) -> str:
+    """生成未预处理的书稿：原始章节、小节标题，Windows 换行，多余空行和全角标点"""
+    book = build_book(size_mb)
+    book = re.sub(r'CH(\d+)-S(\d+) ', r'\1.\2 ', book)
+    book = re.sub(r'CH(\d+) ', r'第\1章 ', book)
+    return book.replace('\n\n', '\r\n\r\n  \r\n')
+
+def measure(processor: TextProcessor, file_path: str, repeat: int):
+    """返回最快一次的耗时（秒）和分块结果"""
+    best = float('inf')
+    views = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        views = processor.load_chunk_views(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best, views
+
+def main():
+    parser = argparse.ArgumentParser(description="并行预处理扩展性测试")
+    parser.add_argument('--size-mb', type=float, default=50)
+    parser.add_argument('--workers', default='1,2,4,8,16', help="逗号分隔的进程数列表")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+        f.write(build_raw_book(args.size_mb))
+        file_path = f.name
+    
+    try:
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        print(f"文本大小: {size_mb:.1f} MB，CPU核数: {os.cpu_count()}")
+        
+        baseline_time, baseline = measure(TextProcessor({}), file_path, args.repeat)
+        expected = [(view.start, view.end, view.overlap_start, view.overlap_end) for view in baseline]
+        print(f"顺序处理: {baseline_time:.3f}s  {size_mb / baseline_time:.1f} MB/s  {len(baseline)} 个块")
+        
+        for workers in [int(value) for value in args.workers.split(',')]:
+            processor = TextProcessor({'parallel_preprocessing': True, 'preprocess_workers': workers})
+            elapsed, views = measure(processor, file_path, args.repeat)
+            actual = [(view.start, view.end, view.overlap_start, view.overlap_end) for view in views]
+            assert views[0].source == baseline[0].source and actual == expected, f"{workers} 个进程的结果与顺序处理不一致"
+            print(f"{workers:>2} 个进程: {elapsed:.3f}s  {size_mb / elapsed:.1f} MB/s  "
+                  f"加速比 {baseline_time / elapsed:.2f}x")
+    finally:
+        os.unlink(file_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构索引性能测试
+在中文、英文和中英混合语料上测量预处理和分块时建立结构索引的额外耗时、输入文件哈希和
+换算字节位置的耗时，以及索引文件的大小、读取耗时和按编号定位后重新分块一个章节的耗时
+
+用法: python benchmarks/bench_structure_index.py [--size-mb 100] [--languages zh en mixed] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.text_processor import TextProcessor
+from core.structure_index import StructureIndex
+from benchmarks.corpus import LANGUAGES, build_corpus
+
+def measure(func, repeat: int):
+    """返回最快一次的耗时（秒）和结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="结构索引性能测试")
+    parser.add_argument('--size-mb', type=float, default=100)
+    parser.add_argument('--languages', nargs='+', choices=LANGUAGES, default=list(LANGUAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    processor = TextProcessor({})
+    for language in args.languages:
+        content = build_corpus(args.size_mb, language)
+        chunk_time, views = measure(lambda: processor.prepare_views(content), args.repeat)
+        build_time, _ = measure(lambda: processor.prepare_views(content, build_index=True), args.repeat)
+        processed = views[0].source
+        index = processor.structure_index
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = os.path.join(temp_dir, 'book.txt')
+            with open(input_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+            hash_time, content_hash = measure(lambda: StructureIndex.file_hash(input_file), args.repeat)
+            start = time.perf_counter()
+            with processor.open_mapped(input_file) as mapped:
+                index.resolve_byte_offsets(mapped, content_hash)
+            resolve_time = time.perf_counter() - start
+            
+            path = input_file + '.sidx'
+            index.save(path)
+            index_size = os.path.getsize(path)
+            load_time, loaded = measure(lambda: StructureIndex.load(path), args.repeat)
+        
+        label = loaded.entries('chapter')[loaded.count('chapter') // 2].label
+        seek_time, chapter_views = measure(lambda: processor.chunk_views(processed, start=loaded.find(label).char_start,
+                                                                         end=loaded.find(label).char_end), args.repeat)
+        
+        overhead = (build_time - chunk_time + hash_time) / chunk_time
+        print(f"{language:<6} 预处理+分块 {chunk_time:.3f}s  同时建立索引 {build_time:.3f}s  哈希 {hash_time:.3f}s "
+              f"(额外 {overhead:.0%})  换算字节位置 {resolve_time:.3f}s  "
+              f"索引 {index_size / 1024:.0f} KB 读取 {load_time * 1000:.1f}ms  "
+              f"重新分块 {label} {seek_time * 1000:.2f}ms ({len(chapter_views)} 块)  "
+              f"{index.count('chapter')} 章 {index.count('paragraph')} 段")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本结构分析性能测试
+在中文、英文和中英混合语料上对比逐项 split/findall 的旧实现与单遍扫描的
+analyze_text_structure，以及从文件流式扫描的 analyze_file_structure，并检查结果一致
+
+用法: python benchmarks/bench_structure_scan.py [--size-mb 100] [--languages zh en mixed] [--repeat 3]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+from typing import Any, Dict
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.text_processor import TextProcessor
+from benchmarks.corpus import LANGUAGES, build_corpus
+
+CHAPTER_PATTERN = re.compile(r'^CH\d+\s+(.+)$', re.MULTILINE)
+SECTION_PATTERN = re.compile(r'^CH\d+-S\d+\s+(.+)$', re.MULTILINE)
+QUOTE_PATTERN = re.compile(r'【([^】]+)】')
+LIST_PATTERN = re.compile(r'^[\s]*[-•]\s+(.+)$', re.MULTILINE)
+NUMBERED_LIST_PATTERN = re.compile(r'^[\s]*\d+\.\s+(.+)$', re.MULTILINE)
+
+def analyze_by_patterns(content: str) -> Dict[str, Any]:
+    """原实现：每项统计各遍历一次文本"""
+    return {
+        'total_characters': len(content),
+        'total_words': len(content.split()),
+        'total_lines': len(content.split('\n')),
+        'chapters': [{'number': i, 'title': title.strip()}
+                     for i, title in enumerate(CHAPTER_PATTERN.findall(content), 1)],
+        'sections': [{'title': title.strip()} for title in SECTION_PATTERN.findall(content)],
+        'paragraphs': len([p for p in content.split('\n\n') if p.strip()]),
+        'quotes': len(QUOTE_PATTERN.findall(content)),
+        'lists': len(LIST_PATTERN.findall(content)) + len(NUMBERED_LIST_PATTERN.findall(content))
+    }
+
+def measure(func, repeat: int):
+    """返回最快一次的耗时（秒）和结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="文本结构分析性能测试")
+    parser.add_argument('--size-mb', type=float, default=100)
+    parser.add_argument('--languages', nargs='+', choices=LANGUAGES, default=list(LANGUAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    processor = TextProcessor({})
+    for language in args.languages:
+        content = build_corpus(args.size_mb, language)
+        old_time, expected = measure(lambda: analyze_by_patterns(content), args.repeat)
+        new_time, result = measure(lambda: processor.analyze_text_structure(content), args.repeat)
+        assert result == expected, f"{language}: 单遍扫描结果与旧实现不一致"
+        
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+            f.write(content)
+            file_path = f.name
+        del content
+        try:
+            file_time, file_result = measure(lambda: processor.analyze_file_structure(file_path), args.repeat)
+            size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        finally:
+            os.unlink(file_path)
+        assert file_result == expected, f"{language}: 流式扫描结果与旧实现不一致"
+        
+        print(f"{language:<6} {size_mb:6.1f} MB  旧实现 {old_time:.3f}s  单遍扫描 {new_time:.3f}s "
+              f"(加速比 {old_time / new_time:.2f}x)  文件流式扫描 {file_time:.3f}s（含读取解码）  "
+              f"{expected['total_words']} 词 {expected['paragraphs']} 段 {len(expected['chapters'])} 章")
+
+if __name__ == "__main__":
+    main()
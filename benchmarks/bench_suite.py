@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+核心流水线性能测试套件
+在生成的语料上测试 TextProcessor、FormattingEngine、LLMCoordinator（本地桩服务器，
+延迟可配置）和端到端 DavidApp.process_text_file，结果保存为 JSON 基线，
+compare 命令对比两次结果并标出超过阈值的性能退化
+
+用法:
+    python benchmarks/bench_suite.py run [--size-mb 10] [--language zh] [--llm-latency 0.05]
+                                         [--output results.json] [--baseline baseline.json]
+    python benchmarks/bench_suite.py compare baseline.json results.json [--threshold 0.1]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, List, Tuple, Callable
+
+# 添加项目根目录到Python路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from core.text_processor import TextProcessor
+from core.llm_coordinator import LLMCoordinator
+from core.formatting_engine import FormattingEngine
+from core.profiler import PipelineProfiler, peak_rss
+from benchmarks.corpus import LANGUAGES, corpus_file
+from stub_llm_server import StubLLMServer
+
+logger = logging.getLogger(__name__)
+
+# 结果格式版本，指标含义变化时加一
+RESULTS_VERSION = 1
+
+# compare 对比的指标，均为越小越好
+COMPARED_METRICS = ('seconds', 'p50', 'p95', 'p99')
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """返回最快一次的耗时（秒）和最后一次的返回值"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def stub_llm_settings(base_url: str, concurrency: int) -> Dict[str, Any]:
+    """使用桩服务器、关闭响应缓存的设置"""
+    return {
+        'llm_dispatch_mode': 'async',
+        'llm_cache_enabled': False,
+        'llm_configs': [
+            {'name': 'stub_openai', 'api_key': 'bench', 'base_url': base_url, 'model': 'gpt-4',
+             'max_concurrency': concurrency}
+        ]
+    }
+
+def bench_text_processor(corpus: str, repeat: int) -> Dict[str, Any]:
+    """读取、预处理和分块"""
+    processor = TextProcessor({})
+    size_mb = os.path.getsize(corpus) / (1024 * 1024)
+    seconds, views = measure(lambda: processor.load_chunk_views(corpus), repeat)
+    return {'seconds': seconds, 'mb_per_s': size_mb / seconds, 'chunks': len(views)}
+
+def bench_formatting_engine(corpus: str, repeat: int) -> Dict[str, Any]:
+    """合并处理结果、去重叠并应用排版规则"""
+    views = TextProcessor({}).load_chunk_views(corpus)
+    coordinator = LLMCoordinator({'llm_configs': []})
+    processed = [coordinator._mock_llm_response(str(view), '') for view in views]
+    engine = FormattingEngine({})
+    size_mb = sum(len(chunk.encode('utf-8')) for chunk in processed) / (1024 * 1024)
+    seconds, formatted = measure(lambda: engine.format_text(processed, views), repeat)
+    return {'seconds': seconds, 'mb_per_s': size_mb / seconds, 'output_mb': len(formatted.encode('utf-8')) / (1024 * 1024)}
+
+def bench_llm_coordinator(corpus: str, repeat: int, latency: float, max_chunks: int,
+                          concurrency: int) -> Dict[str, Any]:
+    """通过桩服务器调度前 max_chunks 个文本块，记录吞吐量和每次调用的延迟分位数"""
+    views = TextProcessor({}).load_chunk_views(corpus)[:max_chunks]
+    with StubLLMServer(latency=latency) as stub:
+        coordinator = LLMCoordinator(stub_llm_settings(stub.base_url, concurrency))
+        profiler = PipelineProfiler()
+        
+        def run():
+            # 每次重复使用新的分析器，延迟分位数取自最后一次
+            nonlocal profiler
+            profiler = coordinator.profiler = PipelineProfiler()
+            return coordinator.process_chunks(views)
+        
+        seconds, _ = measure(run, repeat)
+        max_in_flight = stub.max_in_flight
+    
+    latency_summary = profiler.llm_latency()
+    return {
+        'seconds': seconds,
+        'chunks': len(views),
+        'chunks_per_s': len(views) / seconds,
+        'p50': latency_summary.get('p50', 0.0),
+        'p95': latency_summary.get('p95', 0.0),
+        'p99': latency_summary.get('p99', 0.0),
+        'max_in_flight': max_in_flight,
+        'stub_latency': latency
+    }
+
+def bench_end_to_end(corpus: str, repeat: int, latency: float, concurrency: int) -> Dict[str, Any]:
+    """DavidApp.process_text_file：读取、LLM处理（桩服务器）、排版、验证和写入"""
+    work_dir = tempfile.mkdtemp(prefix='david_bench_')
+    cwd = os.getcwd()
+    try:
+        # main 模块在导入时把日志写到工作目录下的 logs/david.log
+        os.chdir(work_dir)
+        os.makedirs('logs', exist_ok=True)
+        from main import DavidApp
+        
+        with StubLLMServer(latency=latency) as stub:
+            settings = stub_llm_settings(stub.base_url, concurrency)
+            settings.update({'temp_directory': os.path.join(work_dir, 'temp'), 'checkpoint_enabled': False})
+            config_file = os.path.join(work_dir, 'settings.json')
+            with open(config_file, 'w', encoding='utf-8') as f:
+                json.dump(settings, f)
+            
+            app = DavidApp(config_file)
+            output_file = os.path.join(work_dir, 'output.txt')
+            seconds, result = measure(lambda: app.process_text_file(corpus, output_file), repeat)
+        
+        if not result.success:
+            raise RuntimeError(f"端到端处理失败: {result.errors}")
+        size_mb = os.path.getsize(corpus) / (1024 * 1024)
+        return {
+            'seconds': seconds,
+            'mb_per_s': size_mb / seconds,
+            'stages': {name: stage['wall_time'] for name, stage in result.profile['stages'].items()},
+            'p50': result.profile['llm_latency'].get('p50', 0.0),
+            'p95': result.profile['llm_latency'].get('p95', 0.0),
+            'p99': result.profile['llm_latency'].get('p99', 0.0),
+            'stub_latency': latency
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_suite(args) -> Dict[str, Any]:
+    """运行所有（或 --only 指定的）测试"""
+    corpus = corpus_file(args.corpus_dir, args.size_mb, args.language, args.seed)
+    e2e_corpus = corpus_file(args.corpus_dir, args.e2e_size_mb, args.language, args.seed)
+    print(f"语料: {corpus} ({os.path.getsize(corpus) / (1024 * 1024):.1f} MB)")
+    
+    benchmarks = {
+        'text_processor': lambda: bench_text_processor(corpus, args.repeat),
+        'formatting_engine': lambda: bench_formatting_engine(corpus, args.repeat),
+        'llm_coordinator': lambda: bench_llm_coordinator(corpus, args.repeat, args.llm_latency,
+                                                         args.llm_chunks, args.llm_concurrency),
+        'end_to_end': lambda: bench_end_to_end(e2e_corpus, args.repeat, args.llm_latency, args.llm_concurrency)
+    }
+    selected = args.only.split(',') if args.only else list(benchmarks)
+    unknown = [name for name in selected if name not in benchmarks]
+    if unknown:
+        raise ValueError(f"未知的测试: {', '.join(unknown)}")
+    
+    results = run_benchmarks({name: benchmarks[name] for name in selected})
+    
+    return {
+        'version': RESULTS_VERSION,
+        'timestamp': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'parameters': {
+            'size_mb': args.size_mb,
+            'e2e_size_mb': args.e2e_size_mb,
+            'language': args.language,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'llm_latency': args.llm_latency,
+            'llm_chunks': args.llm_chunks,
+            'llm_concurrency': args.llm_concurrency
+        },
+        'peak_rss': peak_rss(),
+        'benchmarks': results
+    }
+
+def run_benchmarks(benchmarks: Dict[str, Callable[[], Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    依次运行各测试
+    
+    单个测试失败不影响其余测试和结果文件：缺少依赖模块（例如端到端测试导入 main 时
+    缺少 ui 包）记为 skipped，其他异常记为 error，两者都只记录原因、没有指标，
+    compare 时不参与对比。
+    """
+    results = {}
+    for name, benchmark in benchmarks.items():
+        print(f"运行 {name} ...")
+        try:
+            results[name] = benchmark()
+        except ImportError as e:
+            results[name] = {'status': 'skipped', 'reason': f"缺少依赖: {e}"}
+        except Exception as e:
+            logger.exception(f"测试 {name} 失败")
+            results[name] = {'status': 'error', 'reason': f"{type(e).__name__}: {e}"}
+        print(f"  {format_metrics(results[name])}")
+    return results
+
+def format_metrics(metrics: Dict[str, Any]) -> str:
+    """把一个测试的指标格式化为一行"""
+    parts = []
+    for key, value in metrics.items():
+        if isinstance(value, float):
+            parts.append(f"{key}={value:.4f}")
+        elif not isinstance(value, dict):
+            parts.append(f"{key}={value}")
+    return '  '.join(parts)
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float) -> List[Dict[str, Any]]:
+    """
+    对比两次结果
+    
+    Returns:
+        List[Dict[str, Any]]: 两次都有的每个指标的对比，regression 表示变慢超过阈值
+    """
+    rows = []
+    for name, metrics in current.get('benchmarks', {}).items():
+        base_metrics = baseline.get('benchmarks', {}).get(name)
+        if base_metrics is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = base_metrics.get(metric), metrics.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            rows.append({
+                'benchmark': name, 'metric': metric, 'baseline': before, 'current': after,
+                'change': change, 'regression': change > threshold
+            })
+    return rows
+
+def compare_files(baseline_file: str, current_file: str, threshold: float) -> bool:
+    """
+    对比两个结果文件并打印对比表
+    
+    Returns:
+        bool: 没有超过阈值的性能退化时返回 True
+    """
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_file, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    return print_comparison(baseline, current, threshold)
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> bool:
+    """打印对比表，返回是否没有性能退化"""
+    if baseline.get('version') != current.get('version'):
+        print("警告: 两次结果的格式版本不同，对比可能没有意义")
+    if baseline.get('parameters') != current.get('parameters'):
+        print(f"警告: 测试参数不同\n  基线: {baseline.get('parameters')}\n  本次: {current.get('parameters')}")
+    if baseline.get('environment') != current.get('environment'):
+        print("警告: 运行环境不同，耗时只能粗略对比")
+    
+    for name, metrics in current.get('benchmarks', {}).items():
+        if 'status' in metrics:
+            print(f"警告: 本次 {name} 没有结果（{metrics['status']}: {metrics.get('reason', '')}）")
+    
+    rows = compare_results(baseline, current, threshold)
+    print(f"{'测试':<20}{'指标':<10}{'基线':>12}{'本次':>12}{'变化':>10}")
+    for row in rows:
+        flag = '  退化' if row['regression'] else ''
+        print(f"{row['benchmark']:<20}{row['metric']:<10}{row['baseline']:>12.4f}{row['current']:>12.4f}"
+              f"{row['change']:>+10.1%}{flag}")
+    
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"发现 {len(regressions)} 项性能退化（阈值 {threshold:.0%}）")
+    else:
+        print(f"没有超过 {threshold:.0%} 的性能退化")
+    return not regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="核心流水线性能测试套件")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = subparsers.add_parser('run', help="运行测试并保存结果")
+    run_parser.add_argument('--size-mb', type=float, default=10, help="TextProcessor、FormattingEngine 和 LLMCoordinator 测试的语料大小")
+    run_parser.add_argument('--e2e-size-mb', type=float, default=1, help="端到端测试的语料大小")
+    run_parser.add_argument('--language', choices=LANGUAGES, default='zh')
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--llm-latency', type=float, default=0.05, help="桩服务器每个请求的延迟（秒）")
+    run_parser.add_argument('--llm-chunks', type=int, default=200, help="LLMCoordinator 测试处理的文本块数")
+    run_parser.add_argument('--llm-concurrency', type=int, default=32)
+    run_parser.add_argument('--only', help="逗号分隔的测试名称，默认运行全部")
+    run_parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'david_bench_corpus'),
+                            help="缓存生成语料的目录")
+    run_parser.add_argument('--output', default='bench_results.json')
+    run_parser.add_argument('--baseline', help="运行后与该基线对比")
+    run_parser.add_argument('--threshold', type=float, default=0.1, help="耗时增加超过该比例视为退化")
+    
+    compare_parser = subparsers.add_parser('compare', help="对比两次结果")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help="耗时增加超过该比例视为退化")
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    
+    if args.command == 'compare':
+        sys.exit(0 if compare_files(args.baseline, args.current, args.threshold) else 1)
+    
+    results = run_suite(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {args.output}")
+    
+    if args.baseline:
+        sys.exit(0 if compare_files(args.baseline, args.output, args.threshold) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能测试语料生成器
+生成带 CH/CH-S 章节结构的中文、英文或中英混合书稿，大小从 1 MB 到数百 MB，
+内容由固定种子决定，相同参数生成的文件完全相同
+
+用法: python benchmarks/corpus.py --size-mb 100 [--language zh|en|mixed] [--seed 1] [-o book.txt]
+"""
+
+import os
+import random
+import argparse
+from typing import Iterator, List
+
+LANGUAGES = ('zh', 'en', 'mixed')
+
+ZH_CHARACTERS = ("天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜"
+                 "金生丽水玉出昆冈剑号巨阙珠称夜光果珍李柰菜重芥姜海咸河淡鳞潜羽翔龙师火帝鸟官人皇"
+                 "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动")
+EN_WORDS = ("the of and to in is was that for it with as his on be at by had are but from or have an they "
+            "which one you were her all she there would their we him been has when who will more no if out "
+            "so said what up its about into than them can only other new some could time these two may then "
+            "do first any my now such like our over man me even most made after also did many before must "
+            "through back years where much your way well down should because each just those people how too "
+            "little state good very make world still own see men work long get here between both life being "
+            "under never day same another know while last might us great old year off come since against go "
+            "came right used take three").split()
+
+# 每种语言预先生成的句子数，段落从中抽取，保证生成数百 MB 时速度足够快
+_SENTENCE_POOL_SIZE = 4096
+
+def _zh_sentences(rng: random.Random) -> List[str]:
+    sentences = []
+    for _ in range(_SENTENCE_POOL_SIZE):
+        clauses = [''.join(rng.choices(ZH_CHARACTERS, k=rng.randint(4, 16))) for _ in range(rng.randint(1, 4))]
+        sentences.append('，'.join(clauses) + rng.choice('。。。！？'))
+    return sentences
+
+def _en_sentences(rng: random.Random) -> List[str]:
+    sentences = []
+    for _ in range(_SENTENCE_POOL_SIZE):
+        words = rng.choices(EN_WORDS, k=rng.randint(6, 24))
+        if len(words) > 10 and rng.random() < 0.5:
+            words[rng.randint(3, len(words) - 4)] += ','
+        sentences.append(' '.join(words).capitalize() + rng.choice('...!?'))
+    return sentences
+
+class CorpusGenerator:
+    """
+    语料生成器类
+    
+    每章包含章节标题（CHnn）和若干小节（CHnn-Smm），小节内是长短不一的段落，
+    穿插列表和【】引用，覆盖预处理、分块和排版规则的各种情况。
+    """
+    
+    def __init__(self, language: str = 'zh', seed: int = 1):
+        """
+        初始化生成器
+        
+        Args:
+            language: zh（中文）、en（英文）或 mixed（按段落混合）
+            seed: 随机种子
+        """
+        if language not in LANGUAGES:
+            raise ValueError(f"不支持的语言: {language}")
+        self.language = language
+        self.rng = random.Random(seed)
+        self.zh = _zh_sentences(self.rng) if language != 'en' else []
+        self.en = _en_sentences(self.rng) if language != 'zh' else []
+    
+    def _sentences(self) -> List[str]:
+        if self.language == 'mixed':
+            return self.zh if self.rng.random() < 0.5 else self.en
+        return self.zh or self.en
+    
+    def _paragraph(self, max_sentences: int = 8) -> str:
+        sentences = self._sentences()
+        separator = '' if sentences is self.zh else ' '
+        return separator.join(self.rng.choices(sentences, k=self.rng.randint(1, max_sentences)))
+    
+    def _title(self, number: int, section: int = 0) -> str:
+        if self.language == 'en' or (self.language == 'mixed' and number % 2 == 0):
+            return f"Section {section}" if section else f"Chapter {number}"
+        return f"第{section}节" if section else f"第{number}章"
+    
+    def chapter(self, number: int) -> str:
+        """生成第 number 章"""
+        rng = self.rng
+        parts = [f"CH{number:02d} {self._title(number)}"]
+        for section in range(1, rng.randint(2, 5)):
+            parts.append(f"CH{number:02d}-S{section:02d} {self._title(number, section)}")
+            for _ in range(rng.randint(3, 12)):
+                kind = rng.random()
+                if kind < 0.08:
+                    parts.append('\n'.join(f"- {self._paragraph(1)}" for _ in range(rng.randint(2, 5))))
+                elif kind < 0.14:
+                    parts.append('\n'.join(f"{i}. {self._paragraph(1)}" for i in range(1, rng.randint(3, 6))))
+                elif kind < 0.22:
+                    parts.append(f"【{self._paragraph(3)}】")
+                else:
+                    parts.append(self._paragraph())
+        return '\n\n'.join(parts)
+    
+    def iter_chapters(self, size_mb: float) -> Iterator[str]:
+        """逐章生成，直到总大小（UTF-8 字节）达到 size_mb，章与章之间用空行分隔"""
+        target = int(size_mb * 1024 * 1024)
+        written = 0
+        number = 0
+        while written < target:
+            number += 1
+            text = self.chapter(number) if number == 1 else '\n\n' + self.chapter(number)
+            written += len(text.encode('utf-8'))
+            yield text
+
+def build_corpus(size_mb: float, language: str = 'zh', seed: int = 1) -> str:
+    """生成语料文本"""
+    return ''.join(CorpusGenerator(language, seed).iter_chapters(size_mb))
+
+def write_corpus(path: str, size_mb: float, language: str = 'zh', seed: int = 1) -> str:
+    """
+    逐章写入语料文件，不在内存中保留整本书稿
+    
+    Returns:
+        str: 文件路径
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for text in CorpusGenerator(language, seed).iter_chapters(size_mb):
+            f.write(text)
+    return path
+
+def corpus_file(directory: str, size_mb: float, language: str = 'zh', seed: int = 1) -> str:
+    """获取缓存的语料文件，不存在时生成"""
+    path = os.path.join(directory, f"corpus_{language}_{size_mb:g}mb_seed{seed}.txt")
+    if not os.path.exists(path):
+        temp_path = f"{path}.tmp"
+        write_corpus(temp_path, size_mb, language, seed)
+        os.replace(temp_path, path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="性能测试语料生成器")
+    parser.add_argument('--size-mb', type=float, default=10)
+    parser.add_argument('--language', choices=LANGUAGES, default='zh')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', help="输出文件，默认 corpus_<语言>_<大小>mb_seed<种子>.txt")
+    args = parser.parse_args()
+    
+    output = args.output or f"corpus_{args.language}_{args.size_mb:g}mb_seed{args.seed}.txt"
+    write_corpus(output, args.size_mb, args.language, args.seed)
+    print(f"语料已生成: {output} ({os.path.getsize(output) / (1024 * 1024):.1f} MB)")
+
+if __name__ == "__main__":
+    main()
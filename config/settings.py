@@ -11,6 +11,8 @@ import logging
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+from core.text_normalizer import TextNormalizer
+
 logger = logging.getLogger(__name__)
 
 class Settings:
@@ -30,15 +32,44 @@ class Settings:
             # 文本处理设置
             'chunk_size': 4000,
             'overlap_size': 200,
+            'deduplicate_overlap': True,  # 合并处理结果时去掉块之间重叠内容的重复输出
+            'stream_read_size': 64 * 1024,  # 流式读取时每次读取的字符数
+            'mmap_min_size': 64 * 1024 * 1024,  # 不小于该字节数的文件通过 mmap 按窗口解码
+            'mmap_window_size': 1024 * 1024,  # mmap 读取时每次解码的字节数
+            'chunking_mode': 'characters',  # characters: 按字符数, tokens: 按模型token预算
+            'token_fill_ratio': 0.8,
+            'parallel_preprocessing': False,  # 大文件按章节在进程池中并行预处理和分块
+            'preprocess_workers': 0,  # 并行预处理的进程数，0 表示CPU核数
+            'structure_index_enabled': True,  # 在输入文件旁边保存结构索引（.sidx），记录章节、段落等的偏移
+            'normalization': {  # 预处理时的字符规范化，见 core/text_normalizer.py；映射到自身可关闭默认映射
+                # 弯引号默认保留，需要转直引号时加入 '“': '"', '”': '"', '‘': "'", '’': "'"
+                'replacements': {'（': '(', '）': ')', '，': ',', '。': '.', '；': ';', '：': ':'},
+                'fullwidth_ascii': False,  # 全角字母、数字和符号（U+FF01-U+FF5E）转半角
+                'delete_characters': '',  # 删除的字符，例如 '□■▪▫▬▭▮▯'
+                'collapse_spaces': True  # 合并连续的空格
+            },
             
             # LLM协调设置
             'max_concurrent_tasks': 3,
             'retry_attempts': 3,
-            'retry_delay': 1.0,
+            'retry_delay': 1.0,  # 指数退避的初始等待时间（秒）
+            'retry_max_delay': 30.0,
+            'retry_budget_ratio': 0.1,  # 每个文档的重试次数上限占块数的比例
+            'retry_min_budget': 10,
+            'circuit_failure_threshold': 5,  # LLM连续失败多少次后熔断
+            'circuit_reset_timeout': 30.0,  # 熔断后多久发送试探请求（秒）
+            'llm_dispatch_mode': 'thread',  # thread: 线程池, async: 异步HTTP调用
+            'async_max_in_flight': 256,
+            'llm_streaming': False,  # 异步调度时以流式响应（SSE）接收LLM输出
+            'http_pool_size': 100,
+            'http_keepalive_timeout': 30,
+            'adaptive_concurrency': True,  # 按限流和超时自动调整各LLM的并发数（AIMD）
+            'initial_concurrency': 4,
             
             # 内容验证设置
             'min_similarity_threshold': 0.95,
             'max_content_loss_threshold': 0.05,
+            'validation_workers': 0,  # 并行验证的进程数，0 表示CPU核数
             
             # LLM配置
             'llm_configs': [
@@ -50,7 +81,9 @@ class Settings:
                     'max_tokens': 4000,
                     'temperature': 0.7,
                     'timeout': 30,
-                    'priority': 1
+                    'priority': 1,
+                    'requests_per_minute': 0,  # 每分钟请求数上限，0 表示不限制
+                    'tokens_per_minute': 0  # 每分钟token数上限，0 表示不限制
                 },
                 {
                     'name': 'claude_3',
@@ -60,12 +93,16 @@ class Settings:
                     'max_tokens': 4000,
                     'temperature': 0.7,
                     'timeout': 30,
-                    'priority': 2
+                    'priority': 2,
+                    'requests_per_minute': 0,  # 每分钟请求数上限，0 表示不限制
+                    'tokens_per_minute': 0  # 每分钟token数上限，0 表示不限制
                 }
             ],
             
             # 输出设置
             'output_format': 'html',  # html, word, plain
+            'streaming_output': False,  # 按顺序完成的块立即排版并写入输出文件
+            'incremental_formatting': False,  # 保存块的处理结果和排版片段，重新处理同一文件时只处理改动的块
             'output_directory': 'output',
             'backup_original': True,
             
@@ -79,6 +116,11 @@ class Settings:
             'max_memory_usage': 1024 * 1024 * 1024,  # 1GB
             'temp_directory': 'temp',
             'cleanup_temp_files': True,
+            'checkpoint_enabled': True,  # 在 temp_directory/jobs 下记录已完成的文本块，中断后可按任务ID恢复
+            'checkpoint_fsync_interval': 1.0,  # 检查点批量写入并 fsync 的间隔（秒）
+            'llm_cache_enabled': True,  # 在 temp_directory/llm_cache 下缓存LLM响应
+            'llm_cache_max_size': 512 * 1024 * 1024,  # 512MB
+            'profile_trace': False,  # 导出 Chrome trace 到 temp_directory/traces（批处理时为输出目录下的 batch_trace.json）
             
             # 安全设置
             'max_file_size': 100 * 1024 * 1024,  # 100MB
@@ -177,6 +219,19 @@ class Settings:
         if not isinstance(self.get('max_concurrent_tasks'), int) or self.get('max_concurrent_tasks') <= 0:
             errors.append("max_concurrent_tasks 必须是正整数")
         
+        if self.get('chunking_mode') not in ('characters', 'tokens'):
+            errors.append("chunking_mode 必须是 characters 或 tokens")
+        
+        fill_ratio = self.get('token_fill_ratio')
+        if not isinstance(fill_ratio, (int, float)) or not 0 < fill_ratio <= 1:
+            errors.append("token_fill_ratio 必须是大于0且不超过1的数值")
+        
+        # 验证字符规范化设置
+        try:
+            TextNormalizer.from_config(self.get('normalization'))
+        except (TypeError, ValueError, AttributeError) as e:
+            errors.append(f"normalization 无效: {e}")
+        
         # 验证阈值设置
         similarity_threshold = self.get('min_similarity_threshold')
         if not isinstance(similarity_threshold, (int, float)) or not 0 <= similarity_threshold <= 1:
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务检查点日志模块
+负责在LLM处理过程中持久化已完成的文本块，任务中断后按任务ID恢复
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Union, Callable
+
+from core.text_processor import ChunkView
+
+logger = logging.getLogger(__name__)
+
+# 日志格式版本，记录结构变化时加一，使旧日志失效
+_JOURNAL_VERSION = 1
+
+class CheckpointJournal:
+    """
+    任务检查点日志类
+    
+    每个任务对应一个只追加的 JSON Lines 文件：第一行记录任务信息（输入、输出文件和
+    处理配置指纹），之后每个完成的 ProcessingTask 追加一行，包含块的 SHA-256、
+    处理结果、LLM 和用时。
+    
+    工作线程完成任务时只把记录放进内存队列；后台线程每隔 fsync_interval 秒
+    把积累的记录一次写入并 fsync（组提交），热路径上没有磁盘 I/O。
+    进程崩溃时最多丢失最后一个间隔内完成的块，末尾写了一半的行在下次加载时截掉。
+    """
+    
+    def __init__(self, path: str, fingerprint: str, info: Optional[Dict[str, Any]] = None,
+                 fsync_interval: float = 1.0):
+        """
+        初始化检查点日志
+        
+        Args:
+            path: 日志文件路径
+            fingerprint: 处理配置的指纹，与日志中记录的不同时不复用任何结果
+            info: 写入日志头的任务信息（例如输入、输出文件），恢复任务时读取
+            fsync_interval: 批量写入并 fsync 的间隔（秒）
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.info = dict(info or {})
+        self.fsync_interval = fsync_interval
+        self._results: Dict[str, str] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._file = None
+        self._flusher: Optional[threading.Thread] = None
+        self.resumed_chunks = 0
+        self.recorded_chunks = 0
+        self.fsync_count = 0
+        
+        self._open()
+    
+    @staticmethod
+    def make_key(text: str) -> str:
+        """计算文本块的哈希"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def read_info(path: str) -> Dict[str, Any]:
+        """读取日志头中的任务信息，用于按任务ID恢复"""
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+        return header.get('info', {})
+    
+    def _open(self):
+        """加载已有的记录并打开日志文件用于追加，指纹不符时重新开始"""
+        valid_length = self._load()
+        
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if valid_length:
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(valid_length)
+            self._file.seek(valid_length)
+        else:
+            self._file = open(self.path, 'wb')
+            header = {'version': _JOURNAL_VERSION, 'fingerprint': self.fingerprint, 'info': self.info}
+            self._file.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n')
+            self._sync()
+        
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+    
+    def _load(self) -> int:
+        """
+        读取日志中完整的记录
+        
+        Returns:
+            int: 最后一条完整记录之后的字节位置，日志不存在或失效时返回 0
+        """
+        if not os.path.exists(self.path):
+            return 0
+        
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"读取检查点日志失败: {e}")
+            return 0
+        
+        position = 0
+        records = []
+        while True:
+            end = data.find(b'\n', position)
+            if end < 0:
+                break
+            try:
+                records.append(json.loads(data[position:end]))
+            except ValueError:
+                break
+            position = end + 1
+        
+        if not records:
+            return 0
+        header = records[0]
+        if header.get('version') != _JOURNAL_VERSION or header.get('fingerprint') != self.fingerprint:
+            logger.info("处理配置已改变，检查点日志失效")
+            return 0
+        
+        self.info = {**header.get('info', {}), **self.info}
+        for record in records[1:]:
+            self._results[record['key']] = record['result']
+        
+        if position < len(data):
+            logger.warning(f"检查点日志末尾有 {len(data) - position} 字节不完整的记录，已截掉")
+        logger.info(f"加载检查点日志: {len(self._results)} 个已完成的文本块")
+        return position
+    
+    def process_chunks(self, chunks: List[Union[str, ChunkView]],
+                       process: Callable[..., List[str]]) -> List[str]:
+        """
+        获取所有块的处理结果，跳过日志中已完成的块，其余块处理完成时逐个记录
+        
+        Args:
+            chunks: 原始文本块或文本块视图
+            process: process(chunks, on_task_done) 处理一组块并按顺序返回结果，
+                     每个任务结束时调用 on_task_done（例如 LLMCoordinator.process_chunks）
+        
+        Returns:
+            List[str]: 按原始顺序排列的处理结果
+        """
+        keys = [self.make_key(str(chunk)) for chunk in chunks]
+        results: List[Optional[str]] = [self._results.get(key) for key in keys]
+        remaining = [index for index, result in enumerate(results) if result is None]
+        self.resumed_chunks += len(chunks) - len(remaining)
+        
+        if len(remaining) < len(chunks):
+            logger.info(f"从检查点恢复: 跳过 {len(chunks) - len(remaining)}/{len(chunks)} 个已完成的文本块")
+        
+        if remaining:
+            def on_task_done(task):
+                if task.status == 'completed' and task.result:
+                    index = remaining[task.chunk_id]
+                    self.record(keys[index], index, task)
+            
+            processed = process([chunks[index] for index in remaining], on_task_done)
+            for index, result in zip(remaining, processed):
+                results[index] = result
+        
+        return results
+    
+    def record(self, key: str, index: int, task: Any):
+        """记录一个完成的任务，只放进内存队列，由后台线程写入"""
+        entry = {
+            'key': key,
+            'chunk_id': index,
+            'llm': task.assigned_llm,
+            'processing_time': task.processing_time,
+            'retry_count': task.retry_count,
+            'result': task.result
+        }
+        with self._lock:
+            self._pending.append(entry)
+            self._results[key] = task.result
+            self.recorded_chunks += 1
+    
+    def _flush_loop(self):
+        """后台线程：按间隔批量写入"""
+        while not self._stop.wait(self.fsync_interval):
+            self.flush()
+    
+    def flush(self):
+        """把积累的记录一次写入并 fsync"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or self._file is None:
+            return
+        
+        data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in pending)
+        try:
+            self._file.write(data.encode('utf-8'))
+            self._sync()
+        except (OSError, ValueError) as e:
+            logger.warning(f"写入检查点日志失败: {e}")
+    
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsync_count += 1
+    
+    def close(self):
+        """停止后台线程，写入剩余记录并关闭日志"""
+        if self._file is None:
+            return
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._file.close()
+        self._file = None
+    
+    def discard(self):
+        """任务完成后关闭并删除日志"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"删除检查点日志失败: {e}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取检查点统计信息"""
+        return {
+            'resumed_chunks': self.resumed_chunks,
+            'recorded_chunks': self.recorded_chunks,
+            'fsync_count': self.fsync_count
+        }
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本块合并模块
+负责在合并处理后的文本块时去掉重叠区域的重复内容
+"""
+
+import logging
+from itertools import zip_longest
+from typing import List, Dict, Any, Tuple, Union, Iterable, Iterator, Sequence
+
+from core.text_processor import ChunkView
+
+logger = logging.getLogger(__name__)
+
+# 对齐时忽略的字符：LLM常对同一段文字增减缩进、空行和加粗标记
+_IGNORED_CHARS = frozenset('*')
+
+# 锚点搜索时取块正文开头的字符数
+_ANCHOR_LENGTH = 16
+
+# 对齐得到的重复长度最多比重叠内容长这么多（规范化字符）：LLM可能在重叠处增加少量标点或标记
+_OVERLAP_TOLERANCE = 16
+
+def _normalize(text: str) -> Tuple[str, List[int]]:
+    """去掉空白和加粗标记，返回规范化文本及每个字符在原文中的位置"""
+    chars = []
+    positions = []
+    for index, char in enumerate(text):
+        if char.isspace() or char in _IGNORED_CHARS:
+            continue
+        chars.append(char)
+        positions.append(index)
+    return ''.join(chars), positions
+
+def _suffix_prefix_overlaps(text: str, pattern: str) -> List[int]:
+    """pattern 的前缀同时是 text 的后缀时所有可能的长度，从长到短（KMP，线性时间）"""
+    if not pattern or not text:
+        return []
+    
+    failure = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        while k and pattern[i] != pattern[k]:
+            k = failure[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        failure[i] = k
+    
+    k = 0
+    for char in text:
+        while k and (k == len(pattern) or char != pattern[k]):
+            k = failure[k - 1]
+        if char == pattern[k]:
+            k += 1
+    
+    # 最长重合的所有边界也是重合长度
+    lengths = []
+    while k:
+        lengths.append(k)
+        k = failure[k - 1]
+    return lengths
+
+def _closest(candidates: Iterable[int], target: int) -> int:
+    """在重叠长度允许的范围内选出最接近 target 的候选位置，没有时返回 0"""
+    low, high = (target + 1) // 2, target + _OVERLAP_TOLERANCE
+    return min((c for c in candidates if low <= c <= high), key=lambda c: (abs(c - target), c), default=0)
+
+class ChunkMerger:
+    """
+    重叠去重类
+    
+    每个块开头的重叠内容（ChunkView 的 overlap 区域）在前一个块的末尾已经出现过，
+    LLM 处理后两处都会输出。合并时把当前块开头与前一块末尾对齐，去掉当前块中重复的部分：
+    1. 在忽略空白和加粗标记后，求前一块末尾与当前块开头所有的后缀/前缀重合长度（KMP）
+    2. 否则在当前块开头查找原始块正文开头的锚点，锚点之前视为重叠内容
+    3. 都找不到时保留原样
+    重合长度或锚点位置必须在重叠内容长度的一半到重叠长度加少量容差之间，有多个时取最接近
+    重叠长度的一个，避免重复性很强的文本（同一个字或句子反复出现）把正文当作重叠内容删掉。
+    只在两块衔接处重叠长度两倍左右的窗口内比较，总耗时与文本长度成线性关系。
+    """
+    
+    def __init__(self):
+        """初始化重叠去重"""
+        self.aligned = 0  # 后缀/前缀对齐成功的块数
+        self.anchored = 0  # 锚点对齐成功的块数
+        self.unaligned = 0  # 无法对齐、保留原样的块数
+        self.removed_chars = 0
+    
+    def merge(self, chunks: Iterable[Union[str, ChunkView]],
+              sources: Sequence[Union[str, ChunkView]]) -> Iterator[str]:
+        """
+        逐块去掉重叠的重复内容
+        
+        Args:
+            chunks: 处理后的文本块，与 sources 一一对应
+            sources: 原始文本块视图，提供重叠区域信息；字符串块没有重叠信息，原样保留
+        
+        Yields:
+            str: 去重后的文本块
+        """
+        previous = None
+        for chunk, source in zip_longest(chunks, sources):
+            if chunk is None:
+                break
+            
+            text = str(chunk)
+            trimmed = text
+            if previous is not None and isinstance(source, ChunkView) and source.overlap_length:
+                trimmed = self.trim(previous, text, source)
+            previous = text
+            yield trimmed
+    
+    def trim(self, previous: str, current: str, source: ChunkView) -> str:
+        """
+        去掉当前块开头与前一块末尾重复的内容
+        
+        Args:
+            previous: 前一个处理后的块
+            current: 当前处理后的块
+            source: 当前块的原始视图
+        
+        Returns:
+            str: 去重后的当前块
+        """
+        window = 2 * source.overlap_length + 64
+        head, head_positions = _normalize(current[:window])
+        tail, _ = _normalize(previous[-window:])
+        overlap, _ = _normalize(source.overlap())
+        
+        matched = _closest(_suffix_prefix_overlaps(tail, head), len(overlap))
+        if matched:
+            self.aligned += 1
+            return self._cut(current, head_positions, matched, window)
+        
+        anchor, _ = _normalize(source.body()[:_ANCHOR_LENGTH * 4])
+        anchor = anchor[:_ANCHOR_LENGTH]
+        found = _closest(self._occurrences(head, anchor), len(overlap)) if anchor else 0
+        if found:
+            self.anchored += 1
+            return self._cut(current, head_positions, found, window)
+        
+        self.unaligned += 1
+        logger.debug(f"无法对齐重叠内容，保留原样: {current[:30]!r}")
+        return current
+    
+    @staticmethod
+    def _occurrences(text: str, anchor: str) -> Iterator[int]:
+        """anchor 在 text 中出现的所有位置"""
+        found = text.find(anchor)
+        while found >= 0:
+            yield found
+            found = text.find(anchor, found + 1)
+    
+    def _cut(self, current: str, positions: List[int], count: int, window: int) -> str:
+        """
+        在第 count 个规范化字符之前切开，返回后半部分
+        
+        两个规范化字符之间只有空白和加粗标记：其中有换行时从最后一个换行之后切开，
+        下一行的缩进和开头的加粗标记归后半部分；没有换行时紧跟的加粗标记是前半部分的结尾。
+        """
+        start = positions[count - 1] + 1 if count else 0
+        end = positions[count] if count < len(positions) else min(window, len(current))
+        gap = current[start:end]
+        
+        newline = gap.rfind('\n')
+        if newline >= 0:
+            cut = start + newline + 1
+        else:
+            cut = start + len(gap) - len(gap.lstrip('*'))
+        
+        self.removed_chars += cut
+        return current[cut:]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取去重统计信息"""
+        return {
+            'aligned_chunks': self.aligned,
+            'anchored_chunks': self.anchored,
+            'unaligned_chunks': self.unaligned,
+            'removed_chars': self.removed_chars
+        }
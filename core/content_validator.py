@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容验证器模块
+负责检查LLM处理和排版后没有丢失原文内容
+"""
+
+import os
+import re
+import time
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Tuple, Union, Sequence
+
+from core.text_processor import ChunkView
+
+logger = logging.getLogger(__name__)
+
+# HTML标签：排版输出中的标签不属于正文
+_TAG_PATTERN = re.compile(r'<[^<>\n]*>')
+# 分隔符：空白、标点和排版标记，把文本切成按内容定界的片段（短语、词）
+_SEPARATOR_PATTERN = re.compile(r'[\s，。！？；：、,.!?;:*#\-【】「」『』《》（）()\[\]"“”‘’]+')
+# 章节标题
+_HEADER_PATTERN = re.compile(r'CH\d+(?:-S\d+)?')
+
+# 总长度低于该值时在当前进程内验证，避免启动进程池的开销
+_PARALLEL_MIN_SIZE = 1024 * 1024
+
+def _shingles(text: str) -> List[str]:
+    """把文本切成按内容定界的片段：去掉HTML标签后按空白、标点和排版标记切分"""
+    if '<' in text:
+        text = _TAG_PATTERN.sub(' ', text)
+    return _SEPARATOR_PATTERN.split(text)
+
+def _chunk_loss(original: str, processed: str) -> Tuple[int, int]:
+    """
+    计算单个块丢失的内容
+    
+    Returns:
+        Tuple[int, int]: (丢失的字符数, 原文片段的总字符数)
+    """
+    original_shingles = _shingles(original)
+    missing = Counter(original_shingles)
+    missing.subtract(_shingles(processed))
+    lost = sum(len(shingle) * count for shingle, count in missing.items() if count > 0)
+    return lost, sum(map(len, original_shingles))
+
+def _chunk_losses(pairs: Sequence[Tuple[str, str]]) -> List[Tuple[int, int]]:
+    """在工作进程中计算一批块的丢失内容"""
+    return [_chunk_loss(original, processed) for original, processed in pairs]
+
+@dataclass
+class ValidationResult:
+    """验证结果类"""
+    is_valid: bool
+    similarity_score: float  # 原文内容在排版结果中保留的比例
+    content_loss_ratio: float = 0.0  # LLM处理中丢失的原文比例
+    chunk_loss_ratios: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    validation_time: float = 0.0
+
+class ContentValidator:
+    """
+    内容验证器类
+    
+    原文、LLM处理结果和排版结果都按空白、标点和排版标记切成片段（中文为短语，英文为词），
+    片段的哈希计数在 C 实现的 Counter/集合中完成，总耗时与文本长度成线性关系：
+    - 逐块比较原文与处理结果的片段多重集，原文片段中缺失部分的字符数即为该块的丢失量，
+      各块在进程池中并行计算
+    - 整体比较原文正文与排版结果，得到原文内容在最终输出中保留的比例（相似度）
+    - 检查章节标题和引用的数量
+    """
+    
+    def __init__(self, settings):
+        """初始化内容验证器"""
+        self.settings = settings
+        self.min_similarity = settings.get('min_similarity_threshold', 0.95)
+        self.max_content_loss = settings.get('max_content_loss_threshold', 0.05)
+        self.max_workers = settings.get('validation_workers', 0) or os.cpu_count() or 1
+        
+        logger.info("内容验证器初始化完成")
+    
+    def validate_content(self, original_chunks: Sequence[Union[str, ChunkView]], processed_chunks: Sequence[str],
+                         formatted_text: str) -> ValidationResult:
+        """
+        验证内容完整性
+        
+        Args:
+            original_chunks: 原始文本块或文本块视图
+            processed_chunks: 与原始文本块一一对应的LLM处理结果
+            formatted_text: 排版后的文本
+        
+        Returns:
+            ValidationResult: 验证结果
+        """
+        start_time = time.time()
+        errors = []
+        warnings = []
+        
+        if len(original_chunks) != len(processed_chunks):
+            errors.append(f"处理结果数量 {len(processed_chunks)} 与文本块数量 {len(original_chunks)} 不一致")
+        
+        originals = [str(chunk) for chunk in original_chunks]
+        losses = self._compute_chunk_losses(list(zip(originals, processed_chunks)))
+        
+        chunk_loss_ratios = [lost / total if total else 0.0 for lost, total in losses]
+        total_lost = sum(lost for lost, _ in losses)
+        total_length = sum(total for _, total in losses)
+        content_loss_ratio = total_lost / total_length if total_length else 0.0
+        
+        for index, ratio in enumerate(chunk_loss_ratios):
+            if ratio > self.max_content_loss:
+                warnings.append(f"第 {index + 1} 个文本块丢失 {ratio:.1%} 的内容")
+        if content_loss_ratio > self.max_content_loss:
+            errors.append(f"LLM处理丢失 {content_loss_ratio:.1%} 的内容，超过阈值 {self.max_content_loss:.1%}")
+        
+        bodies = [chunk.body() if isinstance(chunk, ChunkView) else str(chunk) for chunk in original_chunks]
+        similarity_score = self._containment('\n'.join(bodies), formatted_text)
+        if similarity_score < self.min_similarity:
+            errors.append(f"排版结果只保留了 {similarity_score:.1%} 的原文内容，低于阈值 {self.min_similarity:.1%}")
+        
+        warnings.extend(self._check_structure(bodies, processed_chunks))
+        
+        validation_time = time.time() - start_time
+        logger.info(f"内容验证完成: 相似度 {similarity_score:.3f}，丢失比例 {content_loss_ratio:.3f}，"
+                    f"用时 {validation_time:.2f}秒")
+        
+        return ValidationResult(
+            is_valid=not errors,
+            similarity_score=similarity_score,
+            content_loss_ratio=content_loss_ratio,
+            chunk_loss_ratios=chunk_loss_ratios,
+            errors=errors,
+            warnings=warnings,
+            validation_time=validation_time
+        )
+    
+    def _compute_chunk_losses(self, pairs: List[Tuple[str, str]]) -> List[Tuple[int, int]]:
+        """逐块计算丢失内容，文本较大时在进程池中并行"""
+        total_size = sum(len(original) + len(processed) for original, processed in pairs)
+        workers = min(self.max_workers, len(pairs))
+        if workers <= 1 or total_size < _PARALLEL_MIN_SIZE:
+            return _chunk_losses(pairs)
+        
+        # 每个工作进程分几批，批内连续的块一起传输，减少进程间通信次数
+        batch_size = max(1, len(pairs) // (workers * 4))
+        batches = [pairs[start:start + batch_size] for start in range(0, len(pairs), batch_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return [loss for batch in executor.map(_chunk_losses, batches) for loss in batch]
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"并行验证失败，改为顺序验证: {e}")
+            return _chunk_losses(pairs)
+    
+    @staticmethod
+    def _containment(original: str, formatted: str) -> float:
+        """原文片段（按字符数加权）出现在排版结果中的比例"""
+        original_shingles = _shingles(original)
+        total = sum(map(len, original_shingles))
+        if not total:
+            return 1.0
+        
+        missing = set(original_shingles).difference(_shingles(formatted))
+        if not missing:
+            return 1.0
+        lost = sum(len(shingle) for shingle in original_shingles if shingle in missing)
+        return 1.0 - lost / total
+    
+    @staticmethod
+    def _check_structure(bodies: List[str], processed_chunks: Sequence[str]) -> List[str]:
+        """检查章节标题和引用没有在LLM处理中丢失"""
+        warnings = []
+        checks = [
+            ("章节标题", lambda text: len(_HEADER_PATTERN.findall(text))),
+            ("引用", lambda text: text.count('【'))
+        ]
+        for name, count in checks:
+            expected = sum(count(body) for body in bodies)
+            # 处理结果包含重叠内容，数量不少于原文即可
+            actual = sum(count(chunk) for chunk in processed_chunks)
+            if actual < expected:
+                warnings.append(f"{name}数量从 {expected} 个减少到 {actual} 个")
+        return warnings
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编码检测模块
+负责检测文本文件的编码并只解码一次读取全文，供各个前端共用
+"""
+
+import io
+import re
+import codecs
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 按优先级排列的候选编码（GB2312 是 GBK 的子集，不单独尝试；latin-1 能解码任何字节，作为兜底）
+CANDIDATE_ENCODINGS = ('utf-8', 'gbk', 'utf-16-le', 'utf-16-be', 'latin-1')
+
+# 字节顺序标记，较长的在前（UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头）
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+# 正常文本中几乎不会出现的字符：控制字符（制表、换行、换页除外）、C1 控制字符、替换字符和私用区字符，
+# 用错编码解码时通常会大量出现
+_SUSPICIOUS_PATTERN = re.compile('[\x00-\x08\x0b\x0e-\x1f\x7f-\x9f\ufffd\ue000-\uf8ff]')
+
+# 可疑字符比例不超过该值的候选编码直接采用，否则取可疑字符最少的
+_ACCEPT_RATIO = 0.001
+
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+@dataclass
+class EncodingGuess:
+    """编码检测结果"""
+    encoding: str
+    confidence: float  # 样本中正常字符的比例
+    bom: bool = False
+
+def sniff_encoding(sample: bytes, complete: bool = False,
+                   candidates: Sequence[str] = CANDIDATE_ENCODINGS, check_bom: bool = True) -> EncodingGuess:
+    """
+    检测字节样本的编码
+    
+    先检查 BOM；没有 BOM 时用增量解码器逐个解码样本（样本在多字节字符中间截断不算错误），
+    解码成功的候选按可疑字符的比例打分。
+    
+    Args:
+        sample: 文件开头的字节
+        complete: 样本是否为整个文件
+        candidates: 按优先级排列的候选编码
+        check_bom: 是否检查 BOM
+    
+    Returns:
+        EncodingGuess: 检测结果
+    """
+    if check_bom:
+        for bom, encoding in _BOMS:
+            if sample.startswith(bom):
+                return EncodingGuess(encoding, 1.0, bom=True)
+    
+    # 不带 BOM 的 UTF-16 中，换行、空格和英文字母的高位字节是 NUL：LE 时在奇数位置，BE 时在偶数位置。
+    # 没有 NUL 字节时几乎不可能是 UTF-16，只尝试 NUL 较多一侧对应的字节序
+    even_nul = sample[0::2].count(0)
+    odd_nul = sample[1::2].count(0)
+    skipped = set()
+    if odd_nul <= even_nul:
+        skipped.add('utf-16-le')
+    if even_nul <= odd_nul:
+        skipped.add('utf-16-be')
+    
+    best: Optional[EncodingGuess] = None
+    for encoding in candidates:
+        if encoding in skipped:
+            continue
+        decoder = codecs.getincrementaldecoder(encoding)('strict')
+        try:
+            text = decoder.decode(sample, final=complete)
+        except UnicodeDecodeError:
+            continue
+        
+        if not text:
+            confidence = 1.0
+        else:
+            confidence = 1.0 - len(_SUSPICIOUS_PATTERN.findall(text)) / len(text)
+        if confidence >= 1.0 - _ACCEPT_RATIO:
+            return EncodingGuess(encoding, confidence)
+        if best is None or confidence > best.confidence:
+            best = EncodingGuess(encoding, confidence)
+    
+    return best or EncodingGuess('latin-1', 0.0)
+
+def detect_encoding(file_path: str, sample_size: int = DEFAULT_SAMPLE_SIZE) -> EncodingGuess:
+    """读取文件开头 sample_size 字节检测编码"""
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_size + 1)
+    return sniff_encoding(sample[:sample_size], complete=len(sample) <= sample_size)
+
+def _decode_stream(f, encoding: str, block_size: int) -> str:
+    """逐块解码，统一换行符为 \\n（与文本模式读取相同）"""
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)('strict'), translate=True)
+    pieces: List[str] = []
+    while True:
+        block = f.read(block_size)
+        if not block:
+            break
+        pieces.append(decoder.decode(block))
+    pieces.append(decoder.decode(b'', final=True))
+    return ''.join(pieces)
+
+def decode_file(file_path: str, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple[str, str]:
+    """
+    检测编码并读取整个文件
+    
+    只解码一次，按块流式进行，不需要先把全部字节读进内存。样本之后的内容不符合检测出的编码时
+    （例如开头是纯英文、后面才出现中文），排除该编码重新检测并解码。
+    
+    Args:
+        file_path: 文件路径
+        sample_size: 用于检测编码的开头字节数
+        block_size: 每次读取解码的字节数
+    
+    Returns:
+        Tuple[str, str]: (文本内容, 编码)
+    """
+    candidates = list(CANDIDATE_ENCODINGS)
+    check_bom = True
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_size + 1)
+        complete = len(sample) <= sample_size
+        sample = sample[:sample_size]
+        
+        while True:
+            guess = sniff_encoding(sample, complete, candidates, check_bom)
+            f.seek(0)
+            try:
+                content = _decode_stream(f, guess.encoding, block_size)
+            except UnicodeDecodeError as e:
+                logger.info(f"文件内容不符合 {guess.encoding} 编码（{e.reason}），重新检测")
+                if guess.bom:
+                    check_bom = False
+                else:
+                    candidates = [encoding for encoding in candidates if encoding != guess.encoding]
+                continue
+            
+            logger.info(f"检测到文件编码: {guess.encoding}（置信度 {guess.confidence:.3f}）")
+            return content, guess.encoding
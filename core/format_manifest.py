@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量排版清单模块
+负责保存上次处理的块哈希、LLM处理结果和排版片段，重新处理时只处理改动的部分
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional, Union, Callable
+
+from core.text_processor import ChunkView
+
+logger = logging.getLogger(__name__)
+
+# 清单格式版本，排版规则或清单结构变化时加一，使旧清单失效
+_MANIFEST_VERSION = 1
+
+class FormatManifest:
+    """
+    增量排版清单类
+    
+    每个输入文件对应一个清单，记录：
+    - 每个文本块（含重叠内容）的 SHA-256 及其LLM处理结果
+    - 每个排版片段（流式排版在安全接缝之间格式化的一组块）输入文本的 SHA-256 及其输出
+    重新处理时，哈希未变的块直接使用上次的处理结果，只有改动的块交给LLM；
+    输入未变的排版片段直接拼接上次的输出，只有包含改动块的片段重新排版。
+    清单只保留本次用到的条目，指纹（提示词、模型配置）不同时整体失效。
+    """
+    
+    def __init__(self, path: str, fingerprint: str):
+        """
+        初始化清单
+        
+        Args:
+            path: 清单文件路径
+            fingerprint: 处理配置的指纹，与清单中记录的不同时不复用任何结果
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self._chunks: Dict[str, str] = {}
+        self._fragments: Dict[str, str] = {}
+        self._new_chunks: Dict[str, str] = {}
+        self._new_fragments: Dict[str, str] = {}
+        self.reused_chunks = 0
+        self.processed_chunks = 0
+        self.reused_fragments = 0
+        self.formatted_fragments = 0
+        
+        self._load()
+    
+    @staticmethod
+    def make_key(text: str) -> str:
+        """计算文本的哈希"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def _load(self):
+        """读取上次的清单"""
+        if not os.path.exists(self.path):
+            return
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取增量排版清单失败: {e}")
+            return
+        
+        if data.get('version') != _MANIFEST_VERSION or data.get('fingerprint') != self.fingerprint:
+            logger.info("处理配置已改变，增量排版清单失效")
+            return
+        
+        self._chunks = data.get('chunks', {})
+        self._fragments = data.get('fragments', {})
+        logger.info(f"加载增量排版清单: {len(self._chunks)} 个块，{len(self._fragments)} 个片段")
+    
+    def process_chunks(self, chunks: List[Union[str, ChunkView]],
+                       process: Callable[[List[Union[str, ChunkView]]], List[str]]) -> List[str]:
+        """
+        获取所有块的处理结果，只把改动的块交给 process 处理
+        
+        Args:
+            chunks: 原始文本块或文本块视图
+            process: 处理一组块并按顺序返回结果的函数（例如 LLMCoordinator.process_chunks）
+        
+        Returns:
+            List[str]: 按原始顺序排列的处理结果
+        """
+        keys = [self.make_key(str(chunk)) for chunk in chunks]
+        results: List[Optional[str]] = [self._chunks.get(key) for key in keys]
+        changed = [index for index, result in enumerate(results) if result is None]
+        
+        logger.info(f"增量处理: {len(changed)}/{len(chunks)} 个文本块需要重新处理")
+        if changed:
+            processed = process([chunks[index] for index in changed])
+            for index, result in zip(changed, processed):
+                results[index] = result
+        
+        self.reused_chunks += len(chunks) - len(changed)
+        self.processed_chunks += len(changed)
+        for key, result in zip(keys, results):
+            self._new_chunks[key] = result
+        return results
+    
+    def format_fragment(self, text: str, format_func: Callable[[str], str]) -> str:
+        """
+        获取排版片段，输入未变时直接使用上次的输出
+        
+        Args:
+            text: 片段的输入文本
+            format_func: 排版函数
+        
+        Returns:
+            str: 排版后的片段
+        """
+        key = self.make_key(text)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._new_fragments.get(key)
+        if fragment is None:
+            fragment = format_func(text)
+            self.formatted_fragments += 1
+        else:
+            self.reused_fragments += 1
+        self._new_fragments[key] = fragment
+        return fragment
+    
+    def save(self):
+        """保存本次用到的条目（先写临时文件再替换）"""
+        data = {
+            'version': _MANIFEST_VERSION,
+            'fingerprint': self.fingerprint,
+            'chunks': self._new_chunks,
+            'fragments': self._new_fragments
+        }
+        
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存增量排版清单失败: {e}")
+            return
+        
+        self._chunks, self._fragments = self._new_chunks, self._new_fragments
+        self._new_chunks, self._new_fragments = {}, {}
+        logger.info(f"增量排版清单已保存: {self.path}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取复用统计信息"""
+        return {
+            'reused_chunks': self.reused_chunks,
+            'processed_chunks': self.processed_chunks,
+            'reused_fragments': self.reused_fragments,
+            'formatted_fragments': self.formatted_fragments
+        }
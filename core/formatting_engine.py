@@ -6,12 +6,30 @@
 """
 
 import re
+import time
 import logging
-from typing import List, Dict, Any, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Any, Tuple, Union, Iterable, Optional, Sequence, Pattern, TextIO
+from dataclasses import dataclass, field
+
+from core.text_processor import ChunkView
+from core.chunk_merger import ChunkMerger
+from core.format_manifest import FormatManifest
 
 logger = logging.getLogger(__name__)
 
+# 后处理时合并的多余空行
+_BLANK_LINES_PATTERN = re.compile(r'\n\s*\n\s*\n')
+# 单独成行、后面可能与下一块首行连成标题的标题前缀
+_DANGLING_TITLE_PATTERN = re.compile(r'\*\*CH\d+(?:-S\d+)?')
+# 列表项开头：列表规则的前导空白会吞掉块之间的空行
+_LIST_START_PATTERN = re.compile(r'- |\d+\. ')
+# 替换模板中的分组引用（\1 或 \g<1>）和转义字符，合并规则时预先拆分模板
+_TEMPLATE_GROUP_PATTERN = re.compile(r'\\(?:g<(\d+)>|(\d+)|.)')
+_TEMPLATE_ESCAPES = {'\\': '\\', 'n': '\n', 'r': '\r', 't': '\t', 'f': '\f', 'v': '\v', 'a': '\a', 'b': '\b'}
+# 行规则会跨行匹配的情况：单独成行的标题前缀（标题规则的 \s+ 跨过换行），
+# 或跨行的连续空白之后是标题行（段落规则的 [\s]{4} 会包住已转换的标题）
+_CROSS_LINE_PATTERN = r'\*\*CH\d+(?:-S\d+)?[^\S\n]*\n|(?=\s{4})\s*\n[^\S\n]*\*\*CH\d'
+
 @dataclass
 class FormattingRule:
     """排版规则类"""
@@ -20,6 +38,15 @@ class FormattingRule:
     replacement: str
     flags: int = 0
     priority: int = 0
+    regex: Pattern = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.regex = re.compile(self.pattern, self.flags)
+    
+    @property
+    def line_anchored(self) -> bool:
+        """是否为行首锚定的规则"""
+        return self.pattern.startswith('^') and bool(self.flags & re.MULTILINE)
 
 class FormattingEngine:
     """排版引擎类"""
@@ -28,6 +55,9 @@ class FormattingEngine:
         """初始化排版引擎"""
         self.settings = settings
         self.rules = self._load_formatting_rules()
+        self.rule_set = _RuleSet(self.rules)
+        self.word_rule_set = _RuleSet(self._get_word_formatting_rules())
+        self.overlap_stats: Dict[str, Any] = {}
         
         logger.info(f"排版引擎初始化完成，加载了 {len(self.rules)} 个规则")
     
@@ -99,20 +129,22 @@ class FormattingEngine:
         
         return rules
     
-    def format_text(self, chunks: List[str]) -> str:
+    def format_text(self, chunks: List[Union[str, ChunkView]],
+                    source_chunks: Optional[Sequence[Union[str, ChunkView]]] = None) -> str:
         """
         格式化文本
         
         Args:
-            chunks: 处理后的文本块列表
+            chunks: 处理后的文本块或文本块视图列表
+            source_chunks: 与 chunks 对应的原始文本块视图，提供时去掉块之间重叠的重复内容
             
         Returns:
             str: 格式化后的文本
         """
         logger.info(f"开始格式化 {len(chunks)} 个文本块")
         
-        # 合并文本块
-        combined_text = self._combine_chunks(chunks)
+        # 去掉重叠内容后合并文本块
+        combined_text = self._combine_chunks(list(self._merge_overlap(chunks, source_chunks)))
         
         # 应用格式化规则
         formatted_text = self._apply_formatting_rules(combined_text)
@@ -124,13 +156,13 @@ class FormattingEngine:
         
         return final_text
     
-    def _combine_chunks(self, chunks: List[str]) -> str:
+    def _combine_chunks(self, chunks: List[Union[str, ChunkView]]) -> str:
         """合并文本块"""
         combined = []
         
         for i, chunk in enumerate(chunks):
             # 清理块内容
-            cleaned_chunk = self._clean_chunk(chunk)
+            cleaned_chunk = self._clean_chunk(str(chunk))
             
             if cleaned_chunk:
                 combined.append(cleaned_chunk)
@@ -141,6 +173,98 @@ class FormattingEngine:
         
         return ''.join(combined)
     
+    def _merge_overlap(self, chunks: Iterable[Union[str, ChunkView]],
+                       source_chunks: Optional[Sequence[Union[str, ChunkView]]]) -> Iterable[Union[str, ChunkView]]:
+        """按原始文本块的重叠信息去掉处理后文本块之间的重复内容，未启用时原样返回"""
+        if source_chunks is None or not self.settings.get('deduplicate_overlap', True):
+            return chunks
+        
+        merger = ChunkMerger()
+        
+        def merged():
+            yield from merger.merge(chunks, source_chunks)
+            self.overlap_stats = merger.get_stats()
+            if merger.removed_chars:
+                logger.info(f"去掉块之间重叠的重复内容 {merger.removed_chars} 字符")
+        
+        return merged()
+    
+    def format_stream(self, chunks: Iterable[Union[str, ChunkView]], output: TextIO,
+                      source_chunks: Optional[Sequence[Union[str, ChunkView]]] = None,
+                      manifest: Optional[FormatManifest] = None) -> Dict[str, Any]:
+        """
+        流式格式化文本：按顺序接收处理后的文本块，边格式化边写入输出
+        
+        输出与 format_text 完全相同。相邻两块只在没有规则能跨越接缝时才分开格式化，
+        即前面没有未闭合的【、前一块末行不是单独的标题前缀、后一块不以列表项开头，
+        否则继续累积到下一个安全接缝，因此内存中只保留尚未写出的少量块。
+        
+        Args:
+            chunks: 按原始顺序产生的文本块或文本块视图
+            output: 可写的文本输出（例如打开的文件）
+            source_chunks: 与 chunks 对应的原始文本块视图，提供时去掉块之间重叠的重复内容
+            manifest: 增量排版清单，提供时输入未变的片段直接使用上次的排版结果
+            
+        Returns:
+            Dict[str, Any]: 统计信息（块数、输出长度、词数、首次写出用时）
+        """
+        start_time = time.time()
+        writer = _StreamWriter(output)
+        writer.write(self._generate_header() + '\n\n')
+        
+        pending: List[str] = []  # 尚未格式化的合并文本片段
+        previous = None  # 上一个非空块（清理后）
+        separator_due = False  # 上一块非空，收到下一块时需要补上分隔
+        quote_open = False  # 待处理文本中最后一个【之后没有】
+        chunk_count = 0
+        first_flush = None
+        
+        for chunk in self._merge_overlap(chunks, source_chunks):
+            chunk_count += 1
+            if separator_due:
+                pending.append('\n\n')
+                separator_due = False
+            
+            cleaned = self._clean_chunk(str(chunk))
+            if not cleaned:
+                continue
+            
+            # 上一块到这里的接缝安全时，先把之前累积的文本格式化写出
+            if pending and previous is not None and not quote_open \
+                    and not _DANGLING_TITLE_PATTERN.fullmatch(previous[previous.rfind('\n') + 1:]) \
+                    and not _LIST_START_PATTERN.match(cleaned):
+                writer.write(self._format_fragment(''.join(pending), manifest))
+                pending = []
+                if first_flush is None:
+                    first_flush = time.time() - start_time
+            
+            pending.append(cleaned)
+            last_open, last_close = cleaned.rfind('【'), cleaned.rfind('】')
+            if last_open != last_close:
+                quote_open = last_open > last_close
+            previous = cleaned
+            separator_due = True
+        
+        if pending:
+            writer.write(self._format_fragment(''.join(pending), manifest))
+        writer.write('\n\n' + self._generate_footer())
+        writer.close()
+        
+        logger.info(f"流式格式化完成: {chunk_count} 个块，{writer.length} 字符")
+        
+        return {
+            'chunk_count': chunk_count,
+            'total_length': writer.length,
+            'word_count': writer.word_count,
+            'first_flush_time': first_flush if first_flush is not None else time.time() - start_time
+        }
+    
+    def _format_fragment(self, text: str, manifest: Optional[FormatManifest]) -> str:
+        """格式化流式排版的一个片段，有清单时复用上次的结果"""
+        if manifest is None:
+            return self._apply_formatting_rules(text)
+        return manifest.format_fragment(text, self._apply_formatting_rules)
+    
     def _clean_chunk(self, chunk: str) -> str:
         """清理文本块"""
         # 移除多余的空行
@@ -157,21 +281,7 @@ class FormattingEngine:
     
     def _apply_formatting_rules(self, text: str) -> str:
         """应用格式化规则"""
-        formatted_text = text
-        
-        for rule in self.rules:
-            try:
-                formatted_text = re.sub(
-                    rule.pattern, 
-                    rule.replacement, 
-                    formatted_text, 
-                    flags=rule.flags
-                )
-                logger.debug(f"应用规则 {rule.name}")
-            except Exception as e:
-                logger.warning(f"应用规则 {rule.name} 失败: {e}")
-        
-        return formatted_text
+        return self.rule_set.apply(text)
     
     def _post_process(self, text: str) -> str:
         """后处理"""
@@ -185,7 +295,7 @@ class FormattingEngine:
         final_text = header + '\n\n' + text + '\n\n' + footer
         
         # 清理多余的空行
-        final_text = re.sub(r'\n\s*\n\s*\n', '\n\n', final_text)
+        final_text = _BLANK_LINES_PATTERN.sub('\n\n', final_text)
         
         return final_text
     
@@ -284,21 +394,7 @@ class FormattingEngine:
         logger.info("开始格式化为Word格式")
         
         # 应用Word特定的格式化规则
-        word_rules = self._get_word_formatting_rules()
-        
-        formatted_text = text
-        for rule in word_rules:
-            try:
-                formatted_text = re.sub(
-                    rule.pattern,
-                    rule.replacement,
-                    formatted_text,
-                    flags=rule.flags
-                )
-            except Exception as e:
-                logger.warning(f"应用Word规则 {rule.name} 失败: {e}")
-        
-        return formatted_text
+        return self.word_rule_set.apply(text)
     
     def _get_word_formatting_rules(self) -> List[FormattingRule]:
         """获取Word格式化规则"""
@@ -389,3 +485,148 @@ class FormattingEngine:
         
         return validation
 
+
+class _CrossLineMatch(Exception):
+    """合并扫描遇到跨行匹配，需要回退为逐条应用"""
+
+class _RuleSet:
+    """
+    编译后的规则集
+    
+    行首锚定的规则合并成一个带命名分组的交替正则，一遍扫描完成所有行的分类和替换；
+    某条规则的替换结果如果还能被后面的行规则匹配，再依次交给这些规则处理
+    （与逐条应用时后面的规则看到的文本相同）。行内规则（引用、分页）不改变行首内容，
+    在行规则之后按优先级各扫描一遍。总耗时只与文本长度有关，不再是规则数 × 文本长度。
+    
+    行规则跨行匹配时（见 _CROSS_LINE_PATTERN）合并扫描与逐条应用的结果可能不同，
+    扫描中遇到这种情况时回退为按优先级逐条应用。
+    """
+    
+    def __init__(self, rules: List[FormattingRule]):
+        """
+        初始化规则集
+        
+        Args:
+            rules: 按优先级排好序的规则
+        """
+        self.rules = rules
+        line_rules = [rule for rule in rules if rule.line_anchored]
+        self.inline_rules = [rule for rule in rules if not rule.line_anchored]
+        
+        # 行首锚点提到最外层，非行首位置只需检查一次；第一个分支检测跨行匹配。
+        # 每条行规则包在一个命名分组中，替换模板的分组编号按该分组的位置偏移
+        alternatives = [f'(?P<_cross>{_CROSS_LINE_PATTERN})']
+        self._templates: Dict[str, List[Union[str, int]]] = {}
+        self._later: Dict[str, Tuple[Optional[Pattern], List[FormattingRule]]] = {}
+        offset = 1
+        for index, rule in enumerate(line_rules):
+            name = f'_rule{index}'
+            alternatives.append(f'(?P<{name}>{rule.pattern[1:]})')
+            self._templates[name] = _compile_template(rule.replacement, offset + 1)
+            later_rules = line_rules[index + 1:]
+            later_regex = None
+            if later_rules:
+                later_regex = re.compile('^(?:' + '|'.join(r.pattern[1:] for r in later_rules) + ')', re.MULTILINE)
+            self._later[name] = (later_regex, later_rules)
+            offset += rule.regex.groups + 1
+        self._line_regex = re.compile('^(?:' + '|'.join(alternatives) + ')', re.MULTILINE) if line_rules else None
+    
+    def apply(self, text: str) -> str:
+        """按优先级应用全部规则"""
+        if self._line_regex is None:
+            return self.apply_sequential(text)
+        
+        try:
+            text = self._line_regex.sub(self._replace_line, text)
+        except _CrossLineMatch:
+            return self.apply_sequential(text)
+        
+        for rule in self.inline_rules:
+            text = rule.regex.sub(rule.replacement, text)
+        return text
+    
+    def _replace_line(self, match) -> str:
+        name = match.lastgroup
+        if name == '_cross':
+            raise _CrossLineMatch()
+        
+        replaced = ''.join(part if isinstance(part, str) else match.group(part) or ''
+                           for part in self._templates[name])
+        
+        # 单行的替换结果只可能在开头被后面的行规则匹配
+        later_regex, later_rules = self._later[name]
+        if later_regex is None or ('\n' not in replaced and later_regex.match(replaced) is None):
+            return replaced
+        for rule in later_rules:
+            replaced = rule.regex.sub(rule.replacement, replaced)
+        return replaced
+    
+    def apply_sequential(self, text: str) -> str:
+        """逐条应用规则，每条规则扫描一遍全文"""
+        for rule in self.rules:
+            try:
+                text = rule.regex.sub(rule.replacement, text)
+                logger.debug(f"应用规则 {rule.name}")
+            except Exception as e:
+                logger.warning(f"应用规则 {rule.name} 失败: {e}")
+        return text
+
+def _compile_template(template: str, offset: int) -> List[Union[str, int]]:
+    """
+    把替换模板拆成字面文本和分组编号（加上 offset），避免每次替换都重新解析模板
+    
+    Returns:
+        List[Union[str, int]]: 字面文本片段和分组编号
+    """
+    parts: List[Union[str, int]] = []
+    position = 0
+    for match in _TEMPLATE_GROUP_PATTERN.finditer(template):
+        group = match.group(1) or match.group(2)
+        literal = template[position:match.start()]
+        if group:
+            parts.extend([literal, int(group) + offset])
+        else:
+            escape = match.group(0)[1]
+            parts.append(literal + _TEMPLATE_ESCAPES.get(escape, match.group(0)))
+        position = match.end()
+    parts.append(template[position:])
+    return [part for part in parts if part != '']
+
+class _StreamWriter:
+    """
+    流式输出写入器
+    
+    多余空行的合并只发生在连续的空白字符内部，因此写出时把末尾的空白暂存起来，
+    等后面出现非空白字符（或写入结束）时再合并，结果与对整个文档合并一次相同。
+    同时统计输出长度和词数。
+    """
+    
+    def __init__(self, output: TextIO):
+        self.output = output
+        self.length = 0
+        self.word_count = 0
+        self._trailing_space = ''
+        self._ends_in_word = False
+    
+    def write(self, text: str):
+        text = self._trailing_space + text
+        stripped = text.rstrip()
+        self._trailing_space = text[len(stripped):]
+        if stripped:
+            self._emit(_BLANK_LINES_PATTERN.sub('\n\n', stripped))
+    
+    def close(self):
+        if self._trailing_space:
+            self._emit(_BLANK_LINES_PATTERN.sub('\n\n', self._trailing_space))
+            self._trailing_space = ''
+        self.output.flush()
+    
+    def _emit(self, text: str):
+        self.output.write(text)
+        self.length += len(text)
+        
+        words = len(text.split())
+        if words and self._ends_in_word and not text[0].isspace():
+            words -= 1
+        self.word_count += words
+        self._ends_in_word = not text[-1].isspace()
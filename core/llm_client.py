@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步LLM客户端模块
+负责通过连接池调用LLM HTTP API
+"""
+
+import json
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
+
+import aiohttp
+
+from core.llm_coordinator import LLMConfig, estimate_request_tokens
+from core.rate_limiter import ProviderLimiter
+
+logger = logging.getLogger(__name__)
+
+class LLMAPIError(Exception):
+    """LLM API调用错误"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class AsyncLLMClient:
+    """
+    异步LLM客户端类
+    
+    每个 base_url 共享一个带 keep-alive 连接池的 aiohttp 会话，
+    每个LLM配置有独立的限流器：请求数/token数令牌桶加AIMD自适应并发，
+    返回 429 或超时时并发减半。需要在事件循环中使用，结束时调用 close()。
+    """
+    
+    def __init__(self, settings, limiters: Optional[Dict[str, ProviderLimiter]] = None):
+        """
+        初始化异步LLM客户端
+        
+        Args:
+            settings: 设置管理器
+            limiters: LLM名称到限流器的映射（可选），未提供的LLM使用固定并发上限
+        """
+        self.pool_size = settings.get('http_pool_size', 100)  # 每个 base_url 的最大连接数
+        self.keepalive_timeout = settings.get('http_keepalive_timeout', 30)  # 空闲连接保持时间（秒）
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._limiters: Dict[str, ProviderLimiter] = dict(limiters or {})
+    
+    async def __aenter__(self) -> 'AsyncLLMClient':
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    def _get_session(self, base_url: str) -> aiohttp.ClientSession:
+        """获取 base_url 对应的会话，不存在时创建"""
+        session = self._sessions.get(base_url)
+        if session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[base_url] = session
+            logger.info(f"为 {base_url} 创建连接池，最大连接数 {self.pool_size}")
+        return session
+    
+    def _get_limiter(self, config: LLMConfig) -> ProviderLimiter:
+        """获取LLM配置对应的限流器"""
+        limiter = self._limiters.get(config.name)
+        if limiter is None:
+            limiter = ProviderLimiter(
+                config.name,
+                config.requests_per_minute,
+                config.tokens_per_minute,
+                config.max_concurrency,
+                config.max_concurrency,
+                adaptive=False
+            )
+            self._limiters[config.name] = limiter
+        return limiter
+    
+    async def complete(self, prompt: str, config: LLMConfig) -> str:
+        """
+        调用LLM API完成一次请求
+        
+        Args:
+            prompt: 提示词
+            config: LLM配置
+        
+        Returns:
+            str: 模型返回的文本
+        """
+        async with self._request(prompt, config, stream=False) as response:
+            data = await response.json()
+        
+        return self._parse_response(data, config)
+    
+    async def stream(self, prompt: str, config: LLMConfig) -> AsyncIterator[str]:
+        """
+        以流式方式调用LLM API，边接收边返回文本片段
+        
+        Args:
+            prompt: 提示词
+            config: LLM配置
+        
+        Yields:
+            str: 模型陆续返回的文本片段
+        """
+        async with self._request(prompt, config, stream=True) as response:
+            async for line in response.content:
+                line = line.strip()
+                if not line.startswith(b'data:'):
+                    continue
+                
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                
+                text = self._parse_stream_event(json.loads(data), config)
+                if text:
+                    yield text
+    
+    @asynccontextmanager
+    async def _request(self, prompt: str, config: LLMConfig, stream: bool):
+        """
+        发送请求并返回状态码为 200 的响应
+        
+        请求前按限流器等待配额，响应读取完后按结果调整自适应并发。
+        """
+        url, headers, payload = self._build_request(prompt, config)
+        if stream:
+            payload['stream'] = True
+        session = self._get_session(config.base_url)
+        timeout = aiohttp.ClientTimeout(total=config.timeout)
+        
+        limiter = self._get_limiter(config)
+        
+        await limiter.acquire(estimate_request_tokens(prompt, config))
+        try:
+            start_time = time.monotonic()
+            async with session.post(url, json=payload, headers=headers, timeout=timeout) as response:
+                if response.status != 200:
+                    body = await response.text()
+                    raise LLMAPIError(
+                        f"LLM {config.name} 返回状态码 {response.status}: {body[:200]}",
+                        status=response.status,
+                        retry_after=self._parse_retry_after(response.headers.get('Retry-After'))
+                    )
+                yield response
+            limiter.on_success(time.monotonic() - start_time)
+        except LLMAPIError as e:
+            if e.status == 429:
+                limiter.on_throttle(e.retry_after or 0.0)
+            raise
+        except asyncio.TimeoutError:
+            limiter.on_throttle()
+            raise LLMAPIError(f"LLM {config.name} 请求超时")
+        finally:
+            limiter.release()
+    
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """解析 Retry-After 响应头（只支持秒数）"""
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+    
+    def _build_request(self, prompt: str, config: LLMConfig) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """按API格式构建请求地址、请求头和请求体"""
+        base_url = config.base_url.rstrip('/')
+        payload = {
+            'model': config.model,
+            'max_tokens': config.max_tokens,
+            'temperature': config.temperature,
+            'messages': [{'role': 'user', 'content': prompt}]
+        }
+        
+        if config.api_format == 'anthropic':
+            headers = {
+                'x-api-key': config.api_key,
+                'anthropic-version': '2023-06-01'
+            }
+            return f"{base_url}/messages", headers, payload
+        
+        headers = {'Authorization': f"Bearer {config.api_key}"}
+        return f"{base_url}/chat/completions", headers, payload
+    
+    def _parse_response(self, data: Dict[str, Any], config: LLMConfig) -> str:
+        """从响应中提取文本"""
+        try:
+            if config.api_format == 'anthropic':
+                return ''.join(block.get('text', '') for block in data['content'])
+            return data['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMAPIError(f"LLM {config.name} 响应格式无效: {e}")
+    
+    def _parse_stream_event(self, event: Dict[str, Any], config: LLMConfig) -> str:
+        """从流式响应的一个事件中提取文本片段，非文本事件返回空字符串"""
+        try:
+            if config.api_format == 'anthropic':
+                if event.get('type') == 'content_block_delta':
+                    return event['delta'].get('text', '')
+                return ''
+            choices = event.get('choices') or [{}]
+            return choices[0].get('delta', {}).get('content') or ''
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise LLMAPIError(f"LLM {config.name} 流式响应格式无效: {e}")
+    
+    async def close(self):
+        """关闭所有会话"""
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
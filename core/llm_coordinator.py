@@ -8,13 +8,27 @@ LLM协调器模块
 import asyncio
 import logging
 import time
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+import queue
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator, Iterable, Sequence, Callable
+from dataclasses import dataclass, field
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
 import json
+import hashlib
+
+from core.text_processor import ChunkView
+from core.response_cache import ResponseCache
+from core.rate_limiter import ProviderLimiter
+from core.scheduler import LLMScheduler, ProviderState
+from core.retry import RetryPolicy, CircuitBreaker
+from core.token_estimator import get_token_estimator
 
 logger = logging.getLogger(__name__)
 
+# 线程池调度调用的是模拟实现，其结果以该后端标识缓存，不会被真实接口的请求命中
+_MOCK_BACKEND = 'mock'
+
 @dataclass
 class LLMConfig:
     """LLM配置类"""
@@ -26,17 +40,52 @@ class LLMConfig:
     temperature: float
     timeout: int
     priority: int  # 优先级，数字越小优先级越高
+    api_format: str = 'openai'  # openai: chat/completions 接口, anthropic: messages 接口
+    max_concurrency: int = 32  # 异步调度时该LLM同时进行的最大请求数
+    requests_per_minute: int = 0  # 每分钟请求数上限，0 表示不限制
+    tokens_per_minute: int = 0  # 每分钟token数上限，0 表示不限制
 
 @dataclass
 class ProcessingTask:
     """处理任务类"""
     chunk_id: int
-    content: str
-    assigned_llm: str
+    content: Union[str, ChunkView]  # 块视图在调用API时才物化为字符串
+    assigned_llm: str  # 由调度器在领取任务时分配
     status: str  # pending, processing, completed, failed
     result: Optional[str] = None
     error: Optional[str] = None
+    error_status: Optional[int] = None  # 最后一次失败的HTTP状态码
     processing_time: float = 0.0
+    retry_count: int = 0
+    attempted_llms: List[str] = field(default_factory=list)  # 已失败过的LLM，重试时优先换用其他LLM
+    file_id: int = 0  # 批处理时所属文件的序号
+    started_at: Optional[float] = None  # 第一次开始处理的时间（time.time()）
+
+class LLMProcessingError(Exception):
+    """文本块在重试后仍然处理失败"""
+    
+    def __init__(self, failed_tasks: List[ProcessingTask]):
+        self.failed_tasks = failed_tasks
+        ids = ', '.join(str(task.chunk_id) for task in failed_tasks[:10])
+        more = ' 等' if len(failed_tasks) > 10 else ''
+        super().__init__(f"{len(failed_tasks)} 个文本块处理失败（{ids}{more}）: {failed_tasks[0].error}")
+
+@dataclass
+class BatchFileResult:
+    """批处理中单个文件的LLM处理结果"""
+    file_id: int
+    results: Optional[List[str]] = None  # 按原始顺序排列的处理结果，有块失败时为None
+    error: Optional[LLMProcessingError] = None
+    queue_time: float = 0.0  # 从批处理开始到该文件第一个块开始处理的时间（秒）
+
+def estimate_request_tokens(prompt: str, config: LLMConfig) -> int:
+    """估算一次请求消耗的token数：提示词加上与正文相当的输出，输出不超过 max_tokens"""
+    prompt_tokens = get_token_estimator(config.model).count(prompt)
+    return prompt_tokens + min(prompt_tokens, config.max_tokens)
+
+def _http_backend(config: LLMConfig) -> str:
+    """异步调度时真实接口的后端标识：接口格式和服务地址"""
+    return f"{config.api_format}:{config.base_url}"
 
 class LLMCoordinator:
     """LLM协调器类"""
@@ -48,6 +97,24 @@ class LLMCoordinator:
         self.max_concurrent_tasks = settings.get('max_concurrent_tasks', 3)
         self.retry_attempts = settings.get('retry_attempts', 3)
         self.retry_delay = settings.get('retry_delay', 1.0)
+        self.dispatch_mode = settings.get('llm_dispatch_mode', 'thread')  # thread: 线程池, async: 异步HTTP
+        self.async_max_in_flight = settings.get('async_max_in_flight', 256)  # 异步调度时同时处理的最大块数
+        self.llm_streaming = settings.get('llm_streaming', False)  # 异步调度时以流式响应接收结果
+        
+        # 提示词模板版本：模板改动后旧缓存自动失效
+        self.prompt_version = hashlib.sha256(self._build_prompt('').encode('utf-8')).hexdigest()[:16]
+        self.response_cache = self._create_response_cache()
+        self.rate_limiters = self._create_rate_limiters()
+        self.circuit_breakers = {
+            config.name: CircuitBreaker(
+                config.name,
+                settings.get('circuit_failure_threshold', 5),
+                settings.get('circuit_reset_timeout', 30.0)
+            )
+            for config in self.llm_configs
+        }
+        self.scheduler_stats: Dict[str, Any] = {}
+        self.profiler = None  # 设置后每次LLM调用结束时记录延迟（PipelineProfiler）
         
         logger.info(f"LLM协调器初始化完成，配置了 {len(self.llm_configs)} 个LLM")
     
@@ -67,7 +134,14 @@ class LLMCoordinator:
                 max_tokens=config_data.get('max_tokens', 4000),
                 temperature=config_data.get('temperature', 0.7),
                 timeout=config_data.get('timeout', 30),
-                priority=config_data.get('priority', 1)
+                priority=config_data.get('priority', 1),
+                api_format=config_data.get(
+                    'api_format',
+                    'anthropic' if 'anthropic' in config_data['base_url'] else 'openai'
+                ),
+                max_concurrency=config_data.get('max_concurrency', 32),
+                requests_per_minute=config_data.get('requests_per_minute', 0),
+                tokens_per_minute=config_data.get('tokens_per_minute', 0)
             )
             configs.append(config)
         
@@ -76,86 +150,362 @@ class LLMCoordinator:
         
         return configs
     
-    def process_chunks(self, chunks: List[str]) -> List[str]:
+    def _create_response_cache(self) -> Optional[ResponseCache]:
+        """创建LLM响应缓存，未启用时返回None"""
+        if not self.settings.get('llm_cache_enabled', True):
+            return None
+        
+        directory = os.path.join(self.settings.get('temp_directory', 'temp'), 'llm_cache')
+        return ResponseCache(directory, self.settings.get('llm_cache_max_size', 512 * 1024 * 1024))
+    
+    def _create_rate_limiters(self) -> Dict[str, ProviderLimiter]:
+        """为每个LLM配置创建限流器，学到的并发数在多次处理之间保留"""
+        adaptive = self.settings.get('adaptive_concurrency', True)
+        initial = self.settings.get('initial_concurrency', 4)
+        
+        return {
+            config.name: ProviderLimiter(
+                config.name,
+                config.requests_per_minute,
+                config.tokens_per_minute,
+                config.max_concurrency,
+                initial,
+                adaptive
+            )
+            for config in self.llm_configs
+        }
+    
+    def process_chunks(self, chunks: List[Union[str, ChunkView]],
+                       on_task_done: Optional[Callable[[ProcessingTask], None]] = None) -> List[str]:
         """
         处理文本块
         
         Args:
-            chunks: 文本块列表
+            chunks: 文本块或文本块视图列表
+            on_task_done: 每个任务最终完成或失败时的回调（例如写入检查点），
+                          在调度器锁内调用，应只做轻量操作
             
         Returns:
             List[str]: 处理后的文本块列表
         """
         logger.info(f"开始处理 {len(chunks)} 个文本块")
         
-        # 创建处理任务
+        tasks = self._create_tasks(chunks)
+        if on_task_done is not None:
+            # 带回调时调度器按给定顺序调度，这里预先按长度从长到短排列，与不带回调时一致
+            tasks.sort(key=lambda task: len(task.content), reverse=True)
+        
+        # 并行处理任务
+        if self.dispatch_mode == 'async':
+            processed_tasks = asyncio.run(self._process_tasks_async(tasks, on_task_done))
+        else:
+            processed_tasks = self._process_tasks_parallel(tasks, on_task_done)
+        
+        return self._collect_results(processed_tasks)
+    
+    async def process_chunks_async(self, chunks: List[Union[str, ChunkView]]) -> List[str]:
+        """
+        在已有事件循环中异步处理文本块
+        
+        Args:
+            chunks: 文本块或文本块视图列表
+            
+        Returns:
+            List[str]: 处理后的文本块列表
+        """
+        logger.info(f"开始异步处理 {len(chunks)} 个文本块")
+        
+        tasks = self._create_tasks(chunks)
+        processed_tasks = await self._process_tasks_async(tasks)
+        
+        return self._collect_results(processed_tasks)
+    
+    def iter_processed_chunks(self, chunks: List[Union[str, ChunkView]]) -> Iterator[str]:
+        """
+        按原始顺序逐个产生处理结果
+        
+        任务按原顺序调度，每个块在它之前的块都完成后立即产生，不必等待整个文档。
+        已产生的结果不再保留在任务中。有块在重试后仍然失败时抛出 LLMProcessingError。
+        
+        Args:
+            chunks: 文本块或文本块视图列表
+            
+        Yields:
+            str: 处理后的文本块
+        """
+        logger.info(f"开始流式处理 {len(chunks)} 个文本块")
+        
+        tasks = self._create_tasks(chunks)
+        finished = queue.Queue()
+        
+        def dispatch():
+            try:
+                if self.dispatch_mode == 'async':
+                    asyncio.run(self._process_tasks_async(tasks, finished.put))
+                else:
+                    self._process_tasks_parallel(tasks, finished.put)
+            except Exception as e:
+                finished.put(e)
+            finally:
+                finished.put(None)
+        
+        dispatcher = threading.Thread(target=dispatch, daemon=True)
+        dispatcher.start()
+        
+        ready: Dict[int, ProcessingTask] = {}
+        next_id = 0
+        while next_id < len(tasks):
+            item = finished.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            
+            ready[item.chunk_id] = item
+            while next_id in ready and ready[next_id].status == 'completed' and ready[next_id].result:
+                task = ready.pop(next_id)
+                result, task.result = task.result, None
+                next_id += 1
+                yield result
+            
+            if next_id in ready:
+                break  # 下一块失败，等其余任务结束后统一报告
+        
+        dispatcher.join()
+        if next_id < len(tasks):
+            failed = [task for task in tasks[next_id:] if task.status != 'completed' or not task.result]
+            for task in failed:
+                logger.error(f"文本块 {task.chunk_id} 处理失败（重试 {task.retry_count} 次）: {task.error}")
+            raise LLMProcessingError(failed)
+        
+        logger.info(f"文本块流式处理完成，共 {len(tasks)} 个")
+    
+    def iter_processed_batch(self, batch: Iterable[List[Union[str, ChunkView]]]) -> Iterator[BatchFileResult]:
+        """
+        把多个文件的文本块放进同一个调度器处理，按文件完成的先后逐个产生结果
+        
+        所有文件共用一个任务队列和一组工作线程或协程，LLM并发名额在文件之间不会空出。
+        batch 可以是逐个读取文件的生成器：每个文件的块一产生就进入队列（文件内按块长度
+        从长到短），不必等其余文件读取完，读取在后台线程中进行。已经全部读取的列表按
+        文件总长度从短到长入队，小文件不必等大文件处理完。某个文件有块在重试后仍然
+        失败时，该文件的结果带有 LLMProcessingError，其余文件照常处理。
+        
+        Args:
+            batch: 每个文件的文本块或文本块视图列表，file_id 为文件在其中的序号
+            
+        Yields:
+            BatchFileResult: 全部块都已结束的文件的处理结果
+        """
+        logger.info("开始批处理")
+        
+        start_time = time.time()
+        if isinstance(batch, Sequence):
+            files = sorted(enumerate(batch), key=lambda item: sum(len(chunk) for chunk in item[1]))
+        else:
+            files = enumerate(batch)
+        
+        file_tasks: Dict[int, List[ProcessingTask]] = {}
+        remaining: Dict[int, int] = {}
+        finished = queue.Queue()
+        
+        def on_done(task: ProcessingTask):
+            remaining[task.file_id] -= 1
+            if not remaining[task.file_id]:
+                finished.put(task.file_id)
+        
+        use_rate_limits = self.dispatch_mode == 'async'
+        if use_rate_limits:
+            # 在后台开始读取文件之前导入，否则首次导入要和读取线程争抢GIL，推迟第一批请求
+            import core.llm_client  # noqa: F401
+        scheduler = self._create_scheduler([], use_rate_limits, on_done, closed=False)
+        retry_policy = RetryPolicy(self.settings, 0)
+        
+        def produce():
+            try:
+                for file_id, chunks in files:
+                    tasks = self._create_tasks(chunks)
+                    for task in tasks:
+                        task.file_id = file_id
+                    file_tasks[file_id] = tasks
+                    remaining[file_id] = len(tasks)
+                    if not tasks:
+                        finished.put(file_id)
+                        continue
+                    retry_policy.add_tasks(len(tasks))
+                    scheduler.submit(sorted(tasks, key=lambda task: len(task.content), reverse=True))
+            except Exception as e:
+                finished.put(e)
+            finally:
+                scheduler.close()
+        
+        def dispatch():
+            try:
+                if use_rate_limits:
+                    asyncio.run(self._run_scheduler_async(scheduler, retry_policy, self.async_max_in_flight))
+                else:
+                    self._run_scheduler_parallel(scheduler, retry_policy)
+            except Exception as e:
+                finished.put(e)
+            finally:
+                finished.put(None)
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        dispatcher = threading.Thread(target=dispatch, daemon=True)
+        dispatcher.start()
+        producer.start()
+        
+        while True:
+            item = finished.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            
+            tasks_of_file = file_tasks.pop(item)
+            started = [task.started_at for task in tasks_of_file if task.started_at is not None]
+            result = BatchFileResult(item, queue_time=(min(started) if started else time.time()) - start_time)
+            try:
+                result.results = self._collect_results(list(tasks_of_file))
+            except LLMProcessingError as e:
+                result.error = e
+            
+            # 结果交给调用方后不再保留在任务中
+            for task in tasks_of_file:
+                task.result = None
+            yield result
+        
+        producer.join()
+        dispatcher.join()
+        logger.info(f"批处理完成，共 {len(remaining)} 个文件")
+    
+    def _create_tasks(self, chunks: List[Union[str, ChunkView]]) -> List[ProcessingTask]:
+        """创建处理任务"""
+        if chunks and not self.llm_configs:
+            raise ValueError("没有可用的LLM配置")
+        
         tasks = []
         for i, chunk in enumerate(chunks):
             task = ProcessingTask(
                 chunk_id=i,
                 content=chunk,
-                assigned_llm=self._select_llm(i),
+                assigned_llm='',
                 status='pending'
             )
             tasks.append(task)
+        return tasks
+    
+    def _create_scheduler(self, tasks: List[ProcessingTask], use_rate_limits: bool,
+                          on_done: Optional[Callable[[ProcessingTask], None]] = None,
+                          closed: bool = True) -> LLMScheduler:
+        """
+        创建调度器
         
-        # 并行处理任务
-        processed_tasks = self._process_tasks_parallel(tasks)
+        异步调度时各LLM的并发名额跟随自适应并发上限，线程池调度时为 max_concurrency。
+        提供 on_done 回调（流式处理）时按原顺序调度，否则按长度从长到短调度。
+        closed=False 时调度器在 close 之前接受追加的任务（批处理）。
+        """
+        providers = []
+        for config in self.llm_configs:
+            limiter = self.rate_limiters.get(config.name)
+            if use_rate_limits and limiter is not None:
+                capacity = lambda limiter=limiter: int(limiter.concurrency.limit)
+            else:
+                capacity = lambda config=config: config.max_concurrency
+            providers.append(ProviderState(config.name, config.priority, capacity, self.circuit_breakers.get(config.name)))
         
-        # 按原始顺序排序结果
+        return LLMScheduler(tasks, providers, longest_first=on_done is None, on_done=on_done, closed=closed)
+    
+    def _collect_results(self, processed_tasks: List[ProcessingTask]) -> List[str]:
+        """按原始顺序提取处理结果，有块在重试后仍然失败时抛出 LLMProcessingError"""
         processed_tasks.sort(key=lambda x: x.chunk_id)
         
-        # 提取处理结果
-        results = []
-        for task in processed_tasks:
-            if task.status == 'completed' and task.result:
-                results.append(task.result)
-            else:
-                logger.warning(f"文本块 {task.chunk_id} 处理失败: {task.error}")
-                # 使用原始内容作为备选
-                results.append(task.content)
+        failed = [task for task in processed_tasks if task.status != 'completed' or not task.result]
+        if failed:
+            for task in failed:
+                logger.error(f"文本块 {task.chunk_id} 处理失败（重试 {task.retry_count} 次）: {task.error}")
+            raise LLMProcessingError(failed)
         
-        logger.info(f"文本块处理完成，成功处理 {len([t for t in processed_tasks if t.status == 'completed'])} 个")
+        logger.info(f"文本块处理完成，成功处理 {len(processed_tasks)} 个")
         
-        return results
+        return [task.result for task in processed_tasks]
     
-    def _select_llm(self, chunk_id: int) -> str:
-        """选择LLM"""
-        if not self.llm_configs:
-            raise ValueError("没有可用的LLM配置")
+    def _process_tasks_parallel(self, tasks: List[ProcessingTask],
+                                on_done: Optional[Callable[[ProcessingTask], None]] = None) -> List[ProcessingTask]:
+        """
+        并行处理任务
         
-        # 使用轮询方式分配LLM
-        llm_index = chunk_id % len(self.llm_configs)
-        return self.llm_configs[llm_index].name
+        max_concurrent_tasks 个工作线程向调度器领取任务，由调度器按负载选择LLM。
+        """
+        scheduler = self._create_scheduler(tasks, use_rate_limits=False, on_done=on_done)
+        self._run_scheduler_parallel(scheduler, RetryPolicy(self.settings, len(tasks)))
+        return tasks
     
-    def _process_tasks_parallel(self, tasks: List[ProcessingTask]) -> List[ProcessingTask]:
-        """并行处理任务"""
+    def _run_scheduler_parallel(self, scheduler: LLMScheduler, retry_policy: RetryPolicy):
+        """用 max_concurrent_tasks 个工作线程处理调度器中的任务，直到调度器中没有任务"""
         with ThreadPoolExecutor(max_workers=self.max_concurrent_tasks) as executor:
-            # 提交所有任务
-            future_to_task = {}
-            for task in tasks:
-                future = executor.submit(self._process_single_task, task)
-                future_to_task[future] = task
+            workers = [
+                executor.submit(self._thread_worker, scheduler, retry_policy)
+                for _ in range(self.max_concurrent_tasks)
+            ]
+            for future in as_completed(workers):
+                future.result()
+        
+        self.scheduler_stats = scheduler.get_stats()
+    
+    def _thread_worker(self, scheduler: LLMScheduler, retry_policy: RetryPolicy) -> None:
+        """工作线程"""
+        while True:
+            task = scheduler.next_task()
+            if task is None:
+                return
             
-            # 等待任务完成
-            completed_tasks = []
-            for future in as_completed(future_to_task):
-                task = future_to_task[future]
-                try:
-                    result = future.result()
-                    completed_tasks.append(result)
-                except Exception as e:
-                    logger.error(f"任务 {task.chunk_id} 执行异常: {e}")
-                    task.status = 'failed'
-                    task.error = str(e)
-                    completed_tasks.append(task)
-        
-        return completed_tasks
+            try:
+                self._process_single_task(task)
+            except Exception as e:
+                logger.error(f"任务 {task.chunk_id} 执行异常: {e}")
+                task.status = 'failed'
+                task.error = str(e)
+            finally:
+                self._finish_task(task, scheduler, retry_policy)
+    
+    def _finish_task(self, task: ProcessingTask, scheduler: LLMScheduler, retry_policy: RetryPolicy):
+        """
+        任务结束：更新熔断器，失败时按重试策略退避后重新排队
+        
+        重试不占用工作线程或协程，退避期间它们继续处理其他块。
+        """
+        breaker = self.circuit_breakers.get(task.assigned_llm)
+        if self.profiler is not None:
+            self.profiler.record_llm_call(task)
+        
+        if task.status == 'completed':
+            if breaker is not None:
+                breaker.record_success()
+            scheduler.task_done(task, True)
+            return
+        
+        if breaker is not None:
+            if task.error_status == 429:
+                breaker.record_throttle()
+            else:
+                breaker.record_failure()
+        
+        retry_delay = None
+        if self._should_retry(task, retry_policy):
+            retry_delay = retry_policy.backoff(task.retry_count)
+            task.attempted_llms.append(task.assigned_llm)
+            task.retry_count += 1
+            task.status = 'pending'
+            logger.info(f"文本块 {task.chunk_id} 将在 {retry_delay:.2f} 秒后第 {task.retry_count} 次重试")
+        
+        scheduler.task_done(task, False, retry_delay)
     
     def _process_single_task(self, task: ProcessingTask) -> ProcessingTask:
         """处理单个任务"""
         start_time = time.time()
         task.status = 'processing'
+        if task.started_at is None:
+            task.started_at = start_time
         
         try:
             # 获取LLM配置
@@ -163,8 +513,13 @@ class LLMCoordinator:
             if not llm_config:
                 raise ValueError(f"找不到LLM配置: {task.assigned_llm}")
             
-            # 处理文本
-            result = self._call_llm_api(task.content, llm_config)
+            # 处理文本，内容和模型参数未变时直接使用缓存结果
+            content = str(task.content)
+            cache_key, result = self._cache_lookup(content, llm_config, _MOCK_BACKEND)
+            if result is None:
+                self._wait_for_quota(content, llm_config)
+                result = self._call_llm_api(content, llm_config)
+                self._cache_store(cache_key, result)
             
             task.result = result
             task.status = 'completed'
@@ -177,16 +532,123 @@ class LLMCoordinator:
             task.error = str(e)
             task.processing_time = time.time() - start_time
             
+            task.error_status = getattr(e, 'status', None)
+            
             logger.error(f"文本块 {task.chunk_id} 处理失败: {e}")
+        
+        return task
+    
+    async def _process_tasks_async(self, tasks: List[ProcessingTask],
+                                   on_done: Optional[Callable[[ProcessingTask], None]] = None) -> List[ProcessingTask]:
+        """
+        在单个线程中异步处理任务
+        
+        固定数量的工作协程向调度器领取任务，同时在途的块数不超过
+        async_max_in_flight，各LLM的限流、自适应并发和连接池由 AsyncLLMClient 管理。
+        """
+        scheduler = self._create_scheduler(tasks, use_rate_limits=True, on_done=on_done)
+        worker_count = min(self.async_max_in_flight, len(tasks))
+        await self._run_scheduler_async(scheduler, RetryPolicy(self.settings, len(tasks)), worker_count)
+        return tasks
+    
+    async def _run_scheduler_async(self, scheduler: LLMScheduler, retry_policy: RetryPolicy, worker_count: int):
+        """用 worker_count 个工作协程处理调度器中的任务，直到调度器中没有任务"""
+        from core.llm_client import AsyncLLMClient
+        
+        async with AsyncLLMClient(self.settings, self.rate_limiters) as client:
+            workers = [
+                asyncio.create_task(self._async_worker(scheduler, client, retry_policy))
+                for _ in range(worker_count)
+            ]
+            await asyncio.gather(*workers)
+        
+        self.scheduler_stats = scheduler.get_stats()
+    
+    async def _async_worker(self, scheduler: LLMScheduler, client, retry_policy: RetryPolicy) -> None:
+        """异步工作协程"""
+        while True:
+            task = await scheduler.next_task_async()
+            if task is None:
+                return
             
-            # 重试机制
-            if self._should_retry(task):
-                logger.info(f"重试处理文本块 {task.chunk_id}")
-                time.sleep(self.retry_delay)
-                return self._process_single_task(task)
+            try:
+                await self._process_single_task_async(task, client)
+            finally:
+                self._finish_task(task, scheduler, retry_policy)
+    
+    async def _process_single_task_async(self, task: ProcessingTask, client) -> ProcessingTask:
+        """异步处理单个任务"""
+        start_time = time.time()
+        task.status = 'processing'
+        if task.started_at is None:
+            task.started_at = start_time
+        
+        try:
+            llm_config = self._get_llm_config(task.assigned_llm)
+            if not llm_config:
+                raise ValueError(f"找不到LLM配置: {task.assigned_llm}")
+            
+            content = str(task.content)
+            cache_key, result = await self._run_cache_io(self._cache_lookup, content, llm_config,
+                                                         _http_backend(llm_config))
+            if result is None:
+                prompt = self._build_prompt(content)
+                if self.llm_streaming:
+                    result = ''.join([piece async for piece in client.stream(prompt, llm_config)])
+                else:
+                    result = await client.complete(prompt, llm_config)
+                await self._run_cache_io(self._cache_store, cache_key, result)
+            
+            task.result = result
+            task.status = 'completed'
+            task.processing_time = time.time() - start_time
+            
+            logger.info(f"文本块 {task.chunk_id} 处理完成，用时 {task.processing_time:.2f}秒")
+            
+        except Exception as e:
+            task.status = 'failed'
+            task.error = str(e)
+            task.processing_time = time.time() - start_time
+            task.error_status = getattr(e, 'status', None)
+            
+            logger.error(f"文本块 {task.chunk_id} 处理失败: {e}")
         
         return task
     
+    async def _run_cache_io(self, func: Callable, *args):
+        """
+        在线程池中执行缓存读写
+        
+        ResponseCache 的读取、写入和淘汰都是同步的文件操作，直接在事件循环中执行会阻塞
+        所有在途请求；未启用缓存时不需要切换线程。
+        """
+        if self.response_cache is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    
+    def _cache_lookup(self, content: str, config: LLMConfig, backend: str) -> Tuple[Optional[str], Optional[str]]:
+        """查询响应缓存，返回 (缓存键, 缓存结果)；backend 为产生结果的后端标识"""
+        if self.response_cache is None:
+            return None, None
+        
+        key = ResponseCache.make_key(content, config.model, config.temperature, self.prompt_version, backend)
+        return key, self.response_cache.get(key)
+    
+    def _cache_store(self, key: Optional[str], result: str):
+        """写入响应缓存"""
+        if self.response_cache is not None and key is not None:
+            self.response_cache.put(key, result)
+    
+    def _wait_for_quota(self, content: str, config: LLMConfig):
+        """线程池调度时按请求数和token数配额等待"""
+        limiter = self.rate_limiters.get(config.name)
+        if limiter is None:
+            return
+        
+        wait = limiter.reserve(estimate_request_tokens(self._build_prompt(content), config))
+        if wait > 0:
+            time.sleep(wait)
+    
     def _get_llm_config(self, llm_name: str) -> Optional[LLMConfig]:
         """获取LLM配置"""
         for config in self.llm_configs:
@@ -263,20 +725,29 @@ class LLMCoordinator:
         
         return '\n'.join(formatted_lines)
     
-    def _should_retry(self, task: ProcessingTask) -> bool:
+    def _should_retry(self, task: ProcessingTask, retry_policy: RetryPolicy) -> bool:
         """判断是否应该重试"""
         return (task.status == 'failed' and 
-                hasattr(task, 'retry_count') and 
-                task.retry_count < self.retry_attempts)
+                retry_policy.acquire(task.retry_count))
     
     def get_processing_stats(self) -> Dict[str, Any]:
         """获取处理统计信息"""
-        return {
+        stats = {
             'total_llms': len(self.llm_configs),
             'max_concurrent_tasks': self.max_concurrent_tasks,
             'retry_attempts': self.retry_attempts,
-            'retry_delay': self.retry_delay
+            'retry_delay': self.retry_delay,
+            'dispatch_mode': self.dispatch_mode,
+            'async_max_in_flight': self.async_max_in_flight
         }
+        
+        if self.response_cache is not None:
+            stats.update(self.response_cache.get_stats())
+        
+        stats['scheduler'] = self.scheduler_stats
+        stats['rate_limits'] = {name: limiter.get_stats() for name, limiter in self.rate_limiters.items()}
+        
+        return stats
     
     def validate_llm_connections(self) -> Dict[str, bool]:
         """验证LLM连接"""
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存映射文本模块
+负责通过 mmap 按固定大小的窗口增量解码大文件，支持逐行读取和按字符偏移随机读取
+"""
+
+import os
+import re
+import mmap
+import codecs
+import operator
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, islice, repeat
+from typing import Iterable, Iterator, Optional, Tuple
+
+from core.encoding_detector import DEFAULT_SAMPLE_SIZE, sniff_encoding
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 1024 * 1024
+
+# 带 BOM 的编码：去掉 BOM 后按明确字节序的编码解码，这样可以从文件中间的任意字符边界开始解码
+_BOM_ENCODINGS = {
+    'utf-8-sig': [(codecs.BOM_UTF8, 'utf-8')],
+    'utf-16': [(codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')],
+    'utf-32': [(codecs.BOM_UTF32_LE, 'utf-32-le'), (codecs.BOM_UTF32_BE, 'utf-32-be')]
+}
+_BOM_DEFAULTS = {'utf-8-sig': 'utf-8', 'utf-16': 'utf-16-le', 'utf-32': 'utf-32-le'}
+
+_CRLF_PATTERN = re.compile('\r\n')
+
+def _resolve_bom(encoding: str, head: bytes) -> Tuple[str, int]:
+    """
+    把带 BOM 的编码换成明确字节序的编码
+    
+    Returns:
+        Tuple[str, int]: (解码使用的编码, 正文开始的字节位置)
+    """
+    name = codecs.lookup(encoding).name
+    for bom, resolved in _BOM_ENCODINGS.get(name, []):
+        if head.startswith(bom):
+            return resolved, len(bom)
+    return _BOM_DEFAULTS.get(name, name), 0
+
+class MappedText:
+    """
+    内存映射文本类
+    
+    文件映射到内存后按 window_size 字节的窗口用增量解码器解码，换行符统一为 \\n
+    （窗口末尾的 \\r 留到下一个窗口，与后面的 \\n 合并），结果与文本模式读取一致。
+    解码只产生当前窗口的字符串，文件内容本身由操作系统的页缓存提供，重复处理同一个文件时
+    不需要再次从磁盘读取。
+    
+    第一次遍历时在每个窗口开头记录检查点（字符偏移, 字节偏移），之后按字符偏移切片或
+    换算文件字节位置时，只需从最近的检查点解码一个窗口左右的内容。
+    """
+    
+    def __init__(self, path: str, encoding: Optional[str] = 'utf-8', window_size: int = DEFAULT_WINDOW_SIZE):
+        """
+        打开并映射文件
+        
+        Args:
+            path: 文件路径
+            encoding: 文件编码，None 表示根据文件开头检测
+            window_size: 每次解码的字节数
+        """
+        self.path = path
+        self.window_size = window_size
+        self._file = open(path, 'rb')
+        self.byte_size = os.fstat(self._file.fileno()).st_size
+        # 空文件不能映射
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.byte_size else b''
+        
+        if encoding is None:
+            encoding = sniff_encoding(self._map[:DEFAULT_SAMPLE_SIZE],
+                                      complete=self.byte_size <= DEFAULT_SAMPLE_SIZE).encoding
+        self.encoding, self.data_start = _resolve_bom(encoding, self._map[:4])
+        self._cr_size = len('\r'.encode(self.encoding))
+        
+        # 检查点：每个窗口开头的字符偏移和字节偏移，_indexed 表示已经覆盖整个文件
+        self._char_offsets = array('q', [0])
+        self._byte_offsets = array('q', [self.data_start])
+        self._indexed = self.byte_size <= self.data_start
+        self._length = 0 if self._indexed else None
+    
+    def _windows(self, checkpoint: int) -> Iterator[Tuple[int, int, str, str]]:
+        """
+        从第 checkpoint 个检查点开始逐窗口解码，途中记录新的检查点
+        
+        Yields:
+            Tuple[int, int, str, str]: (窗口的字符偏移, 窗口的字节偏移, 原始文本, 统一换行后的文本)
+        """
+        decoder = codecs.getincrementaldecoder(self.encoding)('strict')
+        char_pos = self._char_offsets[checkpoint]
+        window_byte = self._byte_offsets[checkpoint]
+        position = window_byte
+        carry = ''
+        
+        while position < self.byte_size:
+            end = min(position + self.window_size, self.byte_size)
+            final = end == self.byte_size
+            raw = carry + decoder.decode(self._map[position:end], final=final)
+            carry = ''
+            if not final and raw.endswith('\r'):
+                raw, carry = raw[:-1], '\r'
+            text = raw.replace('\r\n', '\n').replace('\r', '\n')
+            
+            # 下一个窗口从解码器缓冲的不完整字符和保留的 \r 开始
+            next_byte = end - len(decoder.getstate()[0]) - (self._cr_size if carry else 0)
+            next_char = char_pos + len(text)
+            if not final and next_char > self._char_offsets[-1]:
+                self._char_offsets.append(next_char)
+                self._byte_offsets.append(next_byte)
+            
+            yield char_pos, window_byte, raw, text
+            char_pos, window_byte, position = next_char, next_byte, end
+        
+        if not self._indexed:
+            self._indexed = True
+            self._length = char_pos
+    
+    def _ensure_index(self, char_offset: float):
+        """解码到覆盖 char_offset 的检查点（或文件末尾）为止"""
+        if self._indexed:
+            return
+        for window_char, _, _, text in self._windows(len(self._char_offsets) - 1):
+            if window_char + len(text) > char_offset:
+                return
+    
+    def _checkpoint(self, char_offset: int) -> int:
+        """不超过 char_offset 的最后一个检查点"""
+        self._ensure_index(char_offset)
+        return bisect_right(self._char_offsets, char_offset) - 1
+    
+    def iter_windows(self) -> Iterator[str]:
+        """逐窗口产出统一换行后的文本"""
+        for _, _, _, text in self._windows(0):
+            yield text
+    
+    def iter_lines(self) -> Iterator[str]:
+        """逐行产出文本（不含换行符），结果与 read().split('\\n') 一致"""
+        remainder = ""
+        for text in self.iter_windows():
+            lines = (remainder + text).split('\n')
+            remainder = lines.pop()
+            yield from lines
+        yield remainder
+    
+    def read(self) -> str:
+        """解码整个文件（返回完整的字符串，内存占用与文件大小成正比）"""
+        return ''.join(self.iter_windows())
+    
+    def __len__(self) -> int:
+        """统一换行后的字符数（第一次调用时需要解码整个文件）"""
+        self._ensure_index(float('inf'))
+        return self._length
+    
+    def __getitem__(self, key: slice) -> str:
+        """按字符偏移切片，只解码切片所在的窗口"""
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("只支持步长为 1 的切片")
+        start, stop = key.start or 0, key.stop
+        if start < 0 or (stop is not None and stop < 0):
+            start, stop, _ = key.indices(len(self))
+        if stop is not None and stop <= start:
+            return ''
+        
+        pieces = []
+        for window_char, _, _, text in self._windows(self._checkpoint(start)):
+            window_end = window_char + len(text)
+            if window_end > start:
+                pieces.append(text[max(start - window_char, 0):None if stop is None else stop - window_char])
+            if stop is not None and window_end >= stop:
+                break
+        return ''.join(pieces)
+    
+    def byte_offset(self, char_offset: int) -> int:
+        """
+        统一换行后的字符偏移对应的文件字节位置
+        
+        \\r\\n 在文本中是一个 \\n，对应位置为 \\r 之前。
+        """
+        for window_char, window_byte, raw, text in self._windows(self._checkpoint(char_offset)):
+            if char_offset < window_char + len(text):
+                local = char_offset - window_char
+                # 统一换行时每个 \r\n 少一个字符，换算回原始文本中的位置
+                collapsed = 0
+                for match in _CRLF_PATTERN.finditer(raw):
+                    if match.start() - collapsed >= local:
+                        break
+                    collapsed += 1
+                return window_byte + len(raw[:local + collapsed].encode(self.encoding))
+        return self.byte_size
+    
+    def byte_offsets(self, char_offsets: Iterable[int]) -> array:
+        """
+        批量换算字符偏移对应的文件字节位置，结果与逐个调用 byte_offset 相同
+        
+        char_offsets 需要从小到大排列：从第一个偏移所在的窗口开始只解码一遍，
+        窗口内的字节位置由相邻偏移之间的原始文本编码后的长度累加得到。
+        """
+        points = array('q', char_offsets)
+        result = array('q')
+        if not points:
+            return result
+        
+        position = 0
+        for window_char, window_byte, raw, text in self._windows(self._checkpoint(points[0])):
+            stop = bisect_left(points, window_char + len(text), position)
+            if stop > position:
+                local = list(map((-window_char).__add__, islice(points, position, stop)))
+                if '\r\n' in raw:
+                    # 统一换行时每个 \r\n 少一个字符：第 k 个 \r\n 在统一换行后的文本中位于 start - k
+                    collapsed = [match.start() - k for k, match in enumerate(_CRLF_PATTERN.finditer(raw))]
+                    local = list(map(operator.add, local, map(bisect_left, repeat(collapsed), local)))
+                segments = map(raw.__getitem__, map(slice, chain([0], local), local))
+                lengths = map(len, map(str.encode, segments, repeat(self.encoding)))
+                result.extend(islice(accumulate(lengths, initial=window_byte), 1, None))
+                position = stop
+            if position == len(points):
+                break
+        
+        result.extend(repeat(self.byte_size, len(points) - position))
+        return result
+    
+    def close(self):
+        """关闭映射和文件"""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+    
+    def __enter__(self) -> 'MappedText':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
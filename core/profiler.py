@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线性能分析模块
+负责记录各处理阶段的耗时和数据量、每次LLM调用的延迟以及内存峰值，并导出 Chrome trace
+"""
+
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# LLM调用延迟直方图的桶上限（秒）
+_LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+def peak_rss() -> Optional[int]:
+    """进程的内存峰值（字节），无法获取时返回None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 以 KB 为单位，macOS 以字节为单位
+        return peak if sys.platform == 'darwin' else peak * 1024
+    
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss)
+
+def text_bytes(text: Any) -> int:
+    """文本（或文本块视图）的 UTF-8 字节数"""
+    return len(str(text).encode('utf-8'))
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """已排序数据的 q 分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+@dataclass
+class StageRecord:
+    """一次阶段执行的记录"""
+    name: str
+    start: float  # 相对分析器创建时间的开始时间（秒）
+    wall_time: float = 0.0
+    cpu_time: float = 0.0  # 进程CPU时间，包含同时运行的其他线程
+    bytes_in: int = 0
+    bytes_out: int = 0
+    file_id: int = 0  # 批处理时所属文件的序号
+
+@dataclass
+class LLMCallRecord:
+    """一次LLM调用（每次重试单独记录）"""
+    llm: str
+    chunk_id: int
+    file_id: int
+    start: float  # 相对分析器创建时间的开始时间（秒）
+    duration: float
+    success: bool
+
+class PipelineProfiler:
+    """
+    流水线性能分析器类
+    
+    用 stage() 包住处理流程的每个阶段（读取、预处理、LLM、排版、验证、写入），
+    记录墙钟时间、CPU时间和输入输出字节数；LLMCoordinator 在每次调用结束时
+    通过 record_llm_call() 记录延迟。记录只是追加到列表，汇总和导出在处理结束后进行。
+    批处理时所有文件共用一个分析器，按 file_id 区分。
+    """
+    
+    def __init__(self):
+        """初始化分析器"""
+        self._origin = time.perf_counter()
+        self._origin_wall = time.time()
+        self._lock = threading.Lock()
+        self.stages: List[StageRecord] = []
+        self.llm_calls: List[LLMCallRecord] = []
+    
+    def now(self) -> float:
+        """相对分析器创建时间的当前时间（秒）"""
+        return time.perf_counter() - self._origin
+    
+    @contextmanager
+    def stage(self, name: str, bytes_in: int = 0, file_id: int = 0) -> Iterator[StageRecord]:
+        """
+        记录一个阶段，阶段结束前可以设置返回记录的 bytes_out
+        
+        Args:
+            name: 阶段名称
+            bytes_in: 阶段输入的字节数
+            file_id: 批处理时所属文件的序号
+        """
+        record = StageRecord(name, self.now(), bytes_in=bytes_in, file_id=file_id)
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_time = self.now() - record.start
+            record.cpu_time = time.process_time() - cpu_start
+            self.add_stage(record)
+    
+    def add_stage(self, record: StageRecord):
+        """添加一条阶段记录（不能用 stage() 包住的阶段，例如批处理中交错进行的LLM处理）"""
+        with self._lock:
+            self.stages.append(record)
+    
+    def record_llm_call(self, task: Any):
+        """在一次LLM调用结束时记录其延迟"""
+        start = time.time() - task.processing_time - self._origin_wall
+        call = LLMCallRecord(task.assigned_llm, task.chunk_id, getattr(task, 'file_id', 0), start,
+                             task.processing_time, task.status == 'completed')
+        with self._lock:
+            self.llm_calls.append(call)
+    
+    def llm_latency(self, file_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        成功的LLM调用的延迟分布
+        
+        Returns:
+            Dict[str, Any]: 调用次数、失败次数、平均值、p50/p95/p99、最大值（秒）、
+                            直方图和各LLM的分位数
+        """
+        with self._lock:
+            calls = [call for call in self.llm_calls if file_id is None or call.file_id == file_id]
+        summary = self._latency_summary([call.duration for call in calls if call.success])
+        summary['failed'] = sum(1 for call in calls if not call.success)
+        
+        durations = sorted(call.duration for call in calls if call.success)
+        histogram = []
+        index = 0
+        for bound in _LATENCY_BUCKETS + [float('inf')]:
+            count = 0
+            while index < len(durations) and durations[index] <= bound:
+                count += 1
+                index += 1
+            histogram.append({'le': bound if bound != float('inf') else None, 'count': count})
+        summary['histogram'] = histogram
+        
+        by_llm: Dict[str, List[float]] = {}
+        for call in calls:
+            if call.success:
+                by_llm.setdefault(call.llm, []).append(call.duration)
+        summary['by_llm'] = {name: self._latency_summary(values) for name, values in by_llm.items()}
+        return summary
+    
+    @staticmethod
+    def _latency_summary(durations: List[float]) -> Dict[str, Any]:
+        durations = sorted(durations)
+        if not durations:
+            return {'count': 0}
+        return {
+            'count': len(durations),
+            'mean': sum(durations) / len(durations),
+            'p50': percentile(durations, 0.50),
+            'p95': percentile(durations, 0.95),
+            'p99': percentile(durations, 0.99),
+            'max': durations[-1]
+        }
+    
+    def report(self, file_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        汇总性能数据
+        
+        Args:
+            file_id: 只汇总该文件的阶段和LLM调用，None 表示全部
+        
+        Returns:
+            Dict[str, Any]: 各阶段（按首次出现顺序）的墙钟时间、CPU时间、输入输出字节数，
+                            LLM调用延迟分布和进程内存峰值
+        """
+        stages: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            records = [record for record in self.stages if file_id is None or record.file_id == file_id]
+        for record in records:
+            stage = stages.setdefault(record.name, {
+                'wall_time': 0.0, 'cpu_time': 0.0, 'bytes_in': 0, 'bytes_out': 0, 'count': 0
+            })
+            stage['wall_time'] += record.wall_time
+            stage['cpu_time'] += record.cpu_time
+            stage['bytes_in'] += record.bytes_in
+            stage['bytes_out'] += record.bytes_out
+            stage['count'] += 1
+        
+        return {
+            'stages': stages,
+            'llm_latency': self.llm_latency(file_id),
+            'peak_rss': peak_rss()
+        }
+    
+    def export_chrome_trace(self, path: str):
+        """
+        导出 Chrome trace-event JSON（可在 chrome://tracing 或 Perfetto 中打开）
+        
+        每个文件的阶段在各自的一行；每个LLM的调用按时间分配到互不重叠的若干行，
+        行数即该LLM实际达到的并发数。
+        """
+        events = []
+        thread_names: Dict[int, str] = {}
+        
+        with self._lock:
+            stages = list(self.stages)
+            calls = sorted(self.llm_calls, key=lambda call: call.start)
+        
+        for record in stages:
+            tid = record.file_id
+            thread_names[tid] = f"文件 {record.file_id}"
+            events.append({
+                'name': record.name, 'cat': 'stage', 'ph': 'X', 'pid': 1, 'tid': tid,
+                'ts': record.start * 1e6, 'dur': record.wall_time * 1e6,
+                'args': {'cpu_time': record.cpu_time, 'bytes_in': record.bytes_in, 'bytes_out': record.bytes_out}
+            })
+        
+        lanes: Dict[str, List[float]] = {}  # 每个LLM各行最后一次调用的结束时间
+        lane_ids: Dict[str, int] = {}
+        next_tid = 1000
+        for call in calls:
+            ends = lanes.setdefault(call.llm, [])
+            lane = next((i for i, end in enumerate(ends) if end <= call.start), len(ends))
+            if lane == len(ends):
+                ends.append(0.0)
+                lane_ids[f"{call.llm}#{lane}"] = next_tid
+                thread_names[next_tid] = f"{call.llm} #{lane + 1}"
+                next_tid += 1
+            ends[lane] = call.start + call.duration
+            events.append({
+                'name': f"块 {call.chunk_id}", 'cat': 'llm', 'ph': 'X', 'pid': 1,
+                'tid': lane_ids[f"{call.llm}#{lane}"],
+                'ts': call.start * 1e6, 'dur': call.duration * 1e6,
+                'args': {'file_id': call.file_id, 'success': call.success}
+            })
+        
+        for tid, name in thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}})
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        logger.info(f"性能 trace 已导出: {path}")
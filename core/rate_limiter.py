@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+限流模块
+负责按LLM配置的请求数/令牌数限制发送速率，并自适应调整并发数
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# 令牌桶最多积累多少秒的配额，避免空闲后瞬间打满一分钟的额度
+_BURST_SECONDS = 10
+
+class TokenBucket:
+    """
+    令牌桶类
+    
+    以 rate 个/秒的速度补充令牌，最多积累 capacity 个。采用预留方式：
+    reserve() 立即扣除令牌（允许透支）并返回调用方需要等待的秒数，
+    先到的请求先获得配额，不会在等待期间被后来的请求抢走。
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate: 每秒补充的令牌数，0 表示不限制
+            capacity: 最多积累的令牌数
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def per_minute(cls, limit: int) -> 'TokenBucket':
+        """按每分钟配额创建令牌桶"""
+        rate = limit / 60.0
+        return cls(rate, rate * _BURST_SECONDS)
+    
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        预留令牌
+        
+        Args:
+            amount: 需要的令牌数，超过容量时按容量计
+        
+        Returns:
+            float: 需要等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+        
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            
+            self.tokens -= min(amount, self.capacity)
+            wait = max(0.0, self.paused_until - now)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+    
+    def pause(self, seconds: float):
+        """服务端要求等待（例如 Retry-After）时暂停发放令牌"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class AdaptiveConcurrency:
+    """
+    AIMD自适应并发限制类
+    
+    第一次被限流之前每次成功把并发上限加 1（每轮往返翻倍，即慢启动），
+    之后每次成功加 1/limit（约每轮往返加 1）；遇到限流或超时时减半，
+    每个往返时间内最多减半一次，上限在 [1, max_limit] 之间。
+    """
+    
+    def __init__(self, max_limit: int, initial_limit: int, adaptive: bool = True):
+        """
+        初始化并发限制
+        
+        Args:
+            max_limit: 并发上限的最大值
+            initial_limit: 初始并发上限
+            adaptive: 是否自适应调整，False 时固定为 max_limit
+        """
+        self.max_limit = max(1, max_limit)
+        self.adaptive = adaptive
+        self.limit = float(min(initial_limit, self.max_limit) if adaptive else self.max_limit)
+        self.in_flight = 0
+        self.latency = 1.0  # 往返时间的指数移动平均（秒）
+        self.last_decrease = 0.0
+        self.slow_start = True
+        self.throttled = 0
+        self._waiters: List[asyncio.Future] = []
+    
+    async def acquire(self):
+        """等待并占用一个并发名额"""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+    
+    def release(self):
+        """释放并发名额并唤醒等待者"""
+        self.in_flight -= 1
+        self._wake()
+    
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+    
+    def on_success(self, latency: float):
+        """请求成功：加性增加"""
+        self.latency = 0.8 * self.latency + 0.2 * latency
+        if self.adaptive and self.limit < self.max_limit:
+            increase = 1.0 if self.slow_start else 1.0 / self.limit
+            self.limit = min(self.max_limit, self.limit + increase)
+            self._wake()
+    
+    def on_throttle(self):
+        """请求被限流或超时：乘性减少"""
+        self.throttled += 1
+        now = time.monotonic()
+        self.slow_start = False
+        if self.adaptive and now - self.last_decrease >= self.latency:
+            self.limit = max(1.0, self.limit / 2)
+            self.last_decrease = now
+
+class ProviderLimiter:
+    """单个LLM配置的限流器：请求数令牌桶 + token数令牌桶 + 自适应并发"""
+    
+    def __init__(self, name: str, rpm: int, tpm: int, max_concurrency: int,
+                 initial_concurrency: int, adaptive: bool = True):
+        """
+        初始化LLM限流器
+        
+        Args:
+            name: LLM名称
+            rpm: 每分钟请求数上限，0 表示不限制
+            tpm: 每分钟token数上限，0 表示不限制
+            max_concurrency: 并发上限的最大值
+            initial_concurrency: 初始并发上限
+            adaptive: 是否启用AIMD自适应并发
+        """
+        self.name = name
+        self.requests = TokenBucket.per_minute(rpm)
+        self.tokens = TokenBucket.per_minute(tpm)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, initial_concurrency, adaptive)
+    
+    def reserve(self, tokens: int) -> float:
+        """预留一次请求和 tokens 个token的配额，返回需要等待的秒数"""
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+    
+    async def acquire(self, tokens: int):
+        """占用并发名额并等待请求数和token数配额"""
+        await self.concurrency.acquire()
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    def release(self):
+        """释放并发名额"""
+        self.concurrency.release()
+    
+    def on_success(self, latency: float):
+        """记录成功的请求"""
+        self.concurrency.on_success(latency)
+    
+    def on_throttle(self, retry_after: float = 0.0):
+        """记录被限流或超时的请求"""
+        self.concurrency.on_throttle()
+        if retry_after:
+            self.requests.pause(retry_after)
+        logger.warning(f"LLM {self.name} 被限流，并发上限降为 {int(self.concurrency.limit)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限流统计信息"""
+        return {
+            'concurrency_limit': int(self.concurrency.limit),
+            'in_flight': self.concurrency.in_flight,
+            'throttled': self.concurrency.throttled,
+            'latency': self.concurrency.latency
+        }
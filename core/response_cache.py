@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存模块
+负责按内容哈希持久化缓存LLM处理结果
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    LLM响应缓存类
+    
+    以 (块内容, 模型, temperature, 提示词版本, 后端) 的 SHA-256 为键，把结果保存在
+    缓存目录下的文件中。总大小超过 max_size 时按最近最少使用的顺序淘汰，
+    最近使用时间记录在文件的修改时间上，重启后仍然有效。
+    """
+    
+    def __init__(self, directory: str, max_size: int):
+        """
+        初始化响应缓存
+        
+        Args:
+            directory: 缓存目录
+            max_size: 缓存文件总大小上限（字节）
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # 键 -> 文件大小，按最近使用排序
+        self._total_size = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        
+        logger.info(f"LLM响应缓存初始化完成: {directory}, {len(self._entries)} 个条目")
+    
+    @staticmethod
+    def make_key(content: str, model: str, temperature: float, prompt_version: str, backend: str = '') -> str:
+        """
+        计算缓存键
+        
+        backend 标识产生结果的后端（模拟响应或某个服务地址和接口格式），模型名称相同的
+        不同后端、模拟响应和真实响应不共用缓存。
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{prompt_version}\0{model}\0{temperature!r}\0{backend}\0".encode('utf-8'))
+        digest.update(content.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _path(self, key: str) -> str:
+        """缓存文件路径，按键的前两位分目录"""
+        return os.path.join(self.directory, key[:2], key)
+    
+    def _load_index(self):
+        """扫描缓存目录，按修改时间重建LRU顺序"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                found.append((stat.st_mtime, name, stat.st_size))
+        
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_size += size
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存
+        
+        Args:
+            key: 缓存键
+        
+        Returns:
+            Optional[str]: 缓存的结果，未命中时返回None
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result = f.read()
+                os.utime(path)
+            except OSError as e:
+                logger.warning(f"读取缓存失败: {e}")
+                self._total_size -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def put(self, key: str, result: str):
+        """
+        写入缓存
+        
+        Args:
+            key: 缓存键
+            result: 处理结果
+        """
+        data = result.encode('utf-8')
+        path = self._path(key)
+        
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning(f"写入缓存失败: {e}")
+                return
+            
+            self._total_size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+    
+    def _evict(self):
+        """淘汰最久未使用的条目直到总大小不超过上限"""
+        while self._total_size > self.max_size and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError as e:
+                logger.warning(f"删除缓存文件失败: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_entries': len(self._entries),
+            'cache_size': self._total_size
+        }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试模块
+负责失败重试的退避时间、每个文档的重试预算和LLM熔断
+"""
+
+import math
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+class RetryPolicy:
+    """
+    重试策略类
+    
+    每个文档（一次 process_chunks 调用）创建一个实例。单个块最多重试
+    retry_attempts 次，整个文档的重试次数不超过预算（块数的 retry_budget_ratio，
+    至少 retry_min_budget 次），退避时间按指数增长并加随机抖动。
+    """
+    
+    def __init__(self, settings, total_tasks: int):
+        """
+        初始化重试策略
+        
+        Args:
+            settings: 设置管理器
+            total_tasks: 文档的块数
+        """
+        self.max_attempts = settings.get('retry_attempts', 3)
+        self.base_delay = settings.get('retry_delay', 1.0)
+        self.max_delay = settings.get('retry_max_delay', 30.0)
+        self.budget_ratio = settings.get('retry_budget_ratio', 0.1)
+        self.min_budget = settings.get('retry_min_budget', 10)
+        self.total_tasks = total_tasks
+        self.budget = max(self.min_budget, math.ceil(total_tasks * self.budget_ratio))
+        self.used = 0
+        self._lock = threading.Lock()
+    
+    def add_tasks(self, count: int):
+        """处理过程中追加了 count 个块时按新的块数扩大预算"""
+        with self._lock:
+            self.total_tasks += count
+            self.budget = max(self.min_budget, math.ceil(self.total_tasks * self.budget_ratio))
+    
+    def acquire(self, retry_count: int) -> bool:
+        """
+        判断已重试 retry_count 次的块能否再重试，可以时占用一次预算
+        
+        Returns:
+            bool: 是否重试
+        """
+        with self._lock:
+            if retry_count >= self.max_attempts:
+                return False
+            if self.used >= self.budget:
+                logger.warning(f"文档的重试预算已用完（{self.budget} 次）")
+                return False
+            self.used += 1
+            return True
+    
+    def backoff(self, retry_count: int) -> float:
+        """第 retry_count 次重试前的等待时间：指数退避加全抖动"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry_count))
+
+class CircuitBreaker:
+    """
+    熔断器类
+    
+    连续失败 failure_threshold 次后断开，reset_timeout 秒内不再向该LLM分配任务；
+    之后进入半开状态，只放行一个试探请求，成功则恢复，失败则再次断开。
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        初始化熔断器
+        
+        Args:
+            name: LLM名称
+            failure_threshold: 连续失败多少次后断开
+            reset_timeout: 断开后多久进入半开状态（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'  # closed, open, half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def available(self) -> bool:
+        """是否可以向该LLM分配任务"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                logger.info(f"LLM {self.name} 熔断器半开，发送试探请求")
+            return self.state == 'half_open' and not self.trial_in_flight
+    
+    def begin(self):
+        """分配任务时调用，半开状态下占用试探名额"""
+        with self._lock:
+            if self.state == 'half_open':
+                self.trial_in_flight = True
+    
+    def is_open(self) -> bool:
+        """是否处于断开状态且尚未到半开时间"""
+        with self._lock:
+            return self.state == 'open' and time.monotonic() - self.opened_at < self.reset_timeout
+    
+    def time_until_half_open(self) -> float:
+        """距离进入半开状态还有多久（秒），未断开时为 0"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+    
+    def record_success(self):
+        """记录成功的请求"""
+        with self._lock:
+            if self.state != 'closed':
+                logger.info(f"LLM {self.name} 熔断器恢复")
+            self.state = 'closed'
+            self.failures = 0
+            self.trial_in_flight = False
+    
+    def record_throttle(self):
+        """记录被限流的请求：限流由限流器处理，不计入失败次数"""
+        with self._lock:
+            self.trial_in_flight = False
+    
+    def record_failure(self):
+        """记录失败的请求"""
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f"LLM {self.name} 连续失败 {self.failures} 次，熔断 {self.reset_timeout} 秒")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        return {'state': self.state, 'consecutive_failures': self.failures}
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM调度模块
+负责按各LLM的实测吞吐量、优先级和当前负载分配文本块
+"""
+
+import time
+import heapq
+import asyncio
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from core.retry import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ProviderState:
+    """单个LLM的调度状态"""
+    name: str
+    priority: int
+    capacity: Callable[[], int]  # 当前允许的并发数
+    breaker: Optional[CircuitBreaker] = None
+    active: int = 0
+    completed: int = 0
+    ewma_time: Optional[float] = None  # 处理时间的指数移动平均（秒）
+    ewma_length: Optional[float] = None  # 块长度的指数移动平均（字符）
+    
+    def estimate(self, length: int) -> Optional[float]:
+        """估算处理 length 个字符需要的时间，没有历史数据时返回None"""
+        if self.ewma_time is None:
+            return None
+        return self.ewma_time * length / max(1.0, self.ewma_length)
+    
+    def available(self) -> bool:
+        """是否有空闲并发名额且未熔断"""
+        if self.active >= self.capacity():
+            return False
+        return self.breaker is None or self.breaker.available()
+    
+    def is_open(self) -> bool:
+        """是否处于熔断状态"""
+        return self.breaker is not None and self.breaker.is_open()
+    
+    def throughput(self) -> Optional[float]:
+        """估算吞吐量（字符/秒）"""
+        if self.ewma_time is None:
+            return None
+        return self.capacity() * self.ewma_length / max(1e-6, self.ewma_time)
+
+class LLMScheduler:
+    """
+    负载感知调度器类
+    
+    所有任务放在一个共享队列中，默认按长度从长到短排列（LPT），空闲的工作线程或
+    协程向调度器领取任务，由调度器决定交给哪个LLM：
+    - 只考虑还有空闲并发名额的LLM
+    - 若某个LLM处理该块的预计用时超过“全部LLM处理完剩余队列的时间 + 最快LLM
+      处理该块的时间”，说明让它处理会拖慢整体，此时它不领取这个块，
+      而是尝试队尾最短的块；尾部的大块留给快的LLM
+    - 满足条件的LLM中优先级高的先领取，优先级相同时选预计用时短的
+    预计用时来自各LLM处理时间的指数移动平均；没有历史数据时只按优先级分配。
+    
+    失败的任务经过退避时间后回到队首，优先交给还没尝试过且未熔断的LLM；
+    所有LLM都熔断时任务继续排队，等到最早的熔断器进入半开状态再分配，
+    只有重试次数或重试预算用完的块才标记为失败。
+    
+    以 closed=False 创建时可以在处理过程中用 submit 继续追加任务，调用 close 之前
+    工作线程和协程即使暂时无事可做也不会退出。
+    """
+    
+    def __init__(self, tasks: List[Any], providers: List[ProviderState], alpha: float = 0.3,
+                 longest_first: bool = True, on_done: Optional[Callable[[Any], None]] = None,
+                 closed: bool = True):
+        """
+        初始化调度器
+        
+        Args:
+            tasks: 待处理任务列表（ProcessingTask）
+            providers: 参与调度的LLM
+            alpha: 指数移动平均的平滑系数
+            longest_first: 是否按内容长度从长到短入队，False 时按原顺序入队（流式输出时使用）
+            on_done: 任务最终完成或失败（不再重试）时的回调
+            closed: 是否已不再追加任务，False 时需要在提交完所有任务后调用 close
+        """
+        self.providers = {provider.name: provider for provider in providers}
+        self.alpha = alpha
+        self.on_done = on_done
+        if longest_first:
+            tasks = sorted(tasks, key=lambda task: len(task.content), reverse=True)
+        self._queue = deque(tasks)
+        self._queued_length = sum(len(task.content) for task in self._queue)
+        self._delayed: List[Tuple[float, int, Any]] = []  # (可重试时间, 序号, 任务)
+        self._delayed_count = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._waiters: List[asyncio.Future] = []
+        self._closed = closed
+    
+    def submit(self, tasks: List[Any]):
+        """按给定顺序把任务追加到队尾"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("调度器已关闭，不能再提交任务")
+            self._queue.extend(tasks)
+            self._queued_length += sum(len(task.content) for task in tasks)
+            self._notify()
+    
+    def close(self):
+        """不再追加任务，队列处理完后工作线程和协程退出"""
+        with self._lock:
+            self._closed = True
+            self._notify()
+    
+    def _remaining_time(self) -> float:
+        """估算全部LLM一起处理完队列中剩余任务需要的时间"""
+        throughputs = [t for t in (p.throughput() for p in self.providers.values()) if t]
+        if not throughputs:
+            return float('inf')
+        return self._queued_length / sum(throughputs)
+    
+    def _choose(self, task: Any, remaining: float) -> Optional[ProviderState]:
+        """为任务选择LLM，没有合适的LLM时返回None"""
+        length = len(task.content)
+        estimates = {name: provider.estimate(length) for name, provider in self.providers.items()}
+        known = [e for e in estimates.values() if e is not None]
+        best = min(known) if known else 0.0
+        
+        # 重试的任务优先交给没尝试过的LLM，且不再让给更快的LLM
+        attempted = getattr(task, 'attempted_llms', [])
+        pool = self.providers
+        if attempted:
+            untried = {name: p for name, p in self.providers.items() if name not in attempted and not p.is_open()}
+            pool = untried or self.providers
+        
+        candidates = []
+        for name, provider in pool.items():
+            if not provider.available():
+                continue
+            estimate = estimates[name] if estimates[name] is not None else best
+            if not attempted and estimate > remaining + best:
+                continue
+            candidates.append((provider.priority, estimate, name))
+        
+        if not candidates:
+            return None
+        return self.providers[min(candidates)[2]]
+    
+    def _release_delayed(self):
+        """把退避时间已到的重试任务放回队首"""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, task = heapq.heappop(self._delayed)
+            self._queue.appendleft(task)
+            self._queued_length += len(task.content)
+    
+    def _try_assign(self) -> Optional[Any]:
+        """尝试分配一个任务：先看队首最长的块，再看队尾最短的块"""
+        self._release_delayed()
+        if not self._queue:
+            return None
+        
+        remaining = self._remaining_time()
+        for index in (0, -1):
+            task = self._queue[index]
+            provider = self._choose(task, remaining)
+            if provider is not None:
+                if index == 0:
+                    self._queue.popleft()
+                else:
+                    self._queue.pop()
+                self._queued_length -= len(task.content)
+                provider.active += 1
+                self._active += 1
+                if provider.breaker is not None:
+                    provider.breaker.begin()
+                task.assigned_llm = provider.name
+                return task
+        return None
+    
+    def _finished(self) -> bool:
+        """已关闭且没有排队、退避中或处理中的任务"""
+        return self._closed and not self._queue and not self._delayed and self._active == 0
+    
+    def _wait_time(self, timeout: float) -> float:
+        """等待到下一个重试任务可用或最早的熔断器半开为止，最长 timeout 秒"""
+        wait = timeout
+        if self._delayed:
+            wait = min(wait, self._delayed[0][0] - time.monotonic())
+        if self._queue and all(provider.is_open() for provider in self.providers.values()):
+            wait = min(wait, min(provider.breaker.time_until_half_open() for provider in self.providers.values()))
+        return max(0.0, wait)
+    
+    def next_task(self, timeout: float = 1.0) -> Optional[Any]:
+        """
+        领取下一个任务（线程版本），需要等待时阻塞
+        
+        Returns:
+            Optional[ProcessingTask]: 已设置 assigned_llm 的任务，全部任务结束时返回None
+        """
+        with self._condition:
+            while True:
+                task = self._try_assign()
+                if task is not None or self._finished():
+                    return task
+                self._condition.wait(self._wait_time(timeout))
+    
+    async def next_task_async(self, timeout: float = 1.0) -> Optional[Any]:
+        """领取下一个任务（协程版本），需要在单个事件循环中使用"""
+        while True:
+            with self._lock:
+                task = self._try_assign()
+                if task is not None or self._finished():
+                    return task
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                wait_time = self._wait_time(timeout)
+            try:
+                await asyncio.wait_for(waiter, wait_time)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+    
+    def task_done(self, task: Any, success: bool = True, retry_delay: Optional[float] = None):
+        """
+        报告任务结束并更新LLM的处理时间估计
+        
+        Args:
+            task: 已结束的任务
+            success: 是否成功，失败的任务不计入处理时间
+            retry_delay: 需要重试时的退避时间（秒），None 表示不重试
+        """
+        with self._lock:
+            provider = self.providers.get(task.assigned_llm)
+            if provider is not None:
+                provider.active -= 1
+                if success:
+                    provider.completed += 1
+                    self._update_estimate(provider, task.processing_time, len(task.content))
+            self._active -= 1
+            
+            if retry_delay is not None:
+                self._delayed_count += 1
+                heapq.heappush(self._delayed, (time.monotonic() + retry_delay, self._delayed_count, task))
+            elif self.on_done is not None:
+                self.on_done(task)
+            
+            self._notify()
+    
+    def _update_estimate(self, provider: ProviderState, processing_time: float, length: int):
+        if provider.ewma_time is None:
+            provider.ewma_time = processing_time
+            provider.ewma_length = float(length)
+        else:
+            provider.ewma_time += self.alpha * (processing_time - provider.ewma_time)
+            provider.ewma_length += self.alpha * (length - provider.ewma_length)
+    
+    def _notify(self):
+        """唤醒所有等待中的工作线程和协程"""
+        self._condition.notify_all()
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+        self._waiters.clear()
+    
+    @staticmethod
+    def _wake(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计信息"""
+        with self._lock:
+            return {
+                name: {
+                    'completed': provider.completed,
+                    'active': provider.active,
+                    'ewma_time': provider.ewma_time,
+                    'circuit': provider.breaker.get_stats() if provider.breaker is not None else None
+                }
+                for name, provider in self.providers.items()
+            }
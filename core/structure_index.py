@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构索引模块
+负责记录章节、小节、段落、引用和列表在预处理后文本中的字符偏移和在输入文件中的字节位置，
+并以紧凑的二进制格式保存在输入文件旁边，之后可以直接定位到某一章节、在输入文件中跳转或重新分块某个区间
+"""
+
+import os
+import re
+import sys
+import struct
+import operator
+import hashlib
+import logging
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, chain, compress, repeat
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.mapped_text import MappedText
+
+logger = logging.getLogger(__name__)
+
+# 索引格式版本，结构识别规则或文件布局变化时加一，使旧索引失效
+_INDEX_VERSION = 2
+_MAGIC = b'DSIX'
+# 文件头：魔数、版本、输入文件的 SHA-256、预处理后文本的字符数、输入文件的字节数
+_HEADER = struct.Struct('<4sH32sqq')
+_COUNT = struct.Struct('<q')
+# 计算输入文件哈希时每次读取的字节数
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+INDEX_SUFFIX = '.sidx'
+KINDS = ('chapter', 'section', 'paragraph', 'quote', 'list')
+# 每种结构保存的列，章节和小节另外记录章节号和小节号
+_OFFSET_COLUMNS = ('char_start', 'char_end', 'byte_start', 'byte_end')
+_NUMBER_COLUMNS = ('chapter', 'section')
+_NUMBERED_KINDS = ('chapter', 'section')
+
+# 与 TextProcessor 的 chapter_line_pattern、section_line_pattern 识别相同的标题行。
+# 先用 \n 定位行首比 MULTILINE 的 ^ 快，第一行单独匹配
+_HEADER_BODY = r'[^\S\n]*(CH(\d+)(?:-S(\d+))?)[^\S\n]+\S'
+_HEADER_LINE_PATTERN = re.compile(r'\n' + _HEADER_BODY)
+_FIRST_HEADER_LINE_PATTERN = re.compile(_HEADER_BODY)
+# 列表项：一行中列表符号或编号之后的内容，区间从符号开始到行内最后一个非空白字符
+_LIST_BODY = r'[^\S\n]*((?:[-•]|\d+\.)[^\S\n]+\S(?:[^\n]*\S)?)'
+_LIST_LINE_PATTERN = re.compile(r'\n(?=[^\S\n]*[-•\d])' + _LIST_BODY)
+_FIRST_LIST_LINE_PATTERN = re.compile(_LIST_BODY)
+_QUOTE_PATTERN = re.compile(r'【[^】]+】')
+_LABEL_PATTERN = re.compile(r'\s*CH(\d+)(?:-S(\d+))?\s*', re.IGNORECASE)
+
+@dataclass
+class StructureEntry:
+    """
+    一个结构元素的位置
+    
+    char_start、char_end 是预处理后文本中的字符偏移；byte_start、byte_end 是输入文件中的
+    字节位置，按行对应：从起始行去掉缩进后的开头到结束行去掉行尾空白后的结尾（行内的引用
+    给出所在整行的范围），尚未换算或无法对应时为 -1。
+    """
+    kind: str
+    char_start: int
+    char_end: int
+    byte_start: int
+    byte_end: int
+    chapter: int = 0
+    section: int = 0
+    
+    @property
+    def label(self) -> str:
+        """章节或小节的编号，例如 CH12 或 CH12-S3，其他结构为空字符串"""
+        if self.kind == 'chapter':
+            return f"CH{self.chapter}"
+        if self.kind == 'section':
+            return f"CH{self.chapter}-S{self.section}"
+        return ""
+
+class StructureIndex:
+    """
+    结构索引类
+    
+    每种结构按出现顺序用 array('q') 保存去除首尾空白后的区间：预处理后文本中的字符偏移
+    （可直接切片 ChunkView.source）和输入文件中按行对应的字节位置，章节和小节另外保存编号。
+    字符偏移在预处理和分块时建立（build_structure_index），字节位置之后通过输入文件的
+    MappedText 一次换算（resolve_byte_offsets）。索引记录输入文件的 SHA-256，文件改变后不再使用。
+    文件格式为固定长度的文件头，随后依次是每种结构的条目数和各列数组的小端字节。
+    """
+    
+    def __init__(self, content_hash: str = '', char_length: int = 0, byte_length: int = 0):
+        """
+        初始化空索引
+        
+        Args:
+            content_hash: 输入文件的 SHA-256
+            char_length: 预处理后文本的字符数
+            byte_length: 输入文件的字节数
+        """
+        self.content_hash = content_hash
+        self.char_length = char_length
+        self.byte_length = byte_length
+        self._columns: Dict[str, Dict[str, array]] = {
+            kind: {column: array('q') for column in _columns(kind)} for kind in KINDS
+        }
+        self._labels: Optional[Dict[Tuple[int, int], int]] = None
+        # 换算字节位置之前：各条目起止位置所在的行映射中的行号
+        self._line_map: Optional[LineMap] = None
+        self._lines: Dict[str, Tuple[List[int], List[int]]] = {}
+    
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """计算输入文件的哈希"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def matches(self, content_hash: str) -> bool:
+        """索引是否对应哈希为 content_hash 的输入文件"""
+        return self.content_hash == content_hash
+    
+    def starts(self, kind: str) -> array:
+        """某种结构各条目的起始字符偏移"""
+        return self._columns[kind]['char_start']
+    
+    def resolve_byte_offsets(self, mapped: MappedText, content_hash: str = ''):
+        """
+        把各条目换算为输入文件中的字节位置
+        
+        Args:
+            mapped: 以读取原始文本时相同的编码打开的输入文件
+            content_hash: 输入文件的 SHA-256
+        """
+        if self._line_map is not None:
+            byte_starts, byte_ends = self._line_map.resolve(mapped)
+            for kind, (start_lines, end_lines) in self._lines.items():
+                columns = self._columns[kind]
+                columns['byte_start'] = array('q', map(byte_starts.__getitem__, start_lines))
+                columns['byte_end'] = array('q', map(byte_ends.__getitem__, end_lines))
+            self._line_map = None
+            self._lines = {}
+        self.content_hash = content_hash
+        self.byte_length = mapped.byte_size
+    
+    def count(self, kind: str) -> int:
+        """某种结构的条目数"""
+        return len(self._columns[kind]['char_start'])
+    
+    def entry(self, kind: str, position: int) -> StructureEntry:
+        """某种结构的第 position 个条目"""
+        columns = self._columns[kind]
+        return StructureEntry(kind, *(columns[column][position] for column in _columns(kind)))
+    
+    def entries(self, kind: str) -> List[StructureEntry]:
+        """某种结构的全部条目"""
+        return [self.entry(kind, position) for position in range(self.count(kind))]
+    
+    def find(self, label: str) -> Optional[StructureEntry]:
+        """
+        按编号查找章节或小节
+        
+        Args:
+            label: CH12 或 CH12-S3 形式的编号，数字前导零不影响匹配
+        
+        Returns:
+            Optional[StructureEntry]: 第一个编号相同的章节或小节，没有时返回 None
+        """
+        match = _LABEL_PATTERN.fullmatch(label)
+        if not match:
+            return None
+        
+        if self._labels is None:
+            self._labels = {}
+            for kind in _NUMBERED_KINDS:
+                columns = self._columns[kind]
+                for position in range(self.count(kind)):
+                    key = (columns['chapter'][position], columns['section'][position] if kind == 'section' else -1)
+                    self._labels.setdefault(key, position)
+        
+        section = match.group(2)
+        key = (int(match.group(1)), -1 if section is None else int(section))
+        position = self._labels.get(key)
+        if position is None:
+            return None
+        return self.entry('chapter' if section is None else 'section', position)
+    
+    def locate(self, kind: str, char_offset: int) -> Optional[StructureEntry]:
+        """包含字符偏移 char_offset 的某种结构条目，不在任何条目内时返回 None"""
+        position = bisect_right(self._columns[kind]['char_start'], char_offset) - 1
+        if position < 0 or char_offset >= self._columns[kind]['char_end'][position]:
+            return None
+        return self.entry(kind, position)
+    
+    def save(self, path: str):
+        """写入索引文件（先写临时文件再替换，避免留下不完整的索引）"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _INDEX_VERSION, bytes.fromhex(self.content_hash),
+                                 self.char_length, self.byte_length))
+            for kind in KINDS:
+                f.write(_COUNT.pack(self.count(kind)))
+                for column in _columns(kind):
+                    values = self._columns[kind][column]
+                    if sys.byteorder == 'big':
+                        values = array('q', values)
+                        values.byteswap()
+                    values.tofile(f)
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path: str) -> Optional['StructureIndex']:
+        """
+        读取索引文件
+        
+        Returns:
+            Optional[StructureIndex]: 文件不存在、已损坏或版本不同时返回 None
+        """
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, version, digest, char_length, byte_length = _HEADER.unpack_from(data)
+            if magic != _MAGIC or version != _INDEX_VERSION:
+                logger.info(f"结构索引格式已改变，忽略: {path}")
+                return None
+            
+            index = cls(digest.hex(), char_length, byte_length)
+            position = _HEADER.size
+            for kind in KINDS:
+                count, = _COUNT.unpack_from(data, position)
+                position += _COUNT.size
+                for column in _columns(kind):
+                    size = count * 8
+                    if position + size > len(data):
+                        raise ValueError("索引文件不完整")
+                    values = index._columns[kind][column]
+                    values.frombytes(data[position:position + size])
+                    if sys.byteorder == 'big':
+                        values.byteswap()
+                    position += size
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"读取结构索引失败: {e}")
+            return None
+        
+        return index
+
+def _columns(kind: str) -> Tuple[str, ...]:
+    return _OFFSET_COLUMNS + _NUMBER_COLUMNS if kind in _NUMBERED_KINDS else _OFFSET_COLUMNS
+
+def index_path(input_file: str) -> str:
+    """输入文件旁边的结构索引路径"""
+    return input_file + INDEX_SUFFIX
+
+def build_structure_index(content: str, line_map: Optional['LineMap'] = None) -> StructureIndex:
+    """
+    为预处理后的文本建立结构索引
+    
+    标题、列表和引用都用以字面量开头的模式查找，段落由 split、strip 和 map 在 C 层面
+    算出，Python 中只逐个处理标题。章节区间到下一个章节标题为止，小节区间到下一个
+    章节或小节标题为止，段落与 TextProcessor 按空行切分后去除首尾空白的段落相同。
+    提供预处理时记录的行映射时，同时记下各条目起止位置所在的行，之后换算字节位置。
+    
+    Args:
+        content: 预处理后的文本（ChunkView.source）
+        line_map: 预处理前后的行对应关系
+    
+    Returns:
+        StructureIndex: 结构索引（字节位置尚未换算）
+    """
+    columns: Dict[str, Dict[str, list]] = {kind: {column: [] for column in _columns(kind)} for kind in KINDS}
+    
+    chapter_end = header_end = len(content)
+    for match in reversed(_line_matches(_HEADER_LINE_PATTERN, _FIRST_HEADER_LINE_PATTERN, content)):
+        start = match.start(1)
+        kind = 'chapter' if match.group(3) is None else 'section'
+        end = chapter_end if kind == 'chapter' else header_end
+        _append(columns[kind], start, _rstrip_end(content, start, end), int(match.group(2)), int(match.group(3) or 0))
+        header_end = _line_start(content, start)
+        if kind == 'chapter':
+            chapter_end = header_end
+    for kind in _NUMBERED_KINDS:
+        for values in columns[kind].values():
+            values.reverse()
+    
+    # 按空行切分的各段：起始偏移、开头空白的长度、去除末尾空白后的长度（为 0 的是空白段）
+    pieces = content.split('\n\n')
+    lengths = list(map(len, pieces))
+    piece_starts = list(accumulate(chain([0], map((2).__add__, lengths))))
+    leads = list(map(operator.sub, lengths, map(len, map(str.lstrip, pieces))))
+    rights = list(map(len, map(str.rstrip, pieces)))
+    del pieces
+    paragraphs = columns['paragraph']
+    paragraphs['char_start'] = list(compress(map(operator.add, piece_starts, leads), rights))
+    paragraphs['char_end'] = list(compress(map(operator.add, piece_starts, rights), rights))
+    
+    for kind, matches, group in (('quote', _QUOTE_PATTERN.finditer(content), 0),
+                                 ('list', _line_matches(_LIST_LINE_PATTERN, _FIRST_LIST_LINE_PATTERN, content), 1)):
+        spans = [match.span(group) for match in matches]
+        columns[kind]['char_start'] = [start for start, _ in spans]
+        columns[kind]['char_end'] = [end for _, end in spans]
+    
+    index = StructureIndex('', len(content), 0)
+    for kind in KINDS:
+        count = len(columns[kind]['char_start'])
+        columns[kind]['byte_start'] = repeat(-1, count)
+        columns[kind]['byte_end'] = repeat(-1, count)
+        for column, values in columns[kind].items():
+            index._columns[kind][column] = array('q', values)
+        if line_map is not None:
+            index._lines[kind] = (line_map.lines(columns[kind]['char_start']),
+                                  line_map.lines(map((-1).__add__, columns[kind]['char_end'])))
+    index._line_map = line_map
+    
+    return index
+
+class LineMap:
+    """
+    预处理前后的行对应关系
+    
+    预处理只会删除空白行、把标题和它后面的行合并为一行以及在行内改写字符，因此一段原始文本
+    与它预处理后的结果非空行数相同时，两边的非空行按顺序一一对应。对每个预处理后的非空行记录
+    行首的字符偏移，以及对应原始行去掉缩进后的开头和去掉行尾空白后的结尾（原始文本中统一
+    换行后的字符偏移）；合并成一行的几行原始文本只记录一行，对应这几行的全部内容。
+    """
+    
+    def __init__(self):
+        """初始化空的行映射"""
+        self.starts: List[int] = []  # 预处理后各非空行的行首
+        self.raw_starts: List[int] = []  # 对应原始行内容的开头
+        self.raw_ends: List[int] = []  # 对应原始行内容的结尾
+    
+    def add(self, raw: str, raw_offset: int, processed: str, processed_offset: int,
+            merges: Iterable[Tuple[int, int, int]] = ()) -> bool:
+        """
+        记录一段原始文本与它的预处理结果
+        
+        Args:
+            merges: 标题标准化合并的行，每项为 (之前的非空行数, 原非空行数, 合并后的非空行数)，
+                    按出现顺序排列；其余非空行一一对应
+        
+        Returns:
+            bool: 两边的非空行数对不上（字符清理删空了某一行）时不记录并返回 False
+        """
+        lines = processed.split('\n')
+        starts = list(compress(_line_starts(lines, processed_offset), map(len, map(str.rstrip, lines))))
+        raw_lines = raw.split('\n')
+        raw_rights = list(map(len, map(str.rstrip, raw_lines)))
+        raw_line_starts = list(_line_starts(raw_lines, raw_offset))
+        leads = map(operator.sub, map(len, raw_lines), map(len, map(str.lstrip, raw_lines)))
+        raw_starts = list(compress(map(operator.add, raw_line_starts, leads), raw_rights))
+        raw_ends = list(compress(map(operator.add, raw_line_starts, raw_rights), raw_rights))
+        merges = list(merges)
+        if len(starts) != len(raw_starts) - sum(before - after for _, before, after in merges):
+            return False
+        
+        # 对应关系：一一对应的一段接一个合并窗口，合并后仍有内容的窗口只记录一行
+        line = first = 0
+        for rank, before, after in merges + [(len(raw_starts), 0, 0)]:
+            count = rank - first
+            self.starts.extend(starts[line:line + count])
+            self.raw_starts.extend(raw_starts[first:rank])
+            self.raw_ends.extend(raw_ends[first:rank])
+            line += count
+            if after and before:
+                self.starts.append(starts[line])
+                self.raw_starts.append(raw_starts[rank])
+                self.raw_ends.append(raw_ends[rank + before - 1])
+            line += after
+            first = rank + before
+        return True
+    
+    def add_merged(self, raw: str, raw_offset: int, processed: str, processed_offset: int):
+        """记录无法逐行对应的一段：预处理结果的各行都对应整段原始文本的内容"""
+        lines = processed.split('\n')
+        first = next(compress(_line_starts(lines, processed_offset), map(len, map(str.rstrip, lines))), None)
+        if first is None or not raw.strip():
+            return
+        self.starts.append(first)
+        self.raw_starts.append(raw_offset + len(raw) - len(raw.lstrip()))
+        self.raw_ends.append(raw_offset + len(raw.rstrip()))
+    
+    def lines(self, char_offsets: Iterable[int]) -> List[int]:
+        """预处理后文本中各字符偏移所在的行号加一（0 表示在第一行之前）"""
+        return list(map(bisect_right, repeat(self.starts), char_offsets))
+    
+    def resolve(self, mapped: MappedText) -> Tuple[array, array]:
+        """
+        换算各行对应原始内容的开头和结尾在文件中的字节位置（只解码一遍文件）
+        
+        Returns:
+            Tuple[array, array]: 按 lines 返回的行号取值的开头和结尾，行号 0 对应 -1
+        """
+        offsets = mapped.byte_offsets(chain.from_iterable(zip(self.raw_starts, self.raw_ends)))
+        return array('q', [-1]) + offsets[0::2], array('q', [-1]) + offsets[1::2]
+
+def _append(columns: Dict[str, list], start: int, end: int, chapter: int, section: int):
+    """追加一个章节或小节（字节偏移最后统一计算）"""
+    columns['char_start'].append(start)
+    columns['char_end'].append(end)
+    columns['chapter'].append(chapter)
+    columns['section'].append(section)
+
+def _line_matches(pattern, first_pattern, content: str) -> list:
+    """行首匹配：第一行用 first_pattern，其余各行用以 \\n 开头的 pattern"""
+    matches = list(pattern.finditer(content))
+    first = first_pattern.match(content)
+    if first:
+        matches.insert(0, first)
+    return matches
+
+def _line_start(content: str, position: int) -> int:
+    return content.rfind('\n', 0, position) + 1
+
+def _rstrip_end(content: str, start: int, end: int) -> int:
+    while end > start and content[end - 1].isspace():
+        end -= 1
+    return end
+
+def _line_starts(lines: List[str], offset: int) -> Iterator[int]:
+    """各行的行首偏移（比行数多一个，最后一个是文本末尾之后的位置）"""
+    return accumulate(chain([offset], map((1).__add__, map(len, lines))))
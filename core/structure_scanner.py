@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本结构扫描模块
+负责单遍流式统计字符、单词、行、段落、引用、列表以及章节和小节标题
+"""
+
+import re
+import logging
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 1024 * 1024
+
+# 与 TextProcessor 中的结构模式相同，统计结果以它们的 findall 为准
+CHAPTER_PATTERN = re.compile(r'^CH\d+\s+(.+)$', re.MULTILINE)
+SECTION_PATTERN = re.compile(r'^CH\d+-S\d+\s+(.+)$', re.MULTILINE)
+LIST_PATTERN = re.compile(r'^[\s]*[-•]\s+(.+)$', re.MULTILINE)
+NUMBERED_LIST_PATTERN = re.compile(r'^[\s]*\d+\.\s+(.+)$', re.MULTILINE)
+
+# 可能匹配标题或列表的行，一次 findall 得到 (空白段, 标题编号, 标题, 悬空符号) 四元组：
+# 标题行的编号和标题、行内完整的列表项 ('', '', '', '')，以及编号或列表符号之后没有内容的悬空行。
+# 悬空行上模式中的 \s+ 会越过换行从后面的行取内容，出现时该块改为逐个候选行调用原模式
+_LINE_BODY = (r'(?:(CH\d+(?:-S\d+)?)[^\S\n]+(\S.*)'
+              r'|[^\S\n]*(?:[-•]|\d+\.)[^\S\n]+\S'
+              r'|[^\S\n]*([-•]|\d+\.|CH\d+(?:-S\d+)?)[^\S\n]*$)')
+# 行首可能是标题、列表或空白的字符（\s 中除换行以外的全部字符），前瞻排除其余的行比直接尝试各个分支快
+_LINE_HEAD = r'[C\-•\d\t\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]'
+# 同一次扫描还检查空行之后是否紧跟空白字符（包括连续三个以上的换行），此时按空行分段会产生空白段，得到 ('\n', '', '', '')
+_LINE_PATTERN = re.compile(r'\n(?:(?=(\n)\s)|(?=' + _LINE_HEAD + ')' + _LINE_BODY + ')', re.MULTILINE)
+_FIRST_LINE_PATTERN = re.compile(_LINE_BODY, re.MULTILINE)
+_LIST_ITEM = ('', '', '', '')
+
+# 逐个检查时的候选行：以 CH 开头，或第一个非空白字符是列表符号或数字
+_CANDIDATE_HEAD = r'(?:CH|[^\S\n]*[-•\d])'
+_CANDIDATE_PATTERN = re.compile(r'\n' + _CANDIDATE_HEAD)
+_FIRST_CANDIDATE_PATTERN = re.compile(_CANDIDATE_HEAD)
+
+# 切块位置之前的一行只有标题编号或列表符号时不能切块
+_DANGLING_LINE_PATTERN = re.compile(r'[-•]|\d+\.|CH\d+(?:-S\d+)?')
+
+# UTF-8 字节中的 ASCII 空白字符映射为 1，其他字节为 0，并删去多字节字符的后续字节，每个字符对应一个字节
+_SPACE_FLAGS = bytes(chr(i).isspace() for i in range(128)) + bytes(128)
+_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+# 非 ASCII 的空白字符（U+0085、U+00A0、U+1680、U+2000-U+200A、U+2028、U+2029、U+202F、U+205F、U+3000）
+# 的 UTF-8 编码，它们的字节会被映射为 0，出现时改用 str.split 统计
+_UNICODE_SPACE_PATTERN = re.compile(rb'\xc2[\x85\xa0]|\xe1\x9a\x80|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80')
+# 中日文标点的 UTF-8 编码也以 \xe3 开头，全角空格单独查找，单个字面量的正则查找比 bytes 的 in 快
+_IDEOGRAPHIC_SPACE_PATTERN = re.compile(rb'\xe3\x80\x80')
+
+# int.bit_count 从 Python 3.10 开始提供
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+# 抽样中空白字符比例超过 1/_DENSE_RATIO 的块（英文等按空格分词的文本）按字节统计单词，
+# 中文等单词很少的块直接 split 更快
+_DENSE_SAMPLE = 64 * 1024
+_DENSE_RATIO = 16
+
+class StructureScanner:
+    """
+    文本结构扫描器类
+    
+    文本可以分成任意多段依次送入，扫描器在空行之后切块，每块只用 count、translate、
+    findall 等 C 层面的操作各遍历一次，Python 中只处理标题行和引用符号。
+    切块位置前一行以非空白字符结尾且不是只有标题编号或列表符号的行，
+    保证任何模式的匹配都不会跨越切块位置（引用可以跨块，由未闭合的状态记录）。
+    统计结果与对整个文本逐项调用 split 和 findall 完全一致。
+    """
+    
+    def __init__(self):
+        self.characters = 0
+        self.words = 0
+        self.newlines = 0
+        self.paragraphs = 0
+        self.quotes = 0
+        self.lists = 0
+        self.chapters: List[str] = []
+        self.sections: List[str] = []
+        self._buffer = ""
+        # 未闭合的【：是否存在，以及它之后是否已经有字符
+        self._quote_open = False
+        self._quote_filled = False
+    
+    def feed(self, text: str):
+        """送入下一段文本"""
+        scan_floor = max(len(self._buffer) - 2, 0)
+        self._buffer += text
+        cut = self._find_cut(self._buffer, scan_floor, len(self._buffer))
+        if cut > 0:
+            self._scan_block(self._buffer[:cut])
+            self._buffer = self._buffer[cut:]
+    
+    def close(self) -> Dict[str, Any]:
+        """扫描剩余文本并返回结构分析结果"""
+        self._scan_block(self._buffer)
+        self._buffer = ""
+        return {
+            'total_characters': self.characters,
+            'total_words': self.words,
+            'total_lines': self.newlines + 1,
+            'chapters': [{'number': i, 'title': title} for i, title in enumerate(self.chapters, 1)],
+            'sections': [{'title': title} for title in self.sections],
+            'paragraphs': self.paragraphs,
+            'quotes': self.quotes,
+            'lists': self.lists
+        }
+    
+    @staticmethod
+    def _find_cut(text: str, scan_floor: int, end: int) -> int:
+        """text[scan_floor:end] 中最后一个可以切块的位置（空行之后），没有时返回 0"""
+        position = text.rfind('\n\n', scan_floor, end)
+        while position >= 0:
+            line = text[text.rfind('\n', 0, position) + 1:position]
+            if line and not line[-1].isspace() and not _DANGLING_LINE_PATTERN.fullmatch(line.strip()):
+                return position + 2
+            position = text.rfind('\n\n', scan_floor, position + 1)
+        return 0
+    
+    def _scan_block(self, block: str):
+        """统计一个块（从行首开始，不与任何匹配交叉）"""
+        self.characters += len(block)
+        self.newlines += block.count('\n')
+        
+        gap = self._scan_lines(block)
+        self.paragraphs += _count_paragraphs(block, gap)
+        
+        data = block.encode('utf-8') if _is_dense(block) else None
+        if data is not None and (block.isascii() or not _has_unicode_spaces(data)):
+            self.words += _count_words(block, data)
+        else:
+            self.words += len(block.split())
+        
+        self._scan_quotes(block)
+    
+    def _scan_lines(self, block: str) -> bool:
+        """用一次 findall 统计标题和列表，有悬空行时改为逐个候选行检查，返回块内是否有空行之后紧跟空白字符的位置"""
+        matches = _LINE_PATTERN.findall(block)
+        first = _FIRST_LINE_PATTERN.match(block)
+        if first:
+            matches.insert(0, ('',) + first.groups(''))
+        
+        headers = [match for match in matches if match != _LIST_ITEM]
+        gap = any(separator for separator, _, _, _ in headers)
+        if gap:
+            matches = [match for match in matches if not match[0]]
+            headers = [match for match in headers if not match[0]]
+        
+        if any(dangling for _, _, _, dangling in headers):
+            self._scan_candidates(block)
+        else:
+            self.lists += len(matches) - len(headers)
+            for _, code, title, _ in headers:
+                (self.sections if '-S' in code else self.chapters).append(title.rstrip())
+        return gap
+    
+    def _scan_candidates(self, block: str):
+        """检查可能是标题或列表的行，各模式分别记录上一个匹配的结束位置，与 findall 一样不重叠"""
+        starts = [match.start() + 1 for match in _CANDIDATE_PATTERN.finditer(block)]
+        if _FIRST_CANDIDATE_PATTERN.match(block):
+            starts.insert(0, 0)
+        
+        chapter_end = section_end = list_end = numbered_end = 0
+        for start in starts:
+            if block.startswith('CH', start):
+                if start >= chapter_end:
+                    match = CHAPTER_PATTERN.match(block, start)
+                    if match:
+                        self.chapters.append(match.group(1).strip())
+                        chapter_end = match.end()
+                if start >= section_end:
+                    match = SECTION_PATTERN.match(block, start)
+                    if match:
+                        self.sections.append(match.group(1).strip())
+                        section_end = match.end()
+            else:
+                if start >= list_end:
+                    match = LIST_PATTERN.match(block, start)
+                    if match:
+                        self.lists += 1
+                        list_end = match.end()
+                if start >= numbered_end:
+                    match = NUMBERED_LIST_PATTERN.match(block, start)
+                    if match:
+                        self.lists += 1
+                        numbered_end = match.end()
+    
+    def _scan_quotes(self, block: str):
+        """统计【...】引用：【之后到下一个】之间至少有一个字符，引用可以跨行和跨块"""
+        position = 0
+        while True:
+            if not self._quote_open:
+                position = block.find('【', position)
+                if position < 0:
+                    return
+                self._quote_open = True
+                self._quote_filled = False
+                position += 1
+            
+            close = block.find('】', position)
+            if close < 0:
+                self._quote_filled = self._quote_filled or position < len(block)
+                return
+            if close > position or self._quote_filled:
+                self.quotes += 1
+                position = close + 1
+            # 紧跟着】的【不构成引用，从它之后继续查找
+            self._quote_open = False
+
+def _is_dense(block: str) -> bool:
+    """块是否是按空格分词的文本"""
+    if block.isascii():
+        return True
+    sample = block[:_DENSE_SAMPLE]
+    return sample.count(' ') * _DENSE_RATIO > len(sample)
+
+def _has_unicode_spaces(data: bytes) -> bool:
+    """UTF-8 字节中是否有按字节统计时无法识别的非 ASCII 空白字符"""
+    if _IDEOGRAPHIC_SPACE_PATTERN.search(data):
+        return True
+    if b'\xc2' in data or b'\xe1' in data or b'\xe2' in data:
+        return _UNICODE_SPACE_PATTERN.search(data) is not None
+    return False
+
+def _count_paragraphs(text: str, gap: bool) -> int:
+    """text.split('\n\n') 中不是空白的段数，gap 表示是否有空行之后紧跟空白字符的位置"""
+    if gap:
+        pieces = text.split('\n\n')
+        return len(pieces) - pieces.count('') - sum(map(str.isspace, pieces))
+    
+    # 空行之后不是空白字符时，只有第一段和最后一段可能是空白
+    first = text.find('\n\n')
+    if first < 0:
+        return 0 if _is_blank(text) else 1
+    last = text.rfind('\n\n')
+    return text.count('\n\n') + 1 - _is_blank(text[:first]) - _is_blank(text[last + 2:])
+
+def _count_words(block: str, data: bytes) -> int:
+    """
+    按 UTF-8 字节统计块内的单词数（非空白字符段的个数）
+    
+    空白字符标为 1 后按字节拼成一个整数，与右移一个字节的自身异或，
+    得到相邻字符一个是空白一个不是的位置，每段空白在开头和结尾各有一个（位于块首的空白段只有结尾）。
+    """
+    if not block:
+        return 0
+    flags = int.from_bytes(data.translate(_SPACE_FLAGS, _CONTINUATION_BYTES), 'little')
+    leading = block[0].isspace()
+    spaces = (_popcount(flags ^ (flags >> 8)) + leading) // 2
+    return spaces + (not leading) - block[-1].isspace()
+
+def _is_blank(text: str) -> bool:
+    return not text or text.isspace()
+
+def scan_structure(pieces: Iterable[str]) -> Dict[str, Any]:
+    """
+    单遍扫描依次产出的文本段，返回结构分析结果
+    
+    Args:
+        pieces: 文本段，例如文件按块读取的内容
+    
+    Returns:
+        Dict[str, Any]: 与 TextProcessor.analyze_text_structure 相同格式的结果
+    """
+    scanner = StructureScanner()
+    for piece in pieces:
+        scanner.feed(piece)
+    return scanner.close()
+
+def scan_text(content: str, window_size: int = DEFAULT_WINDOW_SIZE) -> Dict[str, Any]:
+    """
+    扫描整个文本，返回结构分析结果
+    
+    直接在文本中每隔 window_size 个字符查找切块位置，每块只复制一次，统计都在缓存中完成，
+    比整体处理更快，也不需要整个文本大小的临时字节串。
+    """
+    scanner = StructureScanner()
+    start = 0
+    for end in range(window_size, len(content), window_size):
+        cut = scanner._find_cut(content, max(start, end - window_size - 2), end)
+        if cut > start:
+            scanner._scan_block(content[start:cut])
+            start = cut
+    scanner._buffer = content[start:]
+    return scanner.close()
@@ -8,11 +8,87 @@
 import re
 import os
 import logging
-from typing import List, Dict, Any, Tuple
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, repeat
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Iterator, Iterable, Optional, Callable
 from pathlib import Path
+from dataclasses import dataclass, field
+
+from core.token_estimator import TokenEstimator, get_token_estimator
+from core.mapped_text import MappedText
+from core.structure_scanner import DEFAULT_WINDOW_SIZE as STRUCTURE_WINDOW_SIZE, scan_structure, scan_text
+from core.text_normalizer import TextNormalizer
+from core.structure_index import LineMap, StructureIndex, build_structure_index
 
 logger = logging.getLogger(__name__)
 
+# 章节标题标准化模式（按顺序依次应用）
+_CHAPTER_HEADER_PATTERNS = [
+    re.compile(r'第\s*(\d+)\s*章\s*(.+)', re.MULTILINE),
+    re.compile(r'Chapter\s*(\d+)\s*(.+)', re.MULTILINE),
+    re.compile(r'CHAPTER\s*(\d+)\s*(.+)', re.MULTILINE),
+    re.compile(r'第\s*(\d+)\s*节\s*(.+)', re.MULTILINE),
+    re.compile(r'(\d+)\s*[、．]\s*(.+)', re.MULTILINE),
+]
+
+# 小节标题标准化模式（在章节模式之后按顺序应用）
+_SECTION_HEADER_PATTERNS = [
+    re.compile(r'第\s*(\d+)\s*章\s*第\s*(\d+)\s*节\s*(.+)', re.MULTILINE),
+    re.compile(r'(\d+)\.(\d+)\s+(.+)', re.MULTILINE),
+    re.compile(r'(\d+)-(\d+)\s+(.+)', re.MULTILINE),
+]
+
+# 以上所有标题形式的并集：任何一个标准化模式的匹配都必然包含它的一个匹配
+_HEADER_CANDIDATE_PATTERN = re.compile(
+    r'第\s*\d+\s*[章节]|Chapter\s*\d+|CHAPTER\s*\d+|\d+(?:\s*[、．]|[.\-]\d+\s)'
+)
+
+# 行首的缩进（换行符以外的空白）之后紧跟非空白字符：安全切分位置所在的行必须匹配
+_INDENTED_CONTENT = re.compile(r'[^\S\r\n]*\S')
+
+# 建立结构索引时顺序预处理的分段长度（字符），每段预处理后与原始文本逐行对应
+_MAPPED_BLOCK_SIZE = 1024 * 1024
+
+# 并行预处理时文本长度低于该值则在当前进程内处理，避免启动进程池的开销
+_PARALLEL_MIN_SIZE = 1024 * 1024
+# 每个工作进程分到的文本段数，段数多于进程数时各进程的负载更均衡
+_PIECES_PER_WORKER = 4
+
+@dataclass
+class ChunkView:
+    """
+    文本块视图
+    
+    所有块共享同一份预处理后的文本 source，只记录偏移量；重叠内容是前一个块
+    末尾的 source[overlap_start:overlap_end]。只在需要字符串时（例如调用 LLM API）
+    才通过 str() 物化，避免每个块及其重叠区域各复制一份。
+    """
+    source: str = field(repr=False)
+    start: int
+    end: int
+    overlap_start: int = 0
+    overlap_end: int = 0
+    
+    def __str__(self) -> str:
+        return self.source[self.overlap_start:self.overlap_end] + self.source[self.start:self.end]
+    
+    def __len__(self) -> int:
+        return self.overlap_end - self.overlap_start + self.end - self.start
+    
+    @property
+    def overlap_length(self) -> int:
+        """重叠内容的字符数"""
+        return self.overlap_end - self.overlap_start
+    
+    def body(self) -> str:
+        """不含重叠内容的块正文"""
+        return self.source[self.start:self.end]
+    
+    def overlap(self) -> str:
+        """块开头的重叠内容（前一个块的末尾）"""
+        return self.source[self.overlap_start:self.overlap_end]
+
 class TextProcessor:
     """文本处理器类"""
     
@@ -21,15 +97,24 @@ class TextProcessor:
         self.settings = settings
         self.chunk_size = settings.get('chunk_size', 4000)  # 每个块的最大字符数
         self.overlap_size = settings.get('overlap_size', 200)  # 块之间的重叠字符数
+        self.stream_read_size = settings.get('stream_read_size', 64 * 1024)  # 流式读取时每次读取的字符数
+        self.chunking_mode = settings.get('chunking_mode', 'characters')  # characters: 按字符数, tokens: 按模型token预算
+        self.token_fill_ratio = settings.get('token_fill_ratio', 0.8)  # 按token分块时每块占模型 max_tokens 的比例
+        self.parallel_preprocessing = settings.get('parallel_preprocessing', False)  # 在进程池中并行预处理和分块
+        self.preprocess_workers = settings.get('preprocess_workers', 0) or os.cpu_count() or 1
+        self.mmap_min_size = settings.get('mmap_min_size', 64 * 1024 * 1024)  # 不小于该字节数的文件通过 mmap 按窗口解码
+        self.mmap_window_size = settings.get('mmap_window_size', 1024 * 1024)  # mmap 读取时每次解码的字节数
+        self.normalization = settings.get('normalization', {})  # 字符映射、符号删除和空格合并，见 core/text_normalizer.py
+        self.normalizer = TextNormalizer.from_config(self.normalization)
+        self.structure_index: Optional[StructureIndex] = None  # 最近一次 prepare_views 建立的结构索引
         
         # 标题模式
         self.chapter_pattern = re.compile(r'^CH\d+\s+(.+)$', re.MULTILINE)
         self.section_pattern = re.compile(r'^CH\d+-S\d+\s+(.+)$', re.MULTILINE)
         
-        # 特殊标记模式
-        self.quote_pattern = re.compile(r'【([^】]+)】')
-        self.list_pattern = re.compile(r'^[\s]*[-•]\s+(.+)$', re.MULTILINE)
-        self.numbered_list_pattern = re.compile(r'^[\s]*\d+\.\s+(.+)$', re.MULTILINE)
+        # 分割用的标题行模式：允许行首空白，等价于对 strip 后的行使用上面的模式
+        self.chapter_line_pattern = re.compile(r'^[^\S\n]*CH\d+[^\S\n]+\S', re.MULTILINE)
+        self.section_line_pattern = re.compile(r'^[^\S\n]*CH\d+-S\d+[^\S\n]+\S', re.MULTILINE)
     
     def load_and_chunk_text(self, file_path: str) -> List[str]:
         """
@@ -48,11 +133,8 @@ class TextProcessor:
             
             logger.info(f"成功读取文件: {file_path}, 字符数: {len(content)}")
             
-            # 预处理文本
-            processed_content = self._preprocess_text(content)
-            
-            # 分块处理
-            chunks = self._chunk_text(processed_content)
+            # 预处理并分块
+            chunks = [str(view) for view in self.prepare_views(content)]
             
             logger.info(f"文本分块完成，共 {len(chunks)} 个块")
             
@@ -62,12 +144,348 @@ class TextProcessor:
             logger.error(f"读取文件失败: {e}")
             raise
     
-    def _preprocess_text(self, content: str) -> str:
+    def load_chunk_views(self, file_path: str,
+                         models: Optional[List[Tuple[str, int]]] = None) -> List[ChunkView]:
+        """
+        加载文本文件并分块，返回共享同一份预处理文本的块视图
+        
+        Args:
+            file_path: 文件路径
+            models: 按分配顺序排列的 (模型名称, max_tokens) 列表，
+                    chunking_mode 为 tokens 时按各模型的token预算分块
+            
+        Returns:
+            List[ChunkView]: 文本块视图列表
+        """
+        try:
+            content = self.read_text(file_path)
+            views = self.prepare_views(content, models)
+            
+            logger.info(f"文本分块完成，共 {len(views)} 个块")
+            
+            return views
+            
+        except Exception as e:
+            logger.error(f"读取文件失败: {e}")
+            raise
+    
+    def read_text(self, file_path: str) -> str:
+        """
+        读取整个文本文件
+        
+        大文件通过 mmap 按窗口解码，避免同时持有整个文件的字节和解码后的文本，但返回的
+        仍是完整的字符串，内存占用与文件大小成正比（处理流程需要全部块共享同一份预处理后的
+        文本）。需要与文件大小无关的内存占用时使用 iter_text_chunks 流式分块，或通过
+        open_mapped 按窗口、按字符偏移读取。
+        """
+        if self._use_mmap(file_path):
+            with self.open_mapped(file_path) as mapped:
+                content = mapped.read()
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        
+        logger.info(f"成功读取文件: {file_path}, 字符数: {len(content)}")
+        return content
+    
+    def prepare_views(self, content: str, models: Optional[List[Tuple[str, int]]] = None,
+                      build_index: bool = False) -> List[ChunkView]:
+        """
+        预处理原始文本并分块
+        
+        开启 parallel_preprocessing 且文本足够大时，预处理和按字符数分块都在进程池中
+        按段并行，结果与顺序处理完全一致；按token分块只并行预处理部分。
+        build_index 为 True 时预处理的同时记录预处理前后的行对应关系，建立结构索引
+        （self.structure_index，字节位置尚未换算），按字符数分块直接使用索引中的
+        章节和小节标题位置，不再重新查找标题。
+        """
+        by_tokens = self.chunking_mode == 'tokens' and models
+        workers = self.preprocess_workers if self.parallel_preprocessing else 1
+        processed_content = None
+        self.structure_index = None
+        if build_index:
+            # 与预处理的第一步相同；原始文本中的偏移按统一换行后的文本计算，与 MappedText 一致
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        
+        if workers > 1 and len(content) >= _PARALLEL_MIN_SIZE:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    line_map = LineMap() if build_index else None
+                    processed_content = self._preprocess_parallel(content, executor, workers, line_map)
+                    headers = self._build_index(processed_content, line_map)
+                    if not by_tokens:
+                        return self._chunk_views_parallel(processed_content, executor, workers, headers)
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"并行预处理失败，改为顺序处理: {e}")
+                processed_content = None
+                self.structure_index = None
+        
+        if processed_content is None:
+            line_map = LineMap() if build_index else None
+            processed_content = self._preprocess_mapped(content, line_map)
+            headers = self._build_index(processed_content, line_map)
+        
+        if by_tokens:
+            return self.chunk_views_by_tokens(processed_content, models)
+        spans = self._chunk_spans(processed_content, 0, len(processed_content), self.chunk_size, headers)
+        return self._overlap_views(processed_content, spans)
+    
+    def _preprocess_mapped(self, content: str, line_map: Optional[LineMap]) -> str:
+        """预处理原始文本；提供行映射时在安全切分位置分段预处理，并记录每段的行对应关系"""
+        if line_map is None:
+            return self._preprocess_text(content)
+        
+        pieces = []
+        processed_length = 0
+        position = 0
+        while position < len(content):
+            target = position + _MAPPED_BLOCK_SIZE
+            end = len(content) if target >= len(content) else self._safe_cut_after(content, target)
+            raw = content[position:end]
+            merges = []
+            processed = self._preprocess_text(raw, merges)
+            self._map_lines(raw, position, processed, processed_length, merges, line_map)
+            pieces.append(processed)
+            processed_length += len(processed)
+            position = end
+        return ''.join(pieces)
+    
+    def _map_lines(self, raw: str, raw_offset: int, processed: str, processed_offset: int,
+                   merges: List[Tuple[int, int, int]], line_map: LineMap):
+        """
+        记录一段原始文本与预处理结果的行对应关系
+        
+        除标题标准化合并的行（merges）外两边的非空行按顺序对应；只有字符清理删空了某一行时
+        对不上，此时在中间的安全切分位置把这一段分成两半分别重新预处理，直到不能再分的一段
+        对应到整段原始文本。
+        """
+        if line_map.add(raw, raw_offset, processed, processed_offset, merges):
+            return
+        
+        middle = self._safe_cut_after(raw, len(raw) // 2 + 1)
+        if middle >= len(raw):
+            middle = self._safe_cut_before(raw, len(raw) // 2, 0)
+        if middle <= 0:
+            line_map.add_merged(raw, raw_offset, processed, processed_offset)
+            return
+        
+        for start, end in ((0, middle), (middle, len(raw))):
+            merges = []
+            piece = self._preprocess_text(raw[start:end], merges)
+            self._map_lines(raw[start:end], raw_offset + start, piece, processed_offset, merges, line_map)
+            processed_offset += len(piece)
+    
+    def _build_index(self, content: str,
+                     line_map: Optional[LineMap]) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        建立结构索引
+        
+        Returns:
+            Optional[Tuple[List[int], List[int]]]: 章节和小节标题行的行首位置，供分块使用；
+            不建立索引时返回 None
+        """
+        if line_map is None:
+            return None
+        
+        self.structure_index = build_structure_index(content, line_map)
+        return tuple([content.rfind('\n', 0, start) + 1 for start in self.structure_index.starts(kind)]
+                     for kind in ('chapter', 'section'))
+    
+    def _preprocess_parallel(self, content: str, executor: ProcessPoolExecutor, workers: int,
+                             line_map: Optional[LineMap] = None) -> str:
+        """
+        并行预处理原始文本
+        
+        在安全切分位置把文本切成大致等长的若干段（任何预处理正则的匹配都不会跨越
+        安全切分位置，与流式读取的分块预处理相同），各段在工作进程中预处理后按顺序拼接。
+        提供行映射时在当前进程中记录每段的行对应关系。
+        """
+        piece_size = max(1, len(content) // (workers * _PIECES_PER_WORKER))
+        cuts = [0]
+        while cuts[-1] < len(content):
+            target = cuts[-1] + piece_size
+            cuts.append(len(content) if target >= len(content) else self._safe_cut_after(content, target))
+        
+        pieces = [content[start:end] for start, end in zip(cuts, cuts[1:])]
+        if line_map is None:
+            return ''.join(executor.map(_preprocess_piece, pieces, repeat(self.normalization)))
+        
+        processed = []
+        processed_offset = 0
+        for start, piece, (result, merges) in zip(cuts, pieces, executor.map(
+                _preprocess_mapped_piece, pieces, repeat(self.normalization))):
+            self._map_lines(piece, start, result, processed_offset, merges, line_map)
+            processed.append(result)
+            processed_offset += len(result)
+        return ''.join(processed)
+    
+    def _chunk_views_parallel(self, content: str, executor: ProcessPoolExecutor, workers: int,
+                              headers: Optional[Tuple[List[int], List[int]]] = None) -> List[ChunkView]:
+        """
+        并行分块预处理后的文本
+        
+        在章节标题行处把文本切成大致等长的若干段：每章的分块只取决于本章内容，
+        各段在工作进程中分块后把区间平移回全文，再统一添加重叠区域。
+        """
+        piece_size = max(1, len(content) // (workers * _PIECES_PER_WORKER))
+        if headers is None:
+            chapter_starts = [match.start() for match in self.chapter_line_pattern.finditer(content, 1)]
+        else:
+            chapter_starts = headers[0][bisect_right(headers[0], 0):]
+        cuts = [0]
+        for start in chapter_starts:
+            if start - cuts[-1] >= piece_size:
+                cuts.append(start)
+        cuts.append(len(content))
+        
+        pieces = [content[start:end] for start, end in zip(cuts, cuts[1:])]
+        spans = []
+        for offset, piece_spans in zip(cuts, executor.map(_chunk_piece, pieces, repeat(self.chunk_size))):
+            spans.extend((offset + start, offset + end) for start, end in piece_spans)
+        
+        return self._overlap_views(content, spans)
+    
+    def open_mapped(self, file_path: str) -> MappedText:
+        """
+        以内存映射方式打开文本文件
+        
+        返回的 MappedText 支持逐窗口、逐行读取和按字符偏移切片，
+        并可把字符偏移换算为文件字节位置，使用完毕后需要关闭。
+        """
+        return MappedText(file_path, 'utf-8', self.mmap_window_size)
+    
+    def _use_mmap(self, file_path: str) -> bool:
+        """文件是否大到需要通过 mmap 读取"""
+        return os.path.getsize(file_path) >= self.mmap_min_size
+    
+    def iter_text_chunks(self, file_path: str) -> Iterator[str]:
+        """
+        流式加载文本文件并逐块产出
+        
+        与 load_and_chunk_text 的输出逐字节一致，但不会一次性读入整个文件：
+        文件按 stream_read_size 增量读取，在安全的行边界处切成预处理块，
+        再逐行送入章节/小节/段落分割状态机。峰值内存与 chunk_size、
+        overlap_size 及单个段落长度相关，而与文件大小无关。
+        
+        Args:
+            file_path: 文件路径
+            
+        Yields:
+            str: 添加重叠内容后的文本块
+        """
+        try:
+            if self._use_mmap(file_path):
+                source = self.open_mapped(file_path)
+                pieces = source.iter_windows()
+            else:
+                source = open(file_path, 'r', encoding='utf-8')
+                pieces = iter(lambda: source.read(self.stream_read_size), '')
+            
+            with source:
+                blocks = self._iter_preprocessed_blocks(pieces)
+                lines = self._iter_lines(blocks)
+                chunk_count = 0
+                for chunk in self._add_overlap_stream(self._stream_chunks(lines)):
+                    chunk_count += 1
+                    yield chunk
+            
+            logger.info(f"流式分块完成: {file_path}, 共 {chunk_count} 个块")
+            
+        except Exception as e:
+            logger.error(f"流式读取文件失败: {e}")
+            raise
+    
+    def _iter_preprocessed_blocks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """增量读取文件，在安全边界处切块并逐块预处理"""
+        buffer = ""
+        for piece in pieces:
+            # 最后一行可能只读到了缩进，它的行首在读入新内容后才能判断是否安全
+            scan_floor = buffer.rfind('\n') + 1
+            buffer += piece
+            cut = self._find_safe_cut(buffer, scan_floor)
+            if cut > 0:
+                yield self._preprocess_text(buffer[:cut])
+                buffer = buffer[cut:]
+        
+        yield self._preprocess_text(buffer)
+    
+    def _find_safe_cut(self, text: str, scan_floor: int) -> int:
+        """
+        查找最靠后的安全切分位置
+        
+        安全位置 p 满足：text[p-1] 是换行符，从 p 开始的一行在可能的缩进（例如全角空格
+        “　　”）之后有非空白字符，且 p 之前最后一个非空白字符不可能是标题模式中紧接空白
+        匹配的部分。这样任何预处理正则的匹配都不会跨越 p，分块预处理与整体预处理结果一致。
+        p 的有效性只取决于 p 之前的文本和 p 所在行的缩进，因此只需检查 scan_floor
+        （上次读到的最后一行的行首）之后的位置。
+        
+        Returns:
+            int: 切分位置，没有找到时返回 0
+        """
+        newline = text.rfind('\n', 0, len(text) - 1)
+        while newline >= 0 and newline + 1 >= scan_floor:
+            if self._is_safe_cut(text, newline + 1):
+                return newline + 1
+            newline = text.rfind('\n', 0, newline)
+        return 0
+    
+    def _is_safe_cut(self, text: str, position: int) -> bool:
+        """判断 position（位于换行符之后）是否为安全切分位置"""
+        if position >= len(text):
+            return False
+        if text[position].isspace() and not _INDENTED_CONTENT.match(text, position):
+            return False
+        i = position - 2
+        while i >= 0 and text[i].isspace():
+            i -= 1
+        return i < 0 or not self._is_header_joint(text[i])
+    
+    @staticmethod
+    def _is_header_joint(char: str) -> bool:
+        """判断字符后面的空白是否可能被标题模式跨行匹配"""
+        return char.isdecimal() or char in '第章节rR、．'
+    
+    @staticmethod
+    def _iter_lines(blocks: Iterable[str]) -> Iterator[str]:
+        """将文本块流转换为行流，结果与 content.split('\\n') 一致"""
+        remainder = ""
+        for block in blocks:
+            lines = (remainder + block).split('\n')
+            remainder = lines.pop()
+            yield from lines
+        yield remainder
+    
+    def _stream_chunks(self, lines: Iterable[str]) -> Iterator[str]:
+        """逐行执行章节、小节、段落分割，结果与 _chunk_text 去掉重叠前一致"""
+        def make_paragraph_packer():
+            return _ParagraphPacker(self.chunk_size)
+        
+        def make_section_splitter():
+            return _HeaderSplitter(self.section_pattern, self.chunk_size,
+                                   make_paragraph_packer, skip_leading_blank=True)
+        
+        chapters = _HeaderSplitter(self.chapter_pattern, self.chunk_size, make_section_splitter)
+        for line in lines:
+            yield from chapters.add(line)
+        yield from chapters.close()
+    
+    def _add_overlap_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """流式版本的 _add_overlap，只保留前一个块"""
+        previous_chunk = None
+        for chunk in chunks:
+            if previous_chunk is not None and len(previous_chunk) > self.overlap_size:
+                yield previous_chunk[-self.overlap_size:] + chunk
+            else:
+                yield chunk
+            previous_chunk = chunk
+    
+    def _preprocess_text(self, content: str, merges: Optional[list] = None) -> str:
         """
         预处理文本
         
         Args:
             content: 原始文本内容
+            merges: 提供时收集标题标准化合并的行，见 _normalize_headers
             
         Returns:
             str: 预处理后的文本
@@ -78,17 +496,79 @@ class TextProcessor:
         # 清理多余的空行
         content = re.sub(r'\n\s*\n\s*\n', '\n\n', content)
         
-        # 确保章节标题格式正确
-        content = self._normalize_chapter_headers(content)
-        
-        # 确保小节标题格式正确
-        content = self._normalize_section_headers(content)
+        # 确保章节、小节标题格式正确
+        content = self._normalize_headers(content, merges)
         
         # 清理特殊字符
         content = self._clean_special_characters(content)
         
         return content
     
+    def _normalize_headers(self, content: str, merges: Optional[list] = None) -> str:
+        """
+        单遍标准化章节和小节标题
+        
+        用预编译的并集模式一次扫描全文定位候选标题，只把候选所在的、两端
+        都是安全切分位置的窗口交给逐模式改写，其余文本原样保留。由于任何
+        标题匹配都不会跨越安全切分位置，结果与先后执行
+        _normalize_chapter_headers、_normalize_section_headers 完全一致。
+        
+        标题会与后面的行合并为一行。提供 merges 时为每个行数改变的窗口追加
+        (窗口之前的非空行数, 窗口的非空行数, 标准化后的非空行数)，供结构索引对应原始行。
+        """
+        parts = []
+        windows = []
+        position = 0
+        
+        while True:
+            match = _HEADER_CANDIDATE_PATTERN.search(content, position)
+            if not match:
+                break
+            
+            start = self._safe_cut_before(content, match.start(), position)
+            end = self._safe_cut_after(content, match.end())
+            
+            window = content[start:end]
+            normalized = self._normalize_chapter_headers(window)
+            normalized = self._normalize_section_headers(normalized)
+            if merges is not None and normalized.count('\n') != window.count('\n'):
+                windows.append((start, _count_lines(window), _count_lines(normalized)))
+            
+            parts.append(content[position:start])
+            parts.append(normalized)
+            position = end
+        
+        if windows:
+            # 窗口开头都是行首：按全文各行的行首查出窗口之前的非空行数
+            lines = content.split('\n')
+            line_starts = list(accumulate(chain([0], map((1).__add__, map(len, lines)))))
+            ranks = list(accumulate(chain([0], map(bool, map(str.strip, lines)))))
+            merges.extend((ranks[bisect_left(line_starts, start)], before, after) for start, before, after in windows)
+        
+        if not parts:
+            return content
+        
+        parts.append(content[position:])
+        return ''.join(parts)
+    
+    def _safe_cut_before(self, content: str, index: int, floor: int) -> int:
+        """查找不晚于 index 的最近安全切分位置，floor 本身已知是安全的"""
+        line_start = content.rfind('\n', floor, index) + 1
+        while line_start > floor:
+            if self._is_safe_cut(content, line_start):
+                return line_start
+            line_start = content.rfind('\n', floor, line_start - 1) + 1
+        return floor
+    
+    def _safe_cut_after(self, content: str, index: int) -> int:
+        """查找不早于 index 的最近安全切分位置"""
+        newline = content.find('\n', index - 1)
+        while newline >= 0:
+            if self._is_safe_cut(content, newline + 1):
+                return newline + 1
+            newline = content.find('\n', newline + 1)
+        return len(content)
+    
     def _normalize_chapter_headers(self, content: str) -> str:
         """标准化章节标题格式"""
         def replace_chapter(match):
@@ -97,16 +577,8 @@ class TextProcessor:
             return f"CH{chapter_num} {title}"
         
         # 匹配各种可能的章节标题格式
-        patterns = [
-            r'第\s*(\d+)\s*章\s*(.+)',
-            r'Chapter\s*(\d+)\s*(.+)',
-            r'CHAPTER\s*(\d+)\s*(.+)',
-            r'第\s*(\d+)\s*节\s*(.+)',
-            r'(\d+)\s*[、．]\s*(.+)',
-        ]
-        
-        for pattern in patterns:
-            content = re.sub(pattern, replace_chapter, content, flags=re.MULTILINE)
+        for pattern in _CHAPTER_HEADER_PATTERNS:
+            content = pattern.sub(replace_chapter, content)
         
         return content
     
@@ -119,30 +591,14 @@ class TextProcessor:
             return f"CH{chapter_num}-S{section_num} {title}"
         
         # 匹配各种可能的小节标题格式
-        patterns = [
-            r'第\s*(\d+)\s*章\s*第\s*(\d+)\s*节\s*(.+)',
-            r'(\d+)\.(\d+)\s+(.+)',
-            r'(\d+)-(\d+)\s+(.+)',
-        ]
-        
-        for pattern in patterns:
-            content = re.sub(pattern, replace_section, content, flags=re.MULTILINE)
+        for pattern in _SECTION_HEADER_PATTERNS:
+            content = pattern.sub(replace_section, content)
         
         return content
     
     def _clean_special_characters(self, content: str) -> str:
-        """清理特殊字符"""
-        # 替换全角字符为半角
-        content = content.replace('（', '(').replace('）', ')')
-        content = content.replace('，', ',').replace('。', '.')
-        content = content.replace('；', ';').replace('：', ':')
-        content = content.replace('"', '"').replace('"', '"')
-        content = content.replace(''', "'").replace(''', "'")
-        
-        # 清理多余的空格
-        content = re.sub(r' +', ' ', content)
-        
-        return content
+        """清理特殊字符：全角标点转半角、删除配置的符号、合并多余的空格"""
+        return self.normalizer.normalize(content)
     
     def _chunk_text(self, content: str) -> List[str]:
         """
@@ -154,86 +610,250 @@ class TextProcessor:
         Returns:
             List[str]: 文本块列表
         """
-        chunks = []
+        return [str(view) for view in self.chunk_views(content)]
+    
+    def chunk_views(self, content: str, chunk_size: Optional[int] = None,
+                    start: int = 0, end: Optional[int] = None) -> List[ChunkView]:
+        """
+        将预处理后的文本分块为视图
         
-        # 首先按章节分割
-        chapter_splits = self._split_by_chapters(content)
+        先按章节分割，过长的章节按小节分割，仍然过长的按段落打包，
+        最后为每个块记录前一个块末尾的重叠区域。传入已有视图的 source
+        和新的 chunk_size 即可重新分块，无需重新读取和预处理；传入
+        start、end（例如结构索引中某一章节的区间）时只分块 content[start:end]。
         
-        for chapter in chapter_splits:
-            if len(chapter) <= self.chunk_size:
-                chunks.append(chapter)
-            else:
-                # 章节太长，需要进一步分割
-                sub_chunks = self._split_by_sections(chapter)
-                for sub_chunk in sub_chunks:
-                    if len(sub_chunk) <= self.chunk_size:
-                        chunks.append(sub_chunk)
-                    else:
-                        # 按段落分割
-                        paragraph_chunks = self._split_by_paragraphs(sub_chunk)
-                        chunks.extend(paragraph_chunks)
+        Args:
+            content: 预处理后的文本内容
+            chunk_size: 每个块的最大字符数，默认使用设置中的值
+            start: 分块区间的起始字符偏移
+            end: 分块区间的结束字符偏移，默认到文本末尾
+            
+        Returns:
+            List[ChunkView]: 文本块视图列表，偏移量相对于整个 content
+        """
+        limit = self.chunk_size if chunk_size is None else chunk_size
+        spans = self._chunk_spans(content, start, len(content) if end is None else end, limit)
         
         # 添加重叠内容以确保连续性
-        chunks = self._add_overlap(chunks)
+        return self._overlap_views(content, spans)
+    
+    def _chunk_spans(self, content: str, start: int, end: int, limit: int,
+                     headers: Optional[Tuple[List[int], List[int]]] = None) -> List[Tuple[int, int]]:
+        """
+        按章节、小节、段落把 content[start:end] 分割为不超过 limit 的区间（不含重叠）
+        
+        headers 为结构索引中章节和小节标题行的行首位置，提供时不再重新查找标题。
+        """
+        chapter_starts, section_starts = headers or (None, None)
+        spans = []
+        
+        # 首先按章节分割
+        for chapter in self._header_spans(content, start, end, self.chapter_line_pattern, chapter_starts):
+            if chapter[1] - chapter[0] <= limit:
+                spans.append(chapter)
+                continue
+            
+            # 章节太长，需要进一步分割
+            for section in self._header_spans(content, chapter[0], chapter[1], self.section_line_pattern,
+                                              section_starts):
+                if section[1] - section[0] <= limit:
+                    spans.append(section)
+                else:
+                    # 按段落分割
+                    spans.extend(self._paragraph_spans(content, section[0], section[1], limit))
         
-        return chunks
+        return spans
     
-    def _split_by_chapters(self, content: str) -> List[str]:
-        """按章节分割文本"""
-        chapters = []
-        current_chapter = ""
+    def chunk_views_by_tokens(self, content: str, models: List[Tuple[str, int]]) -> List[ChunkView]:
+        """
+        按模型的token预算将预处理后的文本打包为视图
         
-        lines = content.split('\n')
-        for line in lines:
-            if self.chapter_pattern.match(line.strip()):
-                if current_chapter:
-                    chapters.append(current_chapter.strip())
-                current_chapter = line + '\n'
+        调度器（包括重试和故障转移）可能把任何一个块交给任何一个模型，因此每个块都要
+        放得进所有模型：按各模型的估算器计数，都不超过该模型 max_tokens 乘以
+        token_fill_ratio，重叠内容也计入预算。段落可以跨章节连续打包，
+        单个段落超出预算时先在行边界、再在字符处切开，保证每个块都不超过预算。
+        
+        Args:
+            content: 预处理后的文本内容
+            models: 参与调度的 (模型名称, max_tokens) 列表
+            
+        Returns:
+            List[ChunkView]: 文本块视图列表
+        """
+        if not models:
+            raise ValueError("没有可用的模型配置，无法按token分块")
+        
+        # 使用同一估算器的模型只需要满足其中最小的预算
+        budgets: Dict[TokenEstimator, int] = {}
+        for model, max_tokens in models:
+            estimator = get_token_estimator(model)
+            budget = max(1, int(max_tokens * self.token_fill_ratio))
+            budgets[estimator] = min(budget, budgets.get(estimator, budget))
+        estimators = list(budgets)
+        
+        spans = []
+        available = self._token_budget(content, spans, budgets)
+        chunk_start = None
+        chunk_end = 0
+        
+        for start, end in self._paragraph_units(content):
+            while start < end:
+                # 计入与上一段之间的分隔空白
+                segment = content[start if chunk_start is None else chunk_end:end]
+                tokens = [estimator.count(segment) for estimator in estimators]
+                if all(count <= limit for count, limit in zip(tokens, available)):
+                    if chunk_start is None:
+                        chunk_start = start
+                    chunk_end = end
+                    available = [limit - count for count, limit in zip(tokens, available)]
+                    break
+                
+                if chunk_start is not None:
+                    spans.append((chunk_start, chunk_end))
+                    chunk_start = None
+                else:
+                    # 单个段落超出整块预算，切出能放下的最长前缀
+                    cut = self._token_prefix_end(content, start, end, estimators, available)
+                    spans.append(self._strip_span(content, start, cut))
+                    start = self._strip_span(content, cut, end)[0]
+                available = self._token_budget(content, spans, budgets)
+        
+        if chunk_start is not None:
+            spans.append((chunk_start, chunk_end))
+        
+        return self._overlap_views(content, spans)
+    
+    def _token_budget(self, content: str, spans: List[Tuple[int, int]],
+                      budgets: Dict[TokenEstimator, int]) -> List[int]:
+        """返回下一个块在各估算器下扣除重叠内容后的可用token数"""
+        overlap = ''
+        if spans:
+            start, end = spans[-1]
+            if end - start > self.overlap_size:
+                overlap = content[end - self.overlap_size if self.overlap_size else start:end]
+        return [budget - estimator.count(overlap) for estimator, budget in budgets.items()]
+    
+    def _paragraph_units(self, content: str) -> Iterator[Tuple[int, int]]:
+        """逐个产出去除首尾空白后的非空段落区间"""
+        position = 0
+        while position <= len(content):
+            separator = content.find('\n\n', position)
+            paragraph_end = len(content) if separator < 0 else separator
+            start, end = self._strip_span(content, position, paragraph_end)
+            if start < end:
+                yield start, end
+            if separator < 0:
+                break
+            position = separator + 2
+    
+    @staticmethod
+    def _token_prefix_end(content: str, start: int, end: int,
+                          estimators: List[TokenEstimator], available: List[int]) -> int:
+        """查找 content[start:cut] 在各估算器下都不超过可用token数的最大 cut，优先在换行处切开"""
+        low, high = start + 1, end
+        while low < high:
+            middle = (low + high + 1) // 2
+            piece = content[start:middle]
+            if all(estimator.count(piece) <= limit for estimator, limit in zip(estimators, available)):
+                low = middle
             else:
-                current_chapter += line + '\n'
+                high = middle - 1
+        
+        newline = content.rfind('\n', start, low)
+        return newline if newline > start else low
+    
+    def _overlap_views(self, content: str, spans: List[Tuple[int, int]]) -> List[ChunkView]:
+        """为块区间添加重叠区域，规则与 _add_overlap 相同"""
+        views = []
+        previous = None
         
-        if current_chapter:
-            chapters.append(current_chapter.strip())
+        for start, end in spans:
+            view = ChunkView(content, start, end, start, start)
+            if previous is not None and previous[1] - previous[0] > self.overlap_size:
+                # 与切片 [-overlap_size:] 一致，overlap_size 为 0 时取整个前一个块
+                view.overlap_start = previous[1] - self.overlap_size if self.overlap_size else previous[0]
+                view.overlap_end = previous[1]
+            views.append(view)
+            previous = (start, end)
         
-        return chapters
+        return views
+    
+    def _split_by_chapters(self, content: str) -> List[str]:
+        """按章节分割文本"""
+        spans = self._header_spans(content, 0, len(content), self.chapter_line_pattern)
+        return [content[start:end] for start, end in spans]
     
     def _split_by_sections(self, content: str) -> List[str]:
         """按小节分割文本"""
-        sections = []
-        current_section = ""
+        spans = self._header_spans(content, 0, len(content), self.section_line_pattern)
+        return [content[start:end] for start, end in spans]
+    
+    def _split_by_paragraphs(self, content: str) -> List[str]:
+        """按段落分割文本"""
+        spans = self._paragraph_spans(content, 0, len(content), self.chunk_size)
+        return [content[start:end] for start, end in spans]
+    
+    def _header_spans(self, content: str, start: int, end: int, line_pattern,
+                      line_starts: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+        """
+        按标题行位置分割 content[start:end]
         
-        lines = content.split('\n')
-        for line in lines:
-            if self.section_pattern.match(line.strip()):
-                if current_section:
-                    sections.append(current_section.strip())
-                current_section = line + '\n'
-            else:
-                current_section += line + '\n'
+        每个标题行开始一个新分组，标题之前的内容（如果有）单独成组，
+        每组去除首尾空白。只记录标题偏移量，耗时与文本长度成线性关系。
+        提供已知的标题行行首 line_starts（有序）时直接使用，不再查找。
         
-        if current_section:
-            sections.append(current_section.strip())
+        Returns:
+            List[Tuple[int, int]]: 各分组去除首尾空白后的区间
+        """
+        # start 总是一个分组的开头；从 start + 1 开始查找时 '^' 只会匹配区间内真正的行首
+        if line_starts is None:
+            headers = [match.start() for match in line_pattern.finditer(content, start + 1, end)]
+        else:
+            headers = line_starts[bisect_right(line_starts, start):bisect_left(line_starts, end)]
+        starts = [start] + headers
+        ends = starts[1:] + [end]
         
-        return sections
+        return [self._strip_span(content, a, b) for a, b in zip(starts, ends)]
     
-    def _split_by_paragraphs(self, content: str) -> List[str]:
-        """按段落分割文本"""
-        paragraphs = content.split('\n\n')
-        chunks = []
-        current_chunk = ""
+    def _paragraph_spans(self, content: str, start: int, end: int, limit: int) -> List[Tuple[int, int]]:
+        """按段落打包 content[start:end]，每块不超过 limit（单个段落过长时除外）"""
+        spans = []
+        chunk_start = None  # 当前块的起止位置，None 表示当前块为空
+        chunk_end = 0
+        position = start
         
-        for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) <= self.chunk_size:
-                current_chunk += paragraph + '\n\n'
+        while True:
+            separator = content.find('\n\n', position, end)
+            paragraph_end = end if separator < 0 else separator
+            
+            # 当前块的长度包含末尾追加的段落分隔符
+            current_length = 0 if chunk_start is None else chunk_end - chunk_start + 2
+            if current_length + paragraph_end - position <= limit:
+                if chunk_start is None:
+                    chunk_start = position
             else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = paragraph + '\n\n'
+                if chunk_start is not None:
+                    spans.append(self._strip_span(content, chunk_start, chunk_end))
+                chunk_start = position
+            chunk_end = paragraph_end
+            
+            if separator < 0:
+                break
+            position = separator + 2
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        if chunk_start is not None:
+            spans.append(self._strip_span(content, chunk_start, chunk_end))
         
-        return chunks
+        return spans
+    
+    @staticmethod
+    def _strip_span(content: str, start: int, end: int) -> Tuple[int, int]:
+        """返回 content[start:end].strip() 对应的区间"""
+        while start < end and content[start].isspace():
+            start += 1
+        while end > start and content[end - 1].isspace():
+            end -= 1
+        return start, end
     
     def _add_overlap(self, chunks: List[str]) -> List[str]:
         """为文本块添加重叠内容"""
@@ -263,50 +883,171 @@ class TextProcessor:
         """
         分析文本结构
         
+        单遍扫描统计字符、单词、行、段落、引用、列表和章节小节标题，
+        结果与逐项 split 和 findall 相同（见 core.structure_scanner）。
+        
         Args:
             content: 文本内容
             
         Returns:
             Dict[str, Any]: 结构分析结果
         """
-        analysis = {
-            'total_characters': len(content),
-            'total_words': len(content.split()),
-            'total_lines': len(content.split('\n')),
-            'chapters': [],
-            'sections': [],
-            'paragraphs': 0,
-            'quotes': 0,
-            'lists': 0
-        }
-        
-        # 分析章节
-        chapter_matches = self.chapter_pattern.findall(content)
-        for i, title in enumerate(chapter_matches, 1):
-            analysis['chapters'].append({
-                'number': i,
-                'title': title.strip()
-            })
-        
-        # 分析小节
-        section_matches = self.section_pattern.findall(content)
-        for title in section_matches:
-            analysis['sections'].append({
-                'title': title.strip()
-            })
-        
-        # 分析段落
-        paragraphs = [p for p in content.split('\n\n') if p.strip()]
-        analysis['paragraphs'] = len(paragraphs)
-        
-        # 分析引用
-        quote_matches = self.quote_pattern.findall(content)
-        analysis['quotes'] = len(quote_matches)
-        
-        # 分析列表
-        list_matches = self.list_pattern.findall(content)
-        numbered_list_matches = self.numbered_list_pattern.findall(content)
-        analysis['lists'] = len(list_matches) + len(numbered_list_matches)
-        
-        return analysis
+        return scan_text(content)
+    
+    def analyze_file_structure(self, file_path: str) -> Dict[str, Any]:
+        """
+        流式分析文本文件的结构，不需要把整个文件读入内存
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            Dict[str, Any]: 与 analyze_text_structure 相同的结构分析结果
+        """
+        if self._use_mmap(file_path):
+            source = self.open_mapped(file_path)
+            pieces = source.iter_windows()
+        else:
+            source = open(file_path, 'r', encoding='utf-8')
+            pieces = iter(lambda: source.read(STRUCTURE_WINDOW_SIZE), '')
+        
+        with source:
+            return scan_structure(pieces)
 
+def _preprocess_piece(text: str, normalization: Dict[str, Any]) -> str:
+    """在工作进程中按相同的规范化设置预处理一段原始文本"""
+    return TextProcessor({'normalization': normalization})._preprocess_text(text)
+
+def _preprocess_mapped_piece(text: str, normalization: Dict[str, Any]) -> Tuple[str, List[Tuple[int, int, int]]]:
+    """在工作进程中预处理一段原始文本，同时返回标题标准化合并的行"""
+    merges = []
+    return TextProcessor({'normalization': normalization})._preprocess_text(text, merges), merges
+
+def _count_lines(text: str) -> int:
+    """非空行数"""
+    return sum(1 for line in text.split('\n') if line.strip())
+
+def _chunk_piece(text: str, limit: int) -> List[Tuple[int, int]]:
+    """在工作进程中分块一段以章节标题开头的预处理文本，返回段内区间"""
+    return TextProcessor({})._chunk_spans(text, 0, len(text), limit)
+
+
+
+class _LineGroup:
+    """
+    流式分割中的一个分组（章节或小节）
+    
+    分组内容在确定超过 chunk_size 之前按行缓存；一旦去除首尾空白后的
+    长度超过限制，就把已缓存的行转交给下一级分割器，之后的行直接转发。
+    """
+    
+    def __init__(self, limit: int, make_child: Callable[[], Any]):
+        self.limit = limit
+        self.make_child = make_child
+        self.child = None
+        self.lines: List[str] = []
+        self.length = 0
+        self.first_char: Optional[int] = None
+        self.last_char = -1
+    
+    def add(self, line: str) -> Iterator[str]:
+        if self.child is not None:
+            yield from self.child.add(line)
+            return
+        
+        stripped = line.strip()
+        if stripped:
+            if self.first_char is None:
+                self.first_char = self.length + len(line) - len(line.lstrip())
+            self.last_char = self.length + len(line.rstrip()) - 1
+        self.lines.append(line)
+        self.length += len(line) + 1
+        
+        if self.first_char is not None and self.last_char - self.first_char + 1 > self.limit:
+            self.child = self.make_child()
+            lines, self.lines = self.lines, []
+            for buffered_line in lines:
+                yield from self.child.add(buffered_line)
+    
+    def close(self) -> Iterator[str]:
+        if self.child is not None:
+            yield from self.child.close()
+        else:
+            yield ('\n'.join(self.lines) + '\n').strip()
+
+
+class _HeaderSplitter:
+    """按标题行分组的流式分割器，对应 _split_by_chapters / _split_by_sections"""
+    
+    def __init__(self, pattern, limit: int, make_child: Callable[[], Any],
+                 skip_leading_blank: bool = False):
+        self.pattern = pattern
+        self.limit = limit
+        self.make_child = make_child
+        # 小节分割作用于已 strip 的章节文本，开头的空白行不会形成分组
+        self.skip_leading_blank = skip_leading_blank
+        self.group: Optional[_LineGroup] = None
+    
+    def add(self, line: str) -> Iterator[str]:
+        stripped = line.strip()
+        if self.group is None and self.skip_leading_blank and not stripped:
+            return
+        
+        if self.pattern.match(stripped):
+            if self.group is not None:
+                yield from self.group.close()
+            self.group = _LineGroup(self.limit, self.make_child)
+        elif self.group is None:
+            self.group = _LineGroup(self.limit, self.make_child)
+        
+        yield from self.group.add(line)
+    
+    def close(self) -> Iterator[str]:
+        if self.group is not None:
+            yield from self.group.close()
+
+
+class _ParagraphPacker:
+    """流式段落打包器，对应 _split_by_paragraphs"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.pending = ""
+        self.scan_from = 0
+        self.started = False
+        self.current_chunk = ""
+    
+    def add(self, line: str) -> Iterator[str]:
+        text = line + '\n'
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return
+            self.started = True
+        self.pending += text
+        
+        # 只有后面还跟着非空白字符的分隔符才属于 strip 后的正文
+        end = len(self.pending.rstrip())
+        while True:
+            index = self.pending.find('\n\n', self.scan_from, end)
+            if index < 0:
+                break
+            paragraph = self.pending[:index]
+            self.pending = self.pending[index + 2:]
+            end -= index + 2
+            self.scan_from = 0
+            yield from self._pack(paragraph)
+        self.scan_from = max(0, end - 1)
+    
+    def close(self) -> Iterator[str]:
+        yield from self._pack(self.pending.rstrip())
+        if self.current_chunk:
+            yield self.current_chunk.strip()
+    
+    def _pack(self, paragraph: str) -> Iterator[str]:
+        if len(self.current_chunk) + len(paragraph) <= self.limit:
+            self.current_chunk += paragraph + '\n\n'
+        else:
+            if self.current_chunk:
+                yield self.current_chunk.strip()
+            self.current_chunk = paragraph + '\n\n'
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token估算模块
+负责估算文本在不同模型下的token数量
+"""
+
+import re
+import math
+import logging
+from functools import lru_cache
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+# 字符类别模式
+_CJK_PATTERN = re.compile(r'[\u3001-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff01-\uffef]+')
+_ALNUM_PATTERN = re.compile(r'[A-Za-z0-9]+')
+_SPACE_PATTERN = re.compile(r'\s+')
+
+# 各模型系列每个字符的token估算值：(CJK字符, 英文数字字符, 空白字符, 其他字符)
+# 取偏大的值，宁可多分块也不超过模型的上限
+_MODEL_RATES = {
+    'gpt-4': (1.3, 0.3, 0.5, 1.0),
+    'gpt-3.5': (1.3, 0.3, 0.5, 1.0),
+    'claude': (1.4, 0.3, 0.5, 1.0),
+}
+_DEFAULT_RATES = (1.5, 0.35, 0.5, 1.0)
+
+class TokenEstimator:
+    """Token估算器类"""
+    
+    def __init__(self, model: str, encoding=None):
+        """
+        初始化Token估算器
+        
+        Args:
+            model: 模型名称
+            encoding: tiktoken编码（可选），提供时使用精确计数
+        """
+        self.model = model
+        self.encoding = encoding
+        self.rates = self._select_rates(model)
+    
+    @staticmethod
+    def _select_rates(model: str) -> Tuple[float, float, float, float]:
+        """按模型名称前缀选择估算系数"""
+        for prefix, rates in _MODEL_RATES.items():
+            if model.startswith(prefix):
+                return rates
+        return _DEFAULT_RATES
+    
+    def count(self, text: str) -> int:
+        """
+        估算文本的token数量
+        
+        Args:
+            text: 文本内容
+        
+        Returns:
+            int: token数量
+        """
+        if not text:
+            return 0
+        
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        
+        cjk_rate, alnum_rate, space_rate, other_rate = self.rates
+        cjk = sum(map(len, _CJK_PATTERN.findall(text)))
+        alnum = sum(map(len, _ALNUM_PATTERN.findall(text)))
+        space = sum(map(len, _SPACE_PATTERN.findall(text)))
+        other = len(text) - cjk - alnum - space
+        
+        return math.ceil(cjk * cjk_rate + alnum * alnum_rate + space * space_rate + other * other_rate)
+
+@lru_cache(maxsize=None)
+def get_token_estimator(model: str) -> TokenEstimator:
+    """
+    获取模型的Token估算器（按模型缓存）
+    
+    安装了 tiktoken 且能识别模型时使用精确计数，否则使用按字符类别的估算。
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(model)
+        logger.info(f"模型 {model} 使用 tiktoken 计数")
+        return TokenEstimator(model, encoding)
+    except (ImportError, KeyError):
+        return TokenEstimator(model)
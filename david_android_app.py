@@ -23,6 +23,11 @@ from kivy.core.window import Window
 from kivy.uix.progressbar import ProgressBar
 from kivy.clock import Clock
 
+from core.encoding_detector import decode_file
+from core.text_normalizer import DECORATIVE_SYMBOLS, TextNormalizer
+
+SYMBOL_NORMALIZER = TextNormalizer(delete_characters=DECORATIVE_SYMBOLS)
+
 class DavidApp(App):
     def build(self):
         # 设置窗口大小（手机屏幕尺寸）
@@ -209,20 +214,8 @@ class DavidApp(App):
             self.show_error(f"处理失败: {e}")
     
     def read_text_file(self, file_path):
-        """读取文本文件，尝试多种编码"""
-        encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16', 'latin-1']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                return content
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                continue
-        
-        raise Exception("无法读取文件，尝试了所有编码格式")
+        """读取文本文件，自动检测编码"""
+        return decode_file(file_path)[0]
     
     def process_text_with_pagination(self, text):
         """处理文本并添加分页"""
@@ -231,12 +224,7 @@ class DavidApp(App):
         text = re.sub(r'\*([^*]+)\*', r'\1', text)      # 移除 *text*
         text = re.sub(r'^#+\s*', '', text, flags=re.MULTILINE)  # 移除行首的 # 符号
         text = re.sub(r'#+', '', text)  # 移除所有的 # 符号
-        text = re.sub(r'[□■▪▫▬▭▮▯]', '', text)  # 移除小方形符号
-        text = re.sub(r'[•·◦‣⁃]', '', text)  # 移除项目符号
-        
-        # 多次清理确保彻底
-        for _ in range(10):
-            text = re.sub(r'[▪▫▬▭▮▯]', '', text)  # 移除更多方形符号
+        text = SYMBOL_NORMALIZER.normalize(text)  # 一次移除方形符号和项目符号
         
         # 按段落分割
         paragraphs = text.split('\n\n')
@@ -9,17 +9,14 @@ import re
 import webbrowser
 from datetime import datetime
 
+from core.encoding_detector import decode_file
+
 def read_file_with_encoding(file_path):
-    """尝试不同编码读取文件"""
-    encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16', 'latin-1']
-    
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                return f.read()
-        except:
-            continue
-    return None
+    """自动检测编码读取文件，读取失败时返回None"""
+    try:
+        return decode_file(file_path)[0]
+    except OSError:
+        return None
 
 def process_text(text):
     """处理文本"""
@@ -16,6 +16,10 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.popup import Popup
 from kivy.core.window import Window
 
+from core.text_normalizer import DECORATIVE_SYMBOLS, TextNormalizer
+
+SYMBOL_NORMALIZER = TextNormalizer(delete_characters=DECORATIVE_SYMBOLS)
+
 class DavidSimpleApp(App):
     def build(self):
         Window.size = (360, 640)
@@ -116,12 +120,7 @@ class DavidSimpleApp(App):
         text = re.sub(r'\*([^*]+)\*', r'\1', text)
         text = re.sub(r'^#+\s*', '', text, flags=re.MULTILINE)
         text = re.sub(r'#+', '', text)
-        text = re.sub(r'[□■▪▫▬▭▮▯]', '', text)
-        text = re.sub(r'[•·◦‣⁃]', '', text)
-        
-        # 多次清理
-        for _ in range(10):
-            text = re.sub(r'[▪▫▬▭▮▯]', '', text)
+        text = SYMBOL_NORMALIZER.normalize(text)
         
         # 处理段落
         paragraphs = text.split('\n\n')
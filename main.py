@@ -14,13 +14,17 @@ import json
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
 # 导入自定义模块
 from core.text_processor import TextProcessor
 from core.llm_coordinator import LLMCoordinator
 from core.formatting_engine import FormattingEngine
+from core.format_manifest import FormatManifest
+from core.checkpoint_journal import CheckpointJournal
+from core.structure_index import StructureIndex, index_path
+from core.profiler import PipelineProfiler, StageRecord, text_bytes
 from core.content_validator import ContentValidator
 from ui.main_interface import MainInterface
 from config.settings import Settings
@@ -47,6 +51,11 @@ class ProcessingResult:
     processing_time: float
     errors: List[str]
     warnings: List[str]
+    input_file: str = ""
+    job_id: str = ""  # 中断后可用于恢复处理的任务ID
+    queue_time: float = 0.0  # 批处理时从批处理开始到该文件开始处理的时间（秒）
+    wall_time: float = 0.0  # 批处理时从批处理开始到该文件处理完成的时间（秒）
+    profile: Dict[str, Any] = field(default_factory=dict)  # 各阶段耗时、数据量、LLM延迟分布和内存峰值
 
 class DavidApp:
     """大卫应用程序主类"""
@@ -65,13 +74,16 @@ class DavidApp:
         
         logger.info("大卫应用程序初始化完成")
     
-    def process_text_file(self, input_file: str, output_file: Optional[str] = None) -> ProcessingResult:
+    def process_text_file(self, input_file: str, output_file: Optional[str] = None,
+                          job_id: Optional[str] = None) -> ProcessingResult:
         """
         处理文本文件的主要方法
         
         Args:
             input_file: 输入文件路径
             output_file: 输出文件路径（可选）
+            job_id: 任务ID（可选），默认由输入文件路径生成；同一任务再次处理时
+                    跳过检查点中已完成的文本块
             
         Returns:
             ProcessingResult: 处理结果
@@ -79,45 +91,54 @@ class DavidApp:
         start_time = datetime.now()
         errors = []
         warnings = []
+        job_id = job_id or self.make_job_id(input_file)
+        profiler = PipelineProfiler()
+        self.llm_coordinator.profiler = profiler
         
         try:
             logger.info(f"开始处理文件: {input_file}")
             
             # 1. 读取和预处理文本
             logger.info("步骤1: 读取和预处理文本")
-            text_chunks = self.text_processor.load_and_chunk_text(input_file)
-            original_word_count = sum(len(chunk.split()) for chunk in text_chunks)
+            text_chunks = self._load_chunks(input_file, profiler)
+            original_word_count = sum(len(str(chunk).split()) for chunk in text_chunks)
+            chunk_bytes = sum(text_bytes(chunk) for chunk in text_chunks)
             
-            # 2. 使用多个LLM协调处理
-            logger.info("步骤2: 使用多个LLM协调处理")
-            processed_chunks = self.llm_coordinator.process_chunks(text_chunks)
-            
-            # 3. 应用排版规则
-            logger.info("步骤3: 应用排版规则")
-            formatted_text = self.formatting_engine.format_text(processed_chunks)
-            
-            # 4. 验证内容完整性
-            logger.info("步骤4: 验证内容完整性")
-            validation_result = self.content_validator.validate_content(
-                original_chunks=text_chunks,
-                processed_chunks=processed_chunks,
-                formatted_text=formatted_text
-            )
-            
-            if not validation_result.is_valid:
-                errors.extend(validation_result.errors)
-                warnings.extend(validation_result.warnings)
-            
-            # 5. 保存结果
-            if not output_file:
-                output_file = self._generate_output_filename(input_file)
-            
-            logger.info("步骤5: 保存结果")
-            self._save_formatted_text(formatted_text, output_file)
+            if self.settings.get('streaming_output', False):
+                # 2-5. 流式处理：按顺序完成的块立即排版并写入输出文件（不进行整体内容验证）
+                logger.info("步骤2-5: 流式处理并逐步写入输出文件")
+                if not output_file:
+                    output_file = self._generate_output_filename(input_file)
+                with profiler.stage('stream', chunk_bytes) as stage:
+                    processed_word_count = self._stream_formatted_text(text_chunks, output_file)
+                    stage.bytes_out = os.path.getsize(output_file)
+            elif self.settings.get('incremental_formatting', False):
+                # 2-5. 增量处理：只处理上次处理后改动的块，未改动的排版片段直接复用（不进行整体内容验证）
+                logger.info("步骤2-5: 增量处理并写入输出文件")
+                if not output_file:
+                    output_file = self._generate_output_filename(input_file)
+                with profiler.stage('incremental', chunk_bytes) as stage:
+                    processed_word_count = self._incremental_formatted_text(input_file, text_chunks, output_file)
+                    stage.bytes_out = os.path.getsize(output_file)
+            else:
+                if not output_file:
+                    output_file = self._generate_output_filename(input_file)
+                
+                # 2. 使用多个LLM协调处理，完成的块写入检查点日志
+                logger.info("步骤2: 使用多个LLM协调处理")
+                with profiler.stage('llm', chunk_bytes) as stage:
+                    journal = self._open_checkpoint(job_id, input_file, output_file)
+                    processed_chunks = self._process_with_checkpoint(journal, job_id, text_chunks)
+                    stage.bytes_out = sum(text_bytes(chunk) for chunk in processed_chunks)
+                
+                # 3-5. 排版、验证并保存
+                processed_word_count = self._format_and_save(text_chunks, processed_chunks, output_file,
+                                                             errors, warnings, profiler)
+                if journal is not None:
+                    journal.discard()
             
             # 计算处理时间
             processing_time = (datetime.now() - start_time).total_seconds()
-            processed_word_count = len(formatted_text.split())
             
             logger.info(f"文件处理完成: {output_file}")
             logger.info(f"处理时间: {processing_time:.2f}秒")
@@ -130,7 +151,10 @@ class DavidApp:
                 processed_word_count=processed_word_count,
                 processing_time=processing_time,
                 errors=errors,
-                warnings=warnings
+                warnings=warnings,
+                input_file=input_file,
+                job_id=job_id,
+                profile=self._profile_report(profiler, self._trace_path(job_id))
             )
             
         except Exception as e:
@@ -145,8 +169,159 @@ class DavidApp:
                 processed_word_count=0,
                 processing_time=(datetime.now() - start_time).total_seconds(),
                 errors=errors,
-                warnings=warnings
+                warnings=warnings,
+                input_file=input_file,
+                job_id=job_id,
+                profile=self._profile_report(profiler, self._trace_path(job_id))
             )
+        finally:
+            self.llm_coordinator.profiler = None
+    
+    def _load_chunks(self, input_file: str, profiler: PipelineProfiler, file_id: int = 0) -> List[Any]:
+        """读取并预处理文本，分块为视图"""
+        models = [(config.model, config.max_tokens) for config in self.llm_coordinator.llm_configs]
+        
+        with profiler.stage('read', os.path.getsize(input_file), file_id) as stage:
+            content = self.text_processor.read_text(input_file)
+            stage.bytes_out = text_bytes(content)
+        
+        build_index = self.settings.get('structure_index_enabled', True)
+        with profiler.stage('preprocess', stage.bytes_out, file_id) as stage:
+            text_chunks = self.text_processor.prepare_views(content, models, build_index=build_index)
+            stage.bytes_out = sum(text_bytes(chunk) for chunk in text_chunks)
+        
+        index = self.text_processor.structure_index
+        if index is not None and text_chunks:
+            with profiler.stage('index', os.path.getsize(input_file), file_id):
+                self.text_processor.structure_index = self._save_structure_index(input_file, index)
+        
+        logger.info(f"文本分块完成，共 {len(text_chunks)} 个块")
+        return text_chunks
+    
+    def _save_structure_index(self, input_file: str, index: StructureIndex) -> StructureIndex:
+        """
+        保存预处理时建立的结构索引
+        
+        输入文件旁边已有对应同一文件的索引时直接使用；否则把索引换算为输入文件中的
+        字节位置（只解码一遍文件）后保存。
+        """
+        path = index_path(input_file)
+        content_hash = StructureIndex.file_hash(input_file)
+        existing = StructureIndex.load(path)
+        if existing is not None and existing.matches(content_hash) and existing.char_length == index.char_length:
+            return existing
+        
+        with self.text_processor.open_mapped(input_file) as mapped:
+            index.resolve_byte_offsets(mapped, content_hash)
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.warning(f"保存结构索引失败: {e}")
+        else:
+            logger.info(f"结构索引已保存: {path}，{index.count('chapter')} 章，{index.count('paragraph')} 段")
+        return index
+    
+    def _trace_path(self, job_id: str) -> str:
+        """任务的 Chrome trace 文件路径"""
+        return os.path.join(self.settings.get('temp_directory', 'temp'), 'traces', f"{job_id}.trace.json")
+    
+    def _profile_report(self, profiler: PipelineProfiler, trace_file: str) -> Dict[str, Any]:
+        """汇总性能数据，启用 profile_trace 时导出 Chrome trace"""
+        if self.settings.get('profile_trace', False):
+            try:
+                os.makedirs(os.path.dirname(trace_file) or '.', exist_ok=True)
+                profiler.export_chrome_trace(trace_file)
+            except OSError as e:
+                logger.warning(f"导出性能 trace 失败: {e}")
+        return profiler.report()
+    
+    def resume_job(self, job_id: str) -> ProcessingResult:
+        """
+        按任务ID恢复中断的处理，跳过检查点中已完成的文本块
+        
+        Args:
+            job_id: process_text_file 返回的任务ID
+            
+        Returns:
+            ProcessingResult: 处理结果
+        """
+        journal_path = self._journal_path(job_id)
+        if not os.path.exists(journal_path):
+            raise FileNotFoundError(f"找不到任务 {job_id} 的检查点日志: {journal_path}")
+        
+        info = CheckpointJournal.read_info(journal_path)
+        logger.info(f"恢复任务 {job_id}: {info.get('input_file')}")
+        return self.process_text_file(info['input_file'], info.get('output_file') or None, job_id)
+    
+    @staticmethod
+    def make_job_id(input_file: str) -> str:
+        """由输入文件路径生成任务ID"""
+        digest = FormatManifest.make_key(os.path.abspath(input_file))[:16]
+        return f"{Path(input_file).stem}_{digest}"
+    
+    def _journal_path(self, job_id: str) -> str:
+        """任务对应的检查点日志路径"""
+        return os.path.join(self.settings.get('temp_directory', 'temp'), 'jobs', f"{job_id}.jsonl")
+    
+    def _open_checkpoint(self, job_id: str, input_file: str, output_file: str) -> Optional[CheckpointJournal]:
+        """打开任务的检查点日志，未启用检查点时返回None"""
+        if not self.settings.get('checkpoint_enabled', True):
+            return None
+        
+        info = {'job_id': job_id, 'input_file': os.path.abspath(input_file), 'output_file': output_file}
+        return CheckpointJournal(self._journal_path(job_id), self._processing_fingerprint(), info,
+                                 self.settings.get('checkpoint_fsync_interval', 1.0))
+    
+    def _process_with_checkpoint(self, journal: Optional[CheckpointJournal], job_id: str,
+                                 text_chunks: List[Any]) -> List[str]:
+        """LLM处理文本块：跳过检查点中已完成的块，新完成的块逐个记录"""
+        if journal is None:
+            return self.llm_coordinator.process_chunks(text_chunks)
+        
+        try:
+            return journal.process_chunks(text_chunks, self.llm_coordinator.process_chunks)
+        except BaseException:
+            logger.error(f"处理中断，已完成的文本块保存在检查点中，可使用任务ID {job_id} 恢复")
+            raise
+        finally:
+            journal.close()
+    
+    def _format_and_save(self, text_chunks: List[Any], processed_chunks: List[str], output_file: str,
+                         errors: List[str], warnings: List[str], profiler: PipelineProfiler,
+                         file_id: int = 0) -> int:
+        """
+        排版、验证内容完整性并保存结果，验证发现的问题追加到 errors 和 warnings
+        
+        Returns:
+            int: 输出的词数
+        """
+        processed_bytes = sum(text_bytes(chunk) for chunk in processed_chunks)
+        
+        # 3. 应用排版规则
+        logger.info("步骤3: 应用排版规则")
+        with profiler.stage('format', processed_bytes, file_id) as stage:
+            formatted_text = self.formatting_engine.format_text(processed_chunks, text_chunks)
+            stage.bytes_out = formatted_bytes = text_bytes(formatted_text)
+        
+        # 4. 验证内容完整性
+        logger.info("步骤4: 验证内容完整性")
+        with profiler.stage('validate', processed_bytes + formatted_bytes, file_id):
+            validation_result = self.content_validator.validate_content(
+                original_chunks=text_chunks,
+                processed_chunks=processed_chunks,
+                formatted_text=formatted_text
+            )
+        
+        if not validation_result.is_valid:
+            errors.extend(validation_result.errors)
+            warnings.extend(validation_result.warnings)
+        
+        # 5. 保存结果
+        logger.info("步骤5: 保存结果")
+        with profiler.stage('write', formatted_bytes, file_id) as stage:
+            self._save_formatted_text(formatted_text, output_file)
+            stage.bytes_out = os.path.getsize(output_file)
+        return len(formatted_text.split())
     
     def _generate_output_filename(self, input_file: str) -> str:
         """生成输出文件名"""
@@ -160,32 +335,226 @@ class DavidApp:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(text)
     
+    def _stream_formatted_text(self, text_chunks: List[Any], output_file: str) -> int:
+        """
+        流式处理并保存：LLM按顺序完成的块立即排版写入输出文件，不在内存中保留整个文档
+        
+        Returns:
+            int: 输出的词数
+        """
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            processed_chunks = self.llm_coordinator.iter_processed_chunks(text_chunks)
+            stats = self.formatting_engine.format_stream(processed_chunks, f, text_chunks)
+        
+        logger.info(f"首个排版片段写出用时 {stats['first_flush_time']:.2f}秒")
+        return stats['word_count']
+    
+    def _incremental_formatted_text(self, input_file: str, text_chunks: List[Any], output_file: str) -> int:
+        """
+        增量处理并保存：按输入文件的清单复用上次未改动块的处理结果和排版片段
+        
+        Returns:
+            int: 输出的词数
+        """
+        manifest = FormatManifest(self._manifest_path(input_file), self._processing_fingerprint())
+        processed_chunks = manifest.process_chunks(text_chunks, self.llm_coordinator.process_chunks)
+        
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            stats = self.formatting_engine.format_stream(processed_chunks, f, text_chunks, manifest)
+        manifest.save()
+        
+        manifest_stats = manifest.get_stats()
+        logger.info(f"增量处理完成: 复用 {manifest_stats['reused_chunks']} 个块、"
+                    f"{manifest_stats['reused_fragments']} 个排版片段，"
+                    f"重新处理 {manifest_stats['processed_chunks']} 个块")
+        return stats['word_count']
+    
+    def _manifest_path(self, input_file: str) -> str:
+        """输入文件对应的增量排版清单路径"""
+        digest = FormatManifest.make_key(os.path.abspath(input_file))[:16]
+        return os.path.join(self.settings.get('temp_directory', 'temp'), 'manifests', f"{Path(input_file).stem}_{digest}.json")
+    
+    def _processing_fingerprint(self) -> str:
+        """影响LLM处理结果的配置：提示词和各LLM的模型、温度"""
+        models = sorted(f"{config.name}/{config.model}/{config.temperature}" for config in self.llm_coordinator.llm_configs)
+        return FormatManifest.make_key(json.dumps({
+            'prompt_version': self.llm_coordinator.prompt_version,
+            'models': models
+        }, sort_keys=True))
+    
     def run_interactive_mode(self):
         """运行交互模式"""
         self.ui.run(self)
     
     def run_batch_mode(self, input_files: List[str], output_dir: str = "output"):
-        """运行批处理模式"""
+        """
+        运行批处理模式
+        
+        所有文件的文本块进入同一个LLM调度队列，某个文件的块全部处理完后立即排版、
+        验证并保存，LLM并发在文件之间保持饱和，小文件不必排在大文件之后。
+        流式处理和增量处理按文件逐个进行。
+        """
         logger.info(f"开始批处理模式，处理 {len(input_files)} 个文件")
         
+        profile = None
+        if self.settings.get('streaming_output', False) or self.settings.get('incremental_formatting', False):
+            results = self._run_batch_sequential(input_files, output_dir)
+        else:
+            profiler = PipelineProfiler()
+            self.llm_coordinator.profiler = profiler
+            try:
+                results = self._run_batch_shared_queue(input_files, output_dir, profiler)
+            finally:
+                self.llm_coordinator.profiler = None
+            profile = self._profile_report(profiler, os.path.join(output_dir, "batch_trace.json"))
+        
+        # 生成批处理报告
+        self._generate_batch_report(results, output_dir, profile)
+    
+    def _run_batch_sequential(self, input_files: List[str], output_dir: str) -> List[ProcessingResult]:
+        """逐个处理文件"""
+        batch_start = datetime.now()
         results = []
         for i, input_file in enumerate(input_files, 1):
             logger.info(f"处理文件 {i}/{len(input_files)}: {input_file}")
             
-            output_file = os.path.join(output_dir, f"formatted_{os.path.basename(input_file)}")
-            result = self.process_text_file(input_file, output_file)
+            queue_time = (datetime.now() - batch_start).total_seconds()
+            result = self.process_text_file(input_file, self._batch_output_file(input_file, output_dir))
+            result.queue_time = queue_time
+            result.wall_time = (datetime.now() - batch_start).total_seconds()
+            self._log_batch_result(result)
             results.append(result)
-            
-            if result.success:
-                logger.info(f"✓ 文件处理成功: {result.output_file}")
-            else:
-                logger.error(f"✗ 文件处理失败: {result.errors}")
         
-        # 生成批处理报告
-        self._generate_batch_report(results, output_dir)
+        return results
+    
+    def _run_batch_shared_queue(self, input_files: List[str], output_dir: str,
+                                profiler: PipelineProfiler) -> List[ProcessingResult]:
+        """所有文件的文本块共用一个LLM调度队列，按文件完成的先后排版保存"""
+        batch_start = datetime.now()
+        results: List[Optional[ProcessingResult]] = [None] * len(input_files)
+        
+        # 1. 从小到大逐个读取和预处理文件，每个文件读完立即进入调度队列，
+        #    读取失败的文件用空列表占位；排版保存后不再保留文件的块
+        order = sorted(range(len(input_files)), key=lambda index: self._file_size(input_files[index]))
+        loaded: Dict[int, List[Any]] = {}
+        
+        def load_files():
+            for index in order:
+                try:
+                    loaded[index] = self._load_chunks(input_files[index], profiler, index)
+                except Exception as e:
+                    loaded[index] = []
+                    results[index] = self._failed_batch_result(input_files[index],
+                                                               f"处理文件时发生错误: {str(e)}", batch_start)
+                yield loaded[index]
+        
+        # 2-5. 共用调度队列处理，每个文件完成后立即排版、验证并保存
+        llm_start = (datetime.now() - batch_start).total_seconds()
+        llm_profile_start = profiler.now()
+        try:
+            for file_result in self.llm_coordinator.iter_processed_batch(load_files()):
+                index = file_result.file_id = order[file_result.file_id]  # 换算为输入序号
+                text_chunks = loaded.pop(index)
+                if results[index] is not None:
+                    continue
+                queue_time = llm_start + file_result.queue_time
+                llm_start_offset = llm_profile_start + file_result.queue_time
+                profiler.add_stage(StageRecord(
+                    'llm', llm_start_offset, profiler.now() - llm_start_offset,
+                    bytes_in=sum(text_bytes(chunk) for chunk in text_chunks),
+                    bytes_out=sum(text_bytes(chunk) for chunk in file_result.results or []),
+                    file_id=index
+                ))
+                results[index] = self._finish_batch_file(input_files[index], output_dir, text_chunks,
+                                                         file_result, queue_time, batch_start, profiler)
+                self._log_batch_result(results[index])
+        except Exception as e:
+            logger.error(f"批处理调度失败: {e}")
+            for index, input_file in enumerate(input_files):
+                if results[index] is None:
+                    results[index] = self._failed_batch_result(input_file, f"处理文件时发生错误: {str(e)}", batch_start)
+        
+        return [result or self._failed_batch_result(input_file, "文件没有处理完成", batch_start)
+                for input_file, result in zip(input_files, results)]
+    
+    def _finish_batch_file(self, input_file: str, output_dir: str, text_chunks: List[Any], file_result,
+                           queue_time: float, batch_start: datetime,
+                           profiler: PipelineProfiler) -> ProcessingResult:
+        """排版、验证并保存批处理中LLM处理完成的一个文件"""
+        errors = []
+        warnings = []
+        output_file = ""
+        processed_word_count = 0
+        
+        if file_result.error is not None:
+            errors.append(f"处理文件时发生错误: {str(file_result.error)}")
+        else:
+            try:
+                output_file = self._batch_output_file(input_file, output_dir)
+                processed_word_count = self._format_and_save(text_chunks, file_result.results, output_file,
+                                                             errors, warnings, profiler, file_result.file_id)
+            except Exception as e:
+                output_file = ""
+                errors.append(f"处理文件时发生错误: {str(e)}")
+        
+        wall_time = (datetime.now() - batch_start).total_seconds()
+        return ProcessingResult(
+            success=len(errors) == 0,
+            output_file=output_file,
+            original_word_count=sum(len(str(chunk).split()) for chunk in text_chunks),
+            processed_word_count=processed_word_count,
+            processing_time=wall_time - queue_time,
+            errors=errors,
+            warnings=warnings,
+            input_file=input_file,
+            queue_time=queue_time,
+            wall_time=wall_time,
+            profile=profiler.report(file_result.file_id)
+        )
+    
+    @staticmethod
+    def _file_size(path: str) -> int:
+        """文件大小（字节），文件无法访问时为0，留给读取时报告错误"""
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    
+    @staticmethod
+    def _failed_batch_result(input_file: str, error_msg: str, batch_start: datetime) -> ProcessingResult:
+        """批处理中未能处理的文件"""
+        logger.error(error_msg)
+        wall_time = (datetime.now() - batch_start).total_seconds()
+        return ProcessingResult(
+            success=False,
+            output_file="",
+            original_word_count=0,
+            processed_word_count=0,
+            processing_time=0.0,
+            errors=[error_msg],
+            warnings=[],
+            input_file=input_file,
+            queue_time=wall_time,
+            wall_time=wall_time
+        )
+    
+    @staticmethod
+    def _batch_output_file(input_file: str, output_dir: str) -> str:
+        """批处理的输出文件路径"""
+        return os.path.join(output_dir, f"formatted_{os.path.basename(input_file)}")
+    
+    @staticmethod
+    def _log_batch_result(result: ProcessingResult):
+        if result.success:
+            logger.info(f"✓ 文件处理成功: {result.output_file}")
+        else:
+            logger.error(f"✗ 文件处理失败: {result.errors}")
     
-    def _generate_batch_report(self, results: List[ProcessingResult], output_dir: str):
-        """生成批处理报告"""
+    def _generate_batch_report(self, results: List[ProcessingResult], output_dir: str,
+                               profile: Optional[Dict[str, Any]] = None):
+        """生成批处理报告，profile 为整个批处理的性能数据（共用调度队列时提供）"""
         report_file = os.path.join(output_dir, "batch_report.json")
         
         report_data = {
@@ -194,19 +563,25 @@ class DavidApp:
             "successful_files": sum(1 for r in results if r.success),
             "failed_files": sum(1 for r in results if not r.success),
             "total_processing_time": sum(r.processing_time for r in results),
+            "batch_wall_time": max((r.wall_time for r in results), default=0.0),
             "results": [
                 {
-                    "input_file": getattr(r, 'input_file', ''),
+                    "input_file": r.input_file,
                     "output_file": r.output_file,
                     "success": r.success,
                     "word_count": r.processed_word_count,
                     "processing_time": r.processing_time,
+                    "queue_time": r.queue_time,
+                    "wall_time": r.wall_time,
                     "errors": r.errors,
-                    "warnings": r.warnings
+                    "warnings": r.warnings,
+                    "profile": r.profile
                 }
                 for r in results
             ]
         }
+        if profile is not None:
+            report_data["profile"] = profile
         
         with open(report_file, 'w', encoding='utf-8') as f:
             json.dump(report_data, f, ensure_ascii=False, indent=2)
@@ -225,7 +600,11 @@ def main():
         app = DavidApp()
         
         # 检查命令行参数
-        if len(sys.argv) > 1:
+        if len(sys.argv) == 3 and sys.argv[1] == '--resume':
+            # 按任务ID恢复中断的处理
+            result = app.resume_job(sys.argv[2])
+            print(f"{'处理完成' if result.success else '处理失败'}: {result.output_file or result.errors}")
+        elif len(sys.argv) > 1:
             # 批处理模式
             input_files = sys.argv[1:]
             app.run_batch_mode(input_files)
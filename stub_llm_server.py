@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地LLM桩服务器
+兼容 OpenAI chat/completions 和 Anthropic messages 接口（包括 stream 流式响应），用于测试和性能测试，
+可以配置响应延迟、模拟限流的并发上限和固定返回的错误状态码，并统计请求数和最大并发请求数。
+
+用法: python stub_llm_server.py [--port 8900] [--latency 0.2] [--throttle-above 0]
+"""
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 提示词中正文之前的最后一句说明，桩服务器把它后面的内容原样返回
+CONTENT_MARKER = "请直接返回格式化后的文本，不要添加任何解释："
+
+class StubHTTPServer(ThreadingHTTPServer):
+    """允许大量并发连接的HTTP服务器"""
+    
+    daemon_threads = True
+    request_queue_size = 1024
+
+class StubLLMServer:
+    """本地LLM桩服务器类"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 throttle_above: int = 0, error_status: int = 0, fail_first: int = 0):
+        """
+        初始化桩服务器
+        
+        Args:
+            host: 监听地址
+            port: 监听端口，0 表示自动分配
+            latency: 每个请求的响应延迟（秒）
+            throttle_above: 并发请求数超过该值时返回 429，0 表示不限流
+            error_status: 非 0 时所有请求都返回该状态码，用于模拟故障
+            fail_first: 前 fail_first 个请求返回 500，用于模拟短暂故障
+        """
+        self.latency = latency
+        self.throttle_above = throttle_above
+        self.error_status = error_status
+        self.fail_first = fail_first
+        self.request_count = 0
+        self.throttled_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        
+        stub = self
+        
+        class Handler(StubLLMHandler):
+            server_stub = stub
+        
+        self.httpd = StubHTTPServer((host, port), Handler)
+    
+    @property
+    def base_url(self) -> str:
+        """服务器地址，可直接用作 LLM 配置的 base_url"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self) -> 'StubLLMServer':
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """停止服务器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+    
+    def __enter__(self) -> 'StubLLMServer':
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+    
+    def reply(self, prompt: str) -> str:
+        """生成响应文本：返回提示词中的正文部分"""
+        if CONTENT_MARKER in prompt:
+            return prompt.split(CONTENT_MARKER, 1)[1].strip()
+        return prompt
+    
+    def _enter(self) -> bool:
+        """登记一个请求，超过限流并发数时返回 False"""
+        with self._lock:
+            self.request_count += 1
+            if self.throttle_above and self.in_flight >= self.throttle_above:
+                self.throttled_count += 1
+                return False
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return True
+    
+    def _take_failure(self) -> bool:
+        """短暂故障期间的请求返回 True"""
+        with self._lock:
+            if self.fail_first <= 0:
+                return False
+            self.fail_first -= 1
+            return True
+    
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """桩服务器请求处理类"""
+    
+    protocol_version = 'HTTP/1.1'  # 支持 keep-alive
+    server_stub: StubLLMServer = None
+    
+    def do_POST(self):
+        stub = self.server_stub
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        
+        if not stub._enter():
+            self._send_json(429, {'error': 'rate limited'}, {'Retry-After': '0'})
+            return
+        
+        try:
+            if stub.latency:
+                time.sleep(stub.latency)
+            
+            if stub.error_status or stub._take_failure():
+                self._send_json(stub.error_status or 500, {'error': 'stub failure'})
+                return
+            
+            prompt = ''.join(message.get('content', '') for message in request.get('messages', []))
+            text = stub.reply(prompt)
+            
+            if request.get('stream'):
+                self._send_stream(text)
+                return
+            
+            if self.path.endswith('/messages'):
+                body = {'content': [{'type': 'text', 'text': text}], 'model': request.get('model')}
+            elif self.path.endswith('/chat/completions'):
+                body = {'choices': [{'message': {'role': 'assistant', 'content': text}}],
+                        'model': request.get('model')}
+            else:
+                self._send_json(404, {'error': f"unknown path {self.path}"})
+                return
+            
+            self._send_json(200, body)
+        finally:
+            stub._leave()
+    
+    def _send_stream(self, text: str, piece_size: int = 16):
+        """以 SSE 事件流（分块传输编码）返回文本，每个事件一小段"""
+        anthropic = self.path.endswith('/messages')
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        for start in range(0, len(text), piece_size):
+            piece = text[start:start + piece_size]
+            if anthropic:
+                event = {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': piece}}
+            else:
+                event = {'choices': [{'index': 0, 'delta': {'content': piece}}]}
+            self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+        
+        self._write_chunk('data: {"type": "message_stop"}\n\n' if anthropic else 'data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+    
+    def _write_chunk(self, data: str):
+        encoded = data.encode('utf-8')
+        self.wfile.write(f"{len(encoded):x}\r\n".encode('ascii') + encoded + b'\r\n')
+    
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="本地LLM桩服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.2, help="每个请求的响应延迟（秒）")
+    parser.add_argument('--throttle-above', type=int, default=0, help="并发请求数超过该值时返回 429")
+    args = parser.parse_args()
+    
+    server = StubLLMServer(args.host, args.port, args.latency, args.throttle_above)
+    print(f"LLM桩服务器已启动: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服务器已停止")
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
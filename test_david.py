@@ -7,8 +7,12 @@ David Text Formatting Application Test Script
 
 import os
 import sys
+import json
+import re
+import time
 import tempfile
 import shutil
+import threading
 from pathlib import Path
 
 # 添加项目根目录到Python路径
@@ -55,6 +59,365 @@ CH2 另一个章节
         print(f"✗ 文本处理模块测试失败: {e}")
         return False
 
+def test_streaming_chunks():
+    """测试流式分块与整体分块结果一致"""
+    print("测试流式分块...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        
+        processor = TextProcessor({'chunk_size': 120, 'overlap_size': 20, 'stream_read_size': 37})
+        
+        sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples', 'sample_text.txt')
+        expected = processor.load_and_chunk_text(sample_file)
+        streamed = list(processor.iter_text_chunks(sample_file))
+        
+        assert streamed == expected, "流式分块结果与整体分块不一致"
+        print(f"✓ 流式分块完成: {len(streamed)} 个块，与整体分块一致")
+        
+        # 段首用全角空格缩进的中文：峰值内存只与块大小有关，与文件大小无关
+        import tracemalloc
+        paragraph = "　　这是一段首行缩进的中文正文，用于测试流式分块的峰值内存。" * 3
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write("第1章 开始\n\n" + "\n\n".join([paragraph] * 30000))
+            indented_file = f.name
+        try:
+            file_size = os.path.getsize(indented_file)
+            tracemalloc.start()
+            chunk_count = sum(1 for _ in TextProcessor({}).iter_text_chunks(indented_file))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        finally:
+            os.unlink(indented_file)
+        
+        assert peak < file_size / 2, f"缩进文本的峰值内存 {peak / 1e6:.1f} MB 随文件大小增长"
+        print(f"✓ 缩进文本流式分块: {file_size / 1e6:.1f} MB 文件，{chunk_count} 个块，峰值内存 {peak / 1e6:.1f} MB")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 流式分块测试失败: {e}")
+        return False
+
+def test_mapped_text():
+    """测试内存映射读取"""
+    print("测试内存映射读取...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        from core.mapped_text import MappedText
+        
+        sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples', 'sample_text.txt')
+        with open(sample_file, 'r', encoding='utf-8') as f:
+            sample = f.read()
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            # Windows 换行，窗口很小，使 \r\n 和多字节字符跨越窗口边界
+            path = os.path.join(temp_dir, 'crlf.txt')
+            with open(path, 'wb') as f:
+                f.write(sample.replace('\n', '\r\n').encode('utf-8'))
+            
+            with MappedText(path, 'utf-8', window_size=7) as mapped:
+                assert mapped.read() == sample, "按窗口解码的结果与文本模式不一致"
+                assert list(mapped.iter_lines()) == sample.split('\n'), "逐行读取结果不正确"
+                for start in range(0, len(sample), 97):
+                    assert mapped[start:start + 50] == sample[start:start + 50], f"偏移 {start} 的切片不正确"
+                    line_start = sample.rfind('\n', 0, start) + 1
+                    expected_byte = len(sample[:line_start].replace('\n', '\r\n').encode('utf-8')) + \
+                        len(sample[line_start:start].encode('utf-8'))
+                    assert mapped.byte_offset(start) == expected_byte, f"偏移 {start} 的字节位置不正确"
+            print("✓ 跨窗口换行、逐行读取、切片和字节位置换算正确")
+            
+            processor = TextProcessor({'chunk_size': 120, 'overlap_size': 20})
+            mapped_processor = TextProcessor({'chunk_size': 120, 'overlap_size': 20,
+                                              'mmap_min_size': 0, 'mmap_window_size': 53})
+            assert mapped_processor.load_and_chunk_text(path) == processor.load_and_chunk_text(path), \
+                "mmap 读取的分块结果不一致"
+            assert list(mapped_processor.iter_text_chunks(path)) == list(processor.iter_text_chunks(path)), \
+                "mmap 流式分块结果不一致"
+            print("✓ TextProcessor 通过 mmap 读取的分块结果一致")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 内存映射读取测试失败: {e}")
+        return False
+
+def test_structure_scanner():
+    """测试单遍文本结构扫描"""
+    print("测试单遍文本结构扫描...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        from core.structure_scanner import scan_structure, scan_text
+        from benchmarks.corpus import build_corpus
+        from benchmarks.bench_structure_scan import analyze_by_patterns
+        
+        processor = TextProcessor({'mmap_min_size': 0, 'mmap_window_size': 4096})
+        
+        # 标题和列表符号后换行（模式越过换行取下一行）、空白段、嵌套和跨块的引用、各种空白字符
+        edge_cases = [
+            "",
+            "\n\n\n",
+            "CH01\n\n第一章\nCH01-S01 \n \n- \n\n1.\nCH02  标题  \n",
+            "【】【a【b】c】\n\n  \n\n-\t项目\n•　项目\n12.5 不是列表\n   3. 列表",
+            "word　word\xa0word\x1cword  \n\n\n\n tail \r\n",
+            "CH01-S02",
+            "CH03 \n ",
+            "  lead and  trail words \n\n\n  x \n\nlast ",
+            "a b c d【e f】g h\u2028i j\u2000k l\u3000m n o\x85p q r s t u v w x y z "
+        ]
+        for text in edge_cases:
+            expected = analyze_by_patterns(text)
+            assert processor.analyze_text_structure(text) == expected, f"结果不一致: {text!r}"
+            pieces = [text[i:i + 3] for i in range(0, len(text), 3)]
+            assert scan_structure(pieces) == expected, f"分段送入时结果不一致: {text!r}"
+            assert scan_text(text, window_size=3) == expected, f"小窗口扫描时结果不一致: {text!r}"
+        print(f"✓ {len(edge_cases)} 个边界情况与逐项 split/findall 的结果一致")
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            for language in ('zh', 'en', 'mixed'):
+                content = build_corpus(0.3, language, seed=3)
+                expected = analyze_by_patterns(content)
+                assert processor.analyze_text_structure(content) == expected, f"{language} 语料结果不一致"
+                assert scan_text(content, window_size=4096) == expected, f"{language} 语料小窗口扫描结果不一致"
+                
+                path = os.path.join(temp_dir, f'{language}.txt')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                assert processor.analyze_file_structure(path) == expected, f"{language} 文件流式扫描结果不一致"
+            print(f"✓ 三种语言语料的结构分析一致（{expected['paragraphs']} 段，{len(expected['chapters'])} 章）")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ 单遍文本结构扫描测试失败: {e}")
+        return False
+
+def test_structure_index():
+    """测试结构索引"""
+    print("测试结构索引...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        from core.structure_index import KINDS, StructureIndex
+        from benchmarks.corpus import build_corpus
+        
+        processor = TextProcessor({'chunk_size': 400})
+        # 输入文件使用 CRLF 换行和段落缩进；语料中的章节标题预处理时会与下一行合并
+        content = build_corpus(0.3, 'mixed', seed=5)
+        content = re.sub(r'(?m)^(?=[^\sC\-【])', '　　', content).replace('\n', '\r\n')
+        temp_dir = tempfile.mkdtemp()
+        input_file = os.path.join(temp_dir, 'book.txt')
+        with open(input_file, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        
+        views = processor.prepare_views(content, build_index=True)
+        index = processor.structure_index
+        processed = views[0].source
+        assert views == processor.prepare_views(content), "建立索引时的分块结果与不建立时不同"
+        with processor.open_mapped(input_file) as mapped:
+            index.resolve_byte_offsets(mapped, StructureIndex.file_hash(input_file))
+        
+        structure = processor.analyze_text_structure(processed)
+        assert index.count('chapter') == len(structure['chapters']), "章节数与结构分析不一致"
+        assert index.count('section') == len(structure['sections']), "小节数与结构分析不一致"
+        assert index.count('paragraph') == structure['paragraphs'], "段落数与结构分析不一致"
+        assert index.count('quote') == structure['quotes'] and index.count('list') == structure['lists'], "引用或列表数不一致"
+        paragraphs = [(entry.char_start, entry.char_end) for entry in index.entries('paragraph')]
+        assert paragraphs == list(processor._paragraph_units(processed)), "段落区间与分块使用的段落不一致"
+        
+        # 字节位置是输入文件中对应原始行的范围：预处理这段原始文本得到条目的内容
+        with open(input_file, 'rb') as f:
+            data = f.read()
+        for kind in KINDS:
+            for entry in index.entries(kind)[::7]:
+                raw = data[entry.byte_start:entry.byte_end].decode('utf-8')
+                text = processed[entry.char_start:entry.char_end]
+                assert raw == raw.strip() and text in processor._preprocess_text(raw), f"{kind} 的字节位置与原始文本不对应"
+                if kind == 'paragraph' and '\n' not in raw:
+                    assert processor._preprocess_text(raw) == text, "单行段落的字节位置不是原始段落"
+        print(f"✓ 索引完成: {index.count('chapter')} 章，{index.count('section')} 节，{index.count('paragraph')} 段")
+        
+        section = index.find('CH3-S2')
+        assert section and processed[section.char_start:].startswith('CH03-S02 '), "按编号查找小节失败"
+        assert index.find('ch03-s02') == section and index.find('CH9999') is None, "编号匹配不正确"
+        chapter = index.locate('chapter', section.char_start)
+        assert chapter.label == 'CH3' and chapter.char_start <= section.char_start < section.char_end <= chapter.char_end, \
+            "定位所在章节失败"
+        
+        # 只重新分块一个章节
+        views = processor.chunk_views(processed, start=chapter.char_start, end=chapter.char_end)
+        expected = processor.chunk_views(processed[chapter.char_start:chapter.char_end])
+        assert [str(view) for view in views] == [str(view) for view in expected], "区间分块结果不正确"
+        assert views[0].start == chapter.char_start, "区间分块的偏移量不是相对于全文"
+        print(f"✓ CH3-S2 位于第 {section.char_start} 个字符，重新分块 CH3 得到 {len(views)} 个块")
+        
+        try:
+            path = os.path.join(temp_dir, 'book.txt.sidx')
+            index.save(path)
+            loaded = StructureIndex.load(path)
+            assert loaded.matches(StructureIndex.file_hash(input_file)), "读取的索引哈希不一致"
+            with open(input_file, 'ab') as f:
+                f.write("改动".encode('utf-8'))
+            assert not loaded.matches(StructureIndex.file_hash(input_file)), "输入文件改变后索引仍然有效"
+            assert all(loaded.entries(kind) == index.entries(kind) for kind in KINDS), "读取的索引与保存的不一致"
+            assert loaded.byte_length == len(data) and loaded.find('CH3-S2') == section, "读取的索引不完整"
+            
+            with open(path, 'r+b') as f:
+                f.truncate(os.path.getsize(path) - 1)
+            assert StructureIndex.load(path) is None, "不完整的索引没有被忽略"
+            print(f"✓ 索引文件读写完成（{len(data)} 字节文本）")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ 结构索引测试失败: {e}")
+        return False
+
+def test_text_normalizer():
+    """测试文本规范化"""
+    print("测试文本规范化...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        from core.text_normalizer import CURLY_QUOTES, DECORATIVE_SYMBOLS, FULLWIDTH_PUNCTUATION, TextNormalizer
+        from benchmarks.bench_normalization import clean_by_replace, purge_symbols_repeatedly
+        
+        samples = ["", "a  b   c", "（测试），“引号”‘单引号’；冒号：。", "▪ 项目  ▪▪  • 列表·点 □■", " ▪ ", "ａｂｃ　１２３"]
+        normalizer = TextNormalizer.from_config()
+        symbol_normalizer = TextNormalizer(delete_characters=DECORATIVE_SYMBOLS)
+        for text in samples:
+            assert normalizer.normalize(text) == clean_by_replace(text), f"预处理规范化结果不一致: {text!r}"
+            assert symbol_normalizer.normalize(text) == purge_symbols_repeatedly(text), f"符号清理结果不一致: {text!r}"
+        print(f"✓ {len(samples)} 个样例与逐个 replace、重复符号清理的结果一致")
+        
+        # 删除和合并空格在同一遍中完成，结果与先删除再合并相同
+        fused = TextNormalizer({'，': ','}, delete_characters='▪•', collapse_spaces=True)
+        assert fused.normalize("a ▪ b▪▪  c•，d") == "a b c,d", "删除符号后没有合并空格"
+        # 映射结果又包含被映射字符时按同时替换处理
+        assert TextNormalizer({'a': 'b', 'b': 'a'}).normalize("abba") == "baab", "互换映射被重复替换"
+        # 弯引号默认保留，在 replacements 中加入后才转为直引号
+        assert normalizer.normalize("“引号”‘单引号’") == "“引号”‘单引号’", "默认设置转换了弯引号"
+        quotes = TextNormalizer.from_config({'replacements': {**FULLWIDTH_PUNCTUATION, **CURLY_QUOTES}})
+        assert quotes.normalize("“引号”，‘单引号’") == "\"引号\",'单引号'", "设置中加入的弯引号没有转换"
+        wide = TextNormalizer.from_config({'fullwidth_ascii': True, 'collapse_spaces': False})
+        assert wide.normalize("ＡＢＣ（１）") == "ABC(1)", "全角字母和数字没有转为半角"
+        
+        for config in ({'delete_characters': '\n'}, {'replacements': {'ab': 'c'}}):
+            try:
+                TextNormalizer.from_config(config)
+                raise AssertionError(f"无效设置没有报错: {config}")
+            except ValueError:
+                pass
+        
+        processor = TextProcessor({'normalization': {'delete_characters': '▪'}})
+        assert processor._preprocess_text("▪ 一，二  三") == " 一,二 三", "预处理没有使用设置中的规范化"
+        print("✓ 融合删除、互换映射、全角转半角和设置校验正确")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ 文本规范化测试失败: {e}")
+        return False
+
+def test_chunk_views():
+    """测试文本块视图"""
+    print("测试文本块视图...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        
+        processor = TextProcessor({'chunk_size': 120, 'overlap_size': 20})
+        
+        sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples', 'sample_text.txt')
+        chunks = processor.load_and_chunk_text(sample_file)
+        views = processor.load_chunk_views(sample_file)
+        
+        assert [str(view) for view in views] == chunks, "块视图物化结果与文本块不一致"
+        assert all(view.source is views[0].source for view in views), "块视图没有共享同一份文本"
+        print(f"✓ 块视图完成: {len(views)} 个视图共享同一份文本")
+        
+        # 使用不同的块大小重新分块
+        larger_views = processor.chunk_views(views[0].source, chunk_size=1000)
+        print(f"✓ 重新分块完成: {len(larger_views)} 个视图")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 文本块视图测试失败: {e}")
+        return False
+
+def test_parallel_preprocessing():
+    """测试并行预处理与顺序处理结果一致"""
+    print("测试并行预处理...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        
+        sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples', 'sample_text.txt')
+        with open(sample_file, 'r', encoding='utf-8') as f:
+            sample = f.read()
+        
+        # 超过并行处理的最小长度，保证确实使用进程池
+        temp_dir = tempfile.mkdtemp()
+        try:
+            book_file = os.path.join(temp_dir, 'book.txt')
+            with open(book_file, 'w', encoding='utf-8') as f:
+                f.write('\r\n\r\n'.join(f"第{i}章 测试章节{i}\n\n{sample}" for i in range(1, 600)))
+            
+            settings = {'chunk_size': 300, 'overlap_size': 20}
+            expected = TextProcessor(settings).load_chunk_views(book_file)
+            views = TextProcessor(dict(settings, parallel_preprocessing=True, preprocess_workers=2)).load_chunk_views(book_file)
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        assert views[0].source == expected[0].source, "并行预处理结果与顺序处理不一致"
+        assert [str(view) for view in views] == [str(view) for view in expected], "并行分块结果与顺序处理不一致"
+        print(f"✓ 并行预处理完成: {len(views)} 个块，与顺序处理一致")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 并行预处理测试失败: {e}")
+        return False
+
+def test_token_chunking():
+    """测试按token预算分块"""
+    print("测试按token预算分块...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        from core.token_estimator import get_token_estimator
+        
+        processor = TextProcessor({'chunking_mode': 'tokens', 'overlap_size': 20, 'token_fill_ratio': 0.8})
+        models = [('gpt-4', 300), ('claude-3-sonnet', 600)]
+        
+        sample_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples', 'sample_text.txt')
+        views = processor.load_chunk_views(sample_file, models)
+        
+        # 调度器可能把任何块交给任何模型，每个块都要放得进所有模型
+        for i, view in enumerate(views):
+            for model, max_tokens in models:
+                tokens = get_token_estimator(model).count(str(view))
+                assert tokens <= int(max_tokens * 0.8), f"块 {i} 超出 {model} 的token预算: {tokens}"
+        
+        print(f"✓ 按token预算分块完成: {len(views)} 个块，均未超出预算")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 按token预算分块测试失败: {e}")
+        return False
+
 def test_formatting_engine():
     """测试排版引擎模块"""
     print("测试排版引擎模块...")
@@ -86,6 +449,647 @@ def test_formatting_engine():
         print(f"✗ 排版引擎模块测试失败: {e}")
         return False
 
+def test_compiled_rules():
+    """测试编译后的单遍排版规则"""
+    print("测试单遍排版规则...")
+    
+    try:
+        from core.formatting_engine import FormattingEngine
+        
+        engine = FormattingEngine({})
+        samples = [
+            "**CH1 测试章节**\n\n    正文【引用\n跨行】\n\n- 列表项\n\n12. 编号项",
+            "**CH2\n\n第二章标题**\n- 列表项",  # 单独成行的标题前缀，回退为逐条应用
+            "  - 缩进列表\n\n\n\n**CH3-S1 小节**\n<div class=\"page-break\"></div>"
+        ]
+        for rule_set in (engine.rule_set, engine.word_rule_set):
+            for sample in samples:
+                assert rule_set.apply(sample) == rule_set.apply_sequential(sample), f"结果与逐条应用不一致: {sample!r}"
+        
+        print(f"✓ 单遍排版规则与逐条应用结果一致: {len(samples)} 个样例")
+        return True
+        
+    except Exception as e:
+        print(f"✗ 单遍排版规则测试失败: {e}")
+        return False
+
+def test_async_dispatch():
+    """测试异步LLM调度"""
+    print("测试异步LLM调度...")
+    
+    try:
+        from core.llm_coordinator import LLMCoordinator
+        from stub_llm_server import StubLLMServer
+        
+        with StubLLMServer(latency=0.05) as stub:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_cache_enabled': False,
+                'llm_configs': [
+                    {'name': 'stub_openai', 'api_key': 'test', 'base_url': stub.base_url,
+                     'model': 'gpt-4', 'max_concurrency': 50},
+                    {'name': 'stub_claude', 'api_key': 'test', 'base_url': stub.base_url,
+                     'model': 'claude-3-sonnet', 'api_format': 'anthropic', 'max_concurrency': 50}
+                ]
+            }
+            coordinator = LLMCoordinator(settings)
+            
+            chunks = [f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(200)]
+            results = coordinator.process_chunks(chunks)
+            
+            assert results == chunks, "异步调度结果与桩服务器响应不一致"
+            print(f"✓ 异步调度完成: {stub.request_count} 个请求，最大并发 {stub.max_in_flight}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 异步LLM调度测试失败: {e}")
+        return False
+
+def test_load_aware_scheduling():
+    """测试负载感知调度"""
+    print("测试负载感知调度...")
+    
+    try:
+        from core.llm_coordinator import LLMCoordinator
+        from stub_llm_server import StubLLMServer
+        
+        with StubLLMServer(latency=0.5) as slow, StubLLMServer(latency=0.02) as fast:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_cache_enabled': False,
+                'llm_configs': [
+                    {'name': 'slow', 'api_key': 'test', 'base_url': slow.base_url,
+                     'model': 'gpt-4', 'priority': 1, 'max_concurrency': 4},
+                    {'name': 'fast', 'api_key': 'test', 'base_url': fast.base_url,
+                     'model': 'gpt-4', 'priority': 2, 'max_concurrency': 4}
+                ]
+            }
+            coordinator = LLMCoordinator(settings)
+            chunks = [f"CH{i} 测试章节\n\n" + "测试内容" * (i + 1) for i in range(60)]
+            
+            start_time = time.time()
+            results = coordinator.process_chunks(chunks)
+            elapsed = time.time() - start_time
+            
+            assert results == chunks, "调度后结果顺序不正确"
+            # 轮询分配时慢速LLM要处理 30 个块，至少需要 3.75 秒
+            assert slow.request_count < 20, f"慢速LLM分到了 {slow.request_count} 个块"
+            assert elapsed < 3.0, f"慢速LLM拖慢了整体处理: {elapsed:.2f}秒"
+            print(f"✓ 调度完成: 慢速 {slow.request_count} 个块，快速 {fast.request_count} 个块，用时 {elapsed:.2f}秒")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 负载感知调度测试失败: {e}")
+        return False
+
+def test_rate_limiter():
+    """测试限流和自适应并发"""
+    print("测试限流和自适应并发...")
+    
+    try:
+        from core.rate_limiter import TokenBucket
+        from core.llm_coordinator import LLMCoordinator
+        from stub_llm_server import StubLLMServer
+        
+        # 容量内的请求不需要等待，透支后按补充速度等待
+        bucket = TokenBucket(10, 2)
+        assert bucket.reserve() == 0 and bucket.reserve() == 0, "令牌桶容量内不应等待"
+        assert 0.05 < bucket.reserve() <= 0.1, "令牌桶透支后等待时间不正确"
+        
+        with StubLLMServer(latency=0.05, throttle_above=8) as stub:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_cache_enabled': False,
+                'llm_configs': [
+                    {'name': 'stub_openai', 'api_key': 'test', 'base_url': stub.base_url,
+                     'model': 'gpt-4', 'max_concurrency': 64}
+                ]
+            }
+            coordinator = LLMCoordinator(settings)
+            coordinator.process_chunks([f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(200)])
+            limits = coordinator.get_processing_stats()['rate_limits']['stub_openai']
+            
+            assert limits['throttled'] > 0, "桩服务器应该返回过 429"
+            assert limits['concurrency_limit'] <= 16, "被限流后并发上限没有降低"
+            print(f"✓ 限流完成: 429 {stub.throttled_count} 次，并发上限收敛到 {limits['concurrency_limit']}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 限流测试失败: {e}")
+        return False
+
+def test_retry_failover():
+    """测试失败重试和故障转移"""
+    print("测试失败重试和故障转移...")
+    
+    try:
+        from core.llm_coordinator import LLMCoordinator, LLMProcessingError
+        from stub_llm_server import StubLLMServer
+        
+        with StubLLMServer(error_status=500) as broken, StubLLMServer(latency=0.01) as healthy:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_cache_enabled': False,
+                'retry_delay': 0.01,
+                'llm_configs': [
+                    {'name': 'broken', 'api_key': 'test', 'base_url': broken.base_url,
+                     'model': 'gpt-4', 'priority': 1},
+                    {'name': 'healthy', 'api_key': 'test', 'base_url': healthy.base_url,
+                     'model': 'gpt-4', 'priority': 2}
+                ]
+            }
+            coordinator = LLMCoordinator(settings)
+            chunks = [f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(30)]
+            results = coordinator.process_chunks(chunks)
+            circuit = coordinator.get_processing_stats()['scheduler']['broken']['circuit']
+            
+            assert results == chunks, "故障转移后结果不正确"
+            assert circuit['state'] == 'open', "连续失败的LLM没有熔断"
+            print(f"✓ 故障转移完成: 故障LLM收到 {broken.request_count} 个请求后熔断")
+            
+            # 只有故障LLM时不再静默返回原文
+            settings['llm_configs'] = settings['llm_configs'][:1]
+            settings['circuit_reset_timeout'] = 0.05
+            try:
+                LLMCoordinator(settings).process_chunks(chunks)
+                raise AssertionError("全部失败时应该抛出异常")
+            except LLMProcessingError as e:
+                assert len(e.failed_tasks) == len(chunks), "失败块数量不正确"
+                print(f"✓ 全部失败时抛出异常: {e}")
+        
+        # 唯一的LLM短暂故障：熔断器半开后继续处理，不把排队的块全部判为失败
+        with StubLLMServer(latency=0.01, fail_first=3) as flaky:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_cache_enabled': False,
+                'retry_delay': 0.01,
+                'circuit_failure_threshold': 3,
+                'circuit_reset_timeout': 0.2,
+                'llm_configs': [
+                    {'name': 'flaky', 'api_key': 'test', 'base_url': flaky.base_url, 'model': 'gpt-4',
+                     'max_concurrency': 1}
+                ]
+            }
+            chunks = [f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(20)]
+            results = LLMCoordinator(settings).process_chunks(chunks)
+            assert results == chunks, "短暂故障后结果不正确"
+            print(f"✓ 短暂故障后恢复: 共 {flaky.request_count} 个请求")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 失败重试测试失败: {e}")
+        return False
+
+def test_batch_shared_queue():
+    """测试批处理共用调度队列"""
+    print("测试批处理共用调度队列...")
+    
+    try:
+        from core.llm_coordinator import LLMCoordinator
+        from stub_llm_server import StubLLMServer
+        
+        with StubLLMServer(latency=0.05) as stub:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_cache_enabled': False,
+                'llm_configs': [
+                    {'name': 'stub_openai', 'api_key': 'test', 'base_url': stub.base_url,
+                     'model': 'gpt-4', 'max_concurrency': 4}
+                ]
+            }
+            coordinator = LLMCoordinator(settings)
+            large = [f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(60)]
+            small = ["CH1 小文件\n\n小文件内容"]
+            
+            finished = list(coordinator.iter_processed_batch([large, [], small]))
+            
+            assert [result.file_id for result in finished][:2] == [1, 2], "小文件没有先于大文件完成"
+            assert finished[2].results == large and finished[1].results == small, "批处理结果不正确"
+            assert finished[2].queue_time < 1.0, "大文件等待时间过长"
+            print(f"✓ 批处理完成: 完成顺序 {[result.file_id for result in finished]}，"
+                  f"大文件排队 {finished[2].queue_time:.2f}秒")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 批处理共用调度队列测试失败: {e}")
+        return False
+
+def test_batch_streaming_load():
+    """测试批处理边读取边调度"""
+    print("测试批处理边读取边调度...")
+    
+    try:
+        from main import DavidApp
+        from core.profiler import PipelineProfiler
+        from stub_llm_server import StubLLMServer
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            with StubLLMServer(latency=0.01) as stub:
+                config_file = os.path.join(temp_dir, 'settings.json')
+                with open(config_file, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'llm_dispatch_mode': 'async',
+                        'llm_cache_enabled': False,
+                        'llm_configs': [
+                            {'name': 'stub_openai', 'api_key': 'test', 'base_url': stub.base_url,
+                             'model': 'gpt-4', 'max_concurrency': 16}
+                        ]
+                    }, f)
+                app = DavidApp(config_file)
+                
+                # 大文件排在前面
+                large_file = os.path.join(temp_dir, 'large.txt')
+                small_file = os.path.join(temp_dir, 'small.txt')
+                with open(large_file, 'w', encoding='utf-8') as f:
+                    for i in range(50):
+                        f.write(f"CH{i} 测试章节\n\n" + ("测试内容，包含多个段落。" * 10 + "\n\n") * 500)
+                with open(small_file, 'w', encoding='utf-8') as f:
+                    f.write("CH1 小文件\n\n小文件内容\n")
+                
+                load_start = time.time()
+                app._load_chunks(large_file, PipelineProfiler())
+                load_time = time.time() - load_start
+                
+                results = app._run_batch_shared_queue([large_file, small_file],
+                                                      os.path.join(temp_dir, 'output'), PipelineProfiler())
+                large, small = results
+                
+                assert large.success and small.success, f"批处理失败: {large.errors + small.errors}"
+                assert small.queue_time < load_time, "小文件等待大文件读取完才开始处理"
+                assert small.wall_time < large.wall_time, "小文件没有先于大文件完成"
+                print(f"✓ 边读取边调度: 大文件读取 {load_time:.2f}秒，小文件排队 {small.queue_time:.2f}秒")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 批处理边读取边调度测试失败: {e}")
+        return False
+
+def test_streaming_output():
+    """测试流式处理和流式排版"""
+    print("测试流式处理和流式排版...")
+    
+    try:
+        import io
+        from core.llm_coordinator import LLMCoordinator
+        from core.formatting_engine import FormattingEngine
+        from stub_llm_server import StubLLMServer
+        
+        with StubLLMServer(latency=0.05) as stub:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_streaming': True,
+                'llm_cache_enabled': False,
+                'llm_configs': [
+                    {'name': 'stub_openai', 'api_key': 'test', 'base_url': stub.base_url,
+                     'model': 'gpt-4', 'max_concurrency': 4}
+                ]
+            }
+            coordinator = LLMCoordinator(settings)
+            engine = FormattingEngine(settings)
+            chunks = [f"**CH{i} 测试章节**\n\n    测试内容 {i}\n- 列表项\n【引用 {i}】" for i in range(40)]
+            
+            start_time = time.time()
+            output = io.StringIO()
+            stats = engine.format_stream(coordinator.iter_processed_chunks(chunks), output)
+            elapsed = time.time() - start_time
+            
+            assert output.getvalue() == engine.format_text(chunks), "流式排版结果与整体排版不一致"
+            assert stats['first_flush_time'] < elapsed / 2, "首个片段没有提前写出"
+            print(f"✓ 流式排版完成: 首个片段 {stats['first_flush_time']:.2f}秒写出，总用时 {elapsed:.2f}秒")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 流式排版测试失败: {e}")
+        return False
+
+def test_overlap_dedup():
+    """测试合并时去掉块之间的重叠内容"""
+    print("测试重叠去重...")
+    
+    try:
+        from core.text_processor import TextProcessor
+        from core.llm_coordinator import LLMCoordinator
+        from core.formatting_engine import FormattingEngine
+        
+        settings = {'chunk_size': 300, 'overlap_size': 50, 'llm_configs': []}
+        processor = TextProcessor(settings)
+        coordinator = LLMCoordinator(settings)
+        engine = FormattingEngine(settings)
+        
+        paragraphs = [f"第{i}段内容，用于测试重叠区域的去重，编号{i:03d}。" * 3 for i in range(40)]
+        views = processor.chunk_views("CH01 测试章节\n\n" + "\n\n".join(paragraphs))
+        processed = [coordinator._mock_llm_response(str(view), '') for view in views]
+        # 模拟LLM改写：去掉一个块开头重叠内容的缩进
+        processed[2] = processed[2].lstrip()
+        
+        duplicated = engine.format_text(processed)
+        deduplicated = engine.format_text(processed, views)
+        assert engine.overlap_stats['unaligned_chunks'] == 0, "存在无法对齐的重叠内容"
+        for i in range(40):
+            assert deduplicated.count(f"编号{i:03d}") == 3, f"第{i}段重复或丢失"
+        assert len(deduplicated) < len(duplicated), "没有去掉重复内容"
+        
+        print(f"✓ 重叠去重完成: {len(duplicated)} → {len(deduplicated)} 字符")
+        
+        # 重复性很强的文本：对齐长度不能超过重叠内容，否则会把正文当作重复删掉
+        processor = TextProcessor({'chunk_size': 60, 'overlap_size': 10})
+        views = processor.chunk_views("\n\n".join(["哈" * 6] * 29))
+        deduplicated = engine.format_text([str(view) for view in views], views)
+        assert deduplicated.count("哈") == 6 * 29, f"周期文本去重后剩 {deduplicated.count('哈')} 个字"
+        print(f"✓ 周期文本去重完成: {len(views)} 块，正文无丢失")
+        return True
+        
+    except Exception as e:
+        print(f"✗ 重叠去重测试失败: {e}")
+        return False
+
+def test_incremental_formatting():
+    """测试增量排版"""
+    print("测试增量排版...")
+    
+    try:
+        import io
+        import tempfile
+        from core.text_processor import TextProcessor
+        from core.llm_coordinator import LLMCoordinator
+        from core.formatting_engine import FormattingEngine
+        from core.format_manifest import FormatManifest
+        
+        settings = {'chunk_size': 300, 'overlap_size': 50, 'llm_configs': []}
+        processor = TextProcessor(settings)
+        coordinator = LLMCoordinator(settings)
+        engine = FormattingEngine(settings)
+        processed_calls = []
+        
+        def process(chunks):
+            processed_calls.extend(chunks)
+            return [coordinator._mock_llm_response(str(chunk), '') for chunk in chunks]
+        
+        def build(edited_chapter=None):
+            chapters = []
+            for i in range(1, 11):
+                body = "\n\n".join(f"第{i}章第{j}段内容，用于测试增量排版。" * 4 for j in range(6))
+                if i == edited_chapter:
+                    body = body.replace("第5段内容", "第5段修改后的内容", 1)
+                chapters.append(f"CH{i:02d} 第{i}章\n\n{body}")
+            return processor.chunk_views("\n\n".join(chapters))
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest_path = os.path.join(temp_dir, 'manifest.json')
+            for views in (build(), build(edited_chapter=4)):
+                processed_calls.clear()
+                manifest = FormatManifest(manifest_path, 'test')
+                processed = manifest.process_chunks(views, process)
+                output = io.StringIO()
+                engine.format_stream(processed, output, views, manifest)
+                manifest.save()
+            
+            expected = engine.format_text(process(views), views)
+            stats = manifest.get_stats()
+            assert output.getvalue() == expected, "增量排版结果与完整排版不一致"
+            assert stats['processed_chunks'] <= 2, f"重新处理了 {stats['processed_chunks']} 个块"
+            assert stats['reused_fragments'] > stats['formatted_fragments'], "排版片段没有复用"
+        
+        print(f"✓ 增量排版完成: {len(views)} 个块中重新处理 {stats['processed_chunks']} 个，"
+              f"复用 {stats['reused_fragments']} 个排版片段")
+        return True
+        
+    except Exception as e:
+        print(f"✗ 增量排版测试失败: {e}")
+        return False
+
+def test_checkpoint_resume():
+    """测试检查点日志和中断恢复"""
+    print("测试检查点日志...")
+    
+    try:
+        from core.checkpoint_journal import CheckpointJournal
+        from core.llm_coordinator import ProcessingTask
+        
+        chunks = [f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(20)]
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'job.jsonl')
+            
+            # 第一次处理完成 8 个块后中断
+            def interrupted(pending, on_task_done):
+                for i, chunk in enumerate(pending[:8]):
+                    on_task_done(ProcessingTask(i, chunk, 'stub', 'completed', result=chunk.upper()))
+                raise RuntimeError("模拟中断")
+            
+            journal = CheckpointJournal(path, 'fingerprint', {'input_file': 'book.txt'}, fsync_interval=60)
+            try:
+                journal.process_chunks(chunks, interrupted)
+                raise AssertionError("中断没有抛出异常")
+            except RuntimeError:
+                journal.close()
+            
+            # 模拟崩溃时写了一半的记录
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('{"key": "torn')
+            
+            # 恢复时只处理剩余的块
+            received = []
+            def resume(pending, on_task_done):
+                received.extend(pending)
+                return [chunk.upper() for chunk in pending]
+            
+            with CheckpointJournal(path, 'fingerprint') as journal:
+                results = journal.process_chunks(chunks, resume)
+                assert journal.info['input_file'] == 'book.txt', "任务信息没有保存"
+            
+            assert len(received) == 12, f"恢复后重新处理了 {len(received)} 个块"
+            assert results == [chunk.upper() for chunk in chunks], "恢复后的结果不正确"
+            print(f"✓ 中断恢复完成: 跳过 8 个已完成的块，处理剩余 {len(received)} 个")
+            
+            # 处理配置改变时不复用
+            received.clear()
+            with CheckpointJournal(path, 'other') as journal:
+                journal.process_chunks(chunks, resume)
+            assert len(received) == len(chunks), "配置改变后不应复用检查点"
+            print("✓ 处理配置改变后检查点失效")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 检查点日志测试失败: {e}")
+        return False
+
+def test_pipeline_profiler():
+    """测试流水线性能分析"""
+    print("测试流水线性能分析...")
+    
+    try:
+        from core.llm_coordinator import LLMCoordinator
+        from core.profiler import PipelineProfiler, percentile
+        from stub_llm_server import StubLLMServer
+        
+        assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 0.5) == 3.0, "分位数计算错误"
+        
+        profiler = PipelineProfiler()
+        with profiler.stage('read', 100) as stage:
+            stage.bytes_out = 80
+        
+        with StubLLMServer(latency=0.02) as stub:
+            settings = {
+                'llm_dispatch_mode': 'async',
+                'llm_cache_enabled': False,
+                'llm_configs': [
+                    {'name': 'stub_openai', 'api_key': 'test', 'base_url': stub.base_url, 'model': 'gpt-4'}
+                ]
+            }
+            coordinator = LLMCoordinator(settings)
+            coordinator.profiler = profiler
+            chunks = [f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(12)]
+            with profiler.stage('llm'):
+                coordinator.process_chunks(chunks)
+        
+        report = profiler.report()
+        latency = report['llm_latency']
+        assert report['stages']['read']['bytes_out'] == 80, "阶段字节数不正确"
+        assert latency['count'] == len(chunks), f"记录了 {latency['count']} 次LLM调用"
+        assert latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max'], "延迟分位数不单调"
+        assert latency['p50'] >= 0.02, "LLM调用延迟小于模拟延迟"
+        print(f"✓ LLM延迟 p50={latency['p50'] * 1000:.0f}ms p99={latency['p99'] * 1000:.0f}ms")
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            trace_file = os.path.join(temp_dir, 'trace.json')
+            profiler.export_chrome_trace(trace_file)
+            with open(trace_file, 'r', encoding='utf-8') as f:
+                events = json.load(f)['traceEvents']
+            llm_events = [event for event in events if event.get('cat') == 'llm']
+            assert len(llm_events) == len(chunks), "trace 中的LLM调用数量不正确"
+            print(f"✓ Chrome trace 导出完成: {len(events)} 个事件")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 流水线性能分析测试失败: {e}")
+        return False
+
+def test_bench_suite():
+    """测试性能测试套件的结果记录"""
+    print("测试性能测试套件...")
+    
+    try:
+        from benchmarks.bench_suite import compare_results, run_benchmarks
+        
+        def missing_dependency():
+            raise ModuleNotFoundError("No module named 'ui'")
+        
+        def broken():
+            raise RuntimeError("端到端处理失败")
+        
+        results = run_benchmarks({'text_processor': lambda: {'seconds': 1.0},
+                                  'end_to_end': missing_dependency, 'llm_coordinator': broken})
+        assert results['text_processor'] == {'seconds': 1.0}, "成功的测试结果不正确"
+        assert results['end_to_end']['status'] == 'skipped' and 'ui' in results['end_to_end']['reason'], \
+            "缺少依赖的测试没有记为 skipped"
+        assert results['llm_coordinator']['status'] == 'error', "失败的测试没有记为 error"
+        json.dumps(results)
+        
+        baseline = {'benchmarks': {'text_processor': {'seconds': 1.0}, 'end_to_end': {'seconds': 2.0}}}
+        rows = compare_results(baseline, {'benchmarks': results}, 0.1)
+        assert [row['benchmark'] for row in rows] == ['text_processor'], "没有结果的测试参与了对比"
+        print("✓ 单个测试失败时其余结果仍然保存，且不参与对比")
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ 性能测试套件测试失败: {e}")
+        return False
+
+def test_response_cache():
+    """测试LLM响应缓存"""
+    print("测试LLM响应缓存...")
+    
+    try:
+        from core.llm_coordinator import LLMCoordinator
+        from stub_llm_server import StubLLMServer
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            with StubLLMServer() as stub:
+                settings = {
+                    'llm_dispatch_mode': 'async',
+                    'temp_directory': temp_dir,
+                    'llm_configs': [
+                        {'name': 'stub_openai', 'api_key': 'test', 'base_url': stub.base_url, 'model': 'gpt-4'}
+                    ]
+                }
+                chunks = [f"CH{i} 测试章节\n\n测试内容 {i}" for i in range(20)]
+                
+                LLMCoordinator(settings).process_chunks(chunks)
+                requests_after_first_run = stub.request_count
+                
+                # 新的协调器从磁盘加载缓存，只有改动的块需要调用API
+                coordinator = LLMCoordinator(settings)
+                chunks[5] = "CH5 修改后的章节"
+                results = coordinator.process_chunks(chunks)
+                stats = coordinator.get_processing_stats()
+                
+                assert results == chunks, "缓存结果与原始响应不一致"
+                assert stub.request_count - requests_after_first_run == 1, "未改动的块仍然调用了API"
+                assert stats['cache_hits'] == 19 and stats['cache_misses'] == 1, f"缓存统计错误: {stats}"
+                print(f"✓ 响应缓存完成: 命中 {stats['cache_hits']} 次，未命中 {stats['cache_misses']} 次")
+                
+                # 线程池调度缓存的模拟响应不能被异步调度的真实请求命中
+                mode_chunks = [f"CH{i} 切换调度方式\n\n内容 {i}" for i in range(3)]
+                LLMCoordinator({**settings, 'llm_dispatch_mode': 'thread'}).process_chunks(mode_chunks)
+                requests_before = stub.request_count
+                coordinator = LLMCoordinator(settings)
+                coordinator.process_chunks(mode_chunks)
+                stats = coordinator.get_processing_stats()
+                assert stub.request_count - requests_before == 3 and stats['cache_hits'] == 0, \
+                    f"切换调度方式后命中了模拟响应的缓存: {stats}"
+                
+                # 模型名称相同、服务地址不同的后端不共用缓存
+                with StubLLMServer() as other:
+                    other_settings = {**settings, 'llm_configs': [
+                        {'name': 'other_openai', 'api_key': 'test', 'base_url': other.base_url, 'model': 'gpt-4'}
+                    ]}
+                    coordinator = LLMCoordinator(other_settings)
+                    coordinator.process_chunks(mode_chunks)
+                    assert other.request_count == 3 and coordinator.get_processing_stats()['cache_hits'] == 0, \
+                        "不同服务地址的后端共用了缓存"
+                print("✓ 模拟响应和不同后端的结果不共用缓存")
+                
+                # 异步调度时缓存的文件读写不在事件循环所在的线程中执行
+                coordinator = LLMCoordinator(settings)
+                cache = coordinator.response_cache
+                threads = []
+                for name in ('get', 'put'):
+                    def record(*args, method=getattr(cache, name)):
+                        threads.append(threading.get_ident())
+                        return method(*args)
+                    setattr(cache, name, record)
+                coordinator.process_chunks(mode_chunks + ["CH9 新的章节"])
+                assert len(threads) == 5 and threading.get_ident() not in threads, "缓存读写阻塞了事件循环"
+                print("✓ 异步调度的缓存读写在线程池中执行")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ LLM响应缓存测试失败: {e}")
+        return False
+
 def test_content_validator():
     """测试内容验证器模块"""
     print("测试内容验证器模块...")
@@ -106,12 +1110,59 @@ def test_content_validator():
         result = validator.validate_content(original_chunks, processed_chunks, formatted_text)
         print(f"✓ 内容验证完成: 有效性={result.is_valid}, 相似度={result.similarity_score:.3f}")
         
+        # 测试截断的块被检测出来
+        original_chunks = ["CH1 测试章节\n\n第一段内容。", "第二段内容，共有三句。后面还有一句。最后一句结束。"]
+        processed_chunks = ["CH1 测试章节\n\n第一段内容。", "第二段内容，共有三句。"]
+        formatted_text = "<h1>CH1 测试章节</h1><p>第一段内容。</p><p>第二段内容，共有三句。</p>"
+        result = validator.validate_content(original_chunks, processed_chunks, formatted_text)
+        if result.is_valid or result.chunk_loss_ratios[0] != 0.0 or result.chunk_loss_ratios[1] < 0.5:
+            print(f"✗ 截断的块未被检测出来: {result}")
+            return False
+        print(f"✓ 截断的块被检测出来: 各块丢失比例={result.chunk_loss_ratios}")
+        
         return True
         
     except Exception as e:
         print(f"✗ 内容验证器模块测试失败: {e}")
         return False
 
+def test_encoding_detector():
+    """测试编码检测"""
+    print("测试编码检测...")
+    
+    try:
+        from core.encoding_detector import decode_file
+        
+        text = "CH01 第一章\r\n\r\n天地玄黄，宇宙洪荒。\n" * 100
+        english = "Chapter one. The quick brown fox.\n" * 100
+        cases = [
+            (text.encode('utf-8'), 'utf-8', text),
+            (text.encode('gbk'), 'gbk', text),
+            (text.encode('utf-16'), 'utf-16', text),
+            (english.encode('utf-16-be'), 'utf-16-be', english),
+            # 开头超过检测样本的纯英文，之后才出现中文
+            (("a" * 100000 + text).encode('gbk'), 'gbk', "a" * 100000 + text)
+        ]
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            for index, (data, expected_encoding, expected_text) in enumerate(cases):
+                path = os.path.join(temp_dir, f"{index}.txt")
+                with open(path, 'wb') as f:
+                    f.write(data)
+                content, encoding = decode_file(path)
+                assert encoding == expected_encoding, f"检测出 {encoding}，应为 {expected_encoding}"
+                assert content == expected_text.replace('\r\n', '\n'), f"{encoding} 解码结果不正确"
+            print(f"✓ {len(cases)} 种编码检测和解码正确")
+        finally:
+            shutil.rmtree(temp_dir)
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ 编码检测测试失败: {e}")
+        return False
+
 def test_settings():
     """测试设置管理模块"""
     print("测试设置管理模块...")
@@ -211,8 +1262,31 @@ def main():
     tests = [
         ("设置管理模块", test_settings),
         ("文本处理模块", test_text_processor),
+        ("流式分块", test_streaming_chunks),
+        ("内存映射读取", test_mapped_text),
+        ("单遍结构扫描", test_structure_scanner),
+        ("结构索引", test_structure_index),
+        ("文本规范化", test_text_normalizer),
+        ("文本块视图", test_chunk_views),
+        ("并行预处理", test_parallel_preprocessing),
+        ("按token预算分块", test_token_chunking),
         ("排版引擎模块", test_formatting_engine),
+        ("单遍排版规则", test_compiled_rules),
+        ("异步LLM调度", test_async_dispatch),
+        ("负载感知调度", test_load_aware_scheduling),
+        ("限流和自适应并发", test_rate_limiter),
+        ("失败重试和故障转移", test_retry_failover),
+        ("批处理共用调度队列", test_batch_shared_queue),
+        ("批处理边读取边调度", test_batch_streaming_load),
+        ("流式处理和排版", test_streaming_output),
+        ("重叠去重", test_overlap_dedup),
+        ("增量排版", test_incremental_formatting),
+        ("检查点和中断恢复", test_checkpoint_resume),
+        ("流水线性能分析", test_pipeline_profiler),
+        ("性能测试套件", test_bench_suite),
+        ("LLM响应缓存", test_response_cache),
         ("内容验证器模块", test_content_validator),
+        ("编码检测", test_encoding_detector),
         ("完整工作流程", test_full_workflow)
     ]
     
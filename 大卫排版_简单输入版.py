@@ -11,23 +11,13 @@ import re
 import webbrowser
 from datetime import datetime
 
+from core.encoding_detector import decode_file
+
 def read_text_file(file_path):
-    """读取文本文件，尝试多种编码"""
-    encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16', 'latin-1']
-    
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
-            print(f"✓ 成功读取文件，编码: {encoding}")
-            return content
-        except UnicodeDecodeError:
-            continue
-        except Exception as e:
-            print(f"✗ 读取文件失败 ({encoding}): {e}")
-            continue
-    
-    raise Exception("无法读取文件，尝试了所有编码格式")
+    """读取文本文件，自动检测编码"""
+    content, encoding = decode_file(file_path)
+    print(f"✓ 成功读取文件，编码: {encoding}")
+    return content
 
 def process_text_with_pagination(text):
     """处理文本并添加分页"""